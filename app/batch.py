@@ -0,0 +1,79 @@
+"""
+Batch entry point: analyzes many job offers concurrently.
+
+Usage:
+    python -m app.batch --urls urls.txt --texts offer1.txt offer2.txt -o results.jsonl
+"""
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Before the app imports: several modules read their settings at import time
+load_dotenv()
+
+from app.core.profile import load_portfolio
+from app.core.agent import CareerAgent
+from app.core.pipeline import BatchPipeline
+
+logger = logging.getLogger(__name__)
+
+def read_inputs(url_files, text_files) -> list:
+    inputs = []
+    for path in url_files:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                inputs.append(line)
+    for path in text_files:
+        inputs.append(Path(path).read_text(encoding="utf-8"))
+    return inputs
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze job offers in batch.")
+    parser.add_argument("--urls", nargs="*", default=[], help="Files with one job URL per line")
+    parser.add_argument("--texts", nargs="*", default=[], help="Files containing one job description each")
+    parser.add_argument("-o", "--output", help="Write one JSON result per line to this file")
+    parser.add_argument("--scrape-concurrency", type=int, help="Parallel scraping requests")
+    parser.add_argument("--research-concurrency", type=int, help="Parallel company searches")
+    parser.add_argument("--llm-concurrency", type=int, help="Parallel LLM calls")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    inputs = read_inputs(args.urls, args.texts)
+    if not inputs:
+        parser.error("No inputs given. Use --urls and/or --texts.")
+
+    concurrency = {
+        "scrape": args.scrape_concurrency,
+        "research": args.research_concurrency,
+        "llm": args.llm_concurrency,
+    }
+    pipeline = BatchPipeline(
+        CareerAgent(load_portfolio()),
+        concurrency={stage: value for stage, value in concurrency.items() if value},
+    )
+
+    def on_item(item, done, total):
+        outcome = item.error or f"{item.result.verdict} ({item.result.match_score}%)"
+        print(f"[{done}/{total}] {item.source[:80]} -> {outcome}", flush=True)
+
+    report = pipeline.run(inputs, on_item=on_item)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for item in report.items:
+                f.write(json.dumps(item.model_dump(exclude={"text"}), ensure_ascii=False) + "\n")
+
+    print(
+        f"\n{report.completed}/{len(report.items)} offers analyzed, {report.failed} failed "
+        f"in {report.elapsed_seconds:.1f}s ({report.offers_per_minute:.1f} offers/min)"
+    )
+    return 0 if report.failed == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,144 +1,584 @@
+import os
+import re
 import json
+import time
+import hashlib
 import logging
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
 
-from app.core.llm import LLMClient
-from app.core.models import Portfolio, AnalysisResult
+from pydantic import BaseModel
+
+from app.core.models import Portfolio, AnalysisResult, StagedAnalysis
+from app.core.filters import HardFilterRules, extract_job_offer, evaluate_hard_filters
+from app.core.llm import LLMClient, OLLAMA_OPTIONS
+from app.core.prompts import BATCH_INSTRUCTIONS, NO_RESEARCH, estimate_tokens, get_profile_prompt, get_prompt_layout
+from app.core.condense import condense_job_text, head_text, tokenize
+from app.core.company import CONFIDENCE_THRESHOLD, extract_company_local, get_gazetteer
+from app.core.dedup import DuplicateMatch, get_offer_index
+from app.core.retrieval import RETRIEVAL_ENABLED, RETRIEVAL_MAX_TOKENS, retrieve_evidence, retrieve_shared_evidence
+from app.core.tracing import span, propagate
+from app.core.json_stream import ESSENTIAL_FIELDS, StreamingJSONParser, salvage_array, validate_analysis
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for the job description in the prompt (~6000 chars)
+JOB_TEXT_MAX_TOKENS = int(os.getenv("JOB_TEXT_MAX_TOKENS", "1700"))
+
+# Placeholder names returned when no real employer can be identified
+GENERIC_COMPANY_NAMES = {"unknown", "confidential", "cliente final"}
+
+# "serial": company -> research -> analysis. "speculative": analysis starts while research runs
+ANALYSIS_MODES = ("serial", "speculative")
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "speculative")
+# What to do when research reveals red flags after a speculative analysis: "adjust" or "rerun"
+SPECULATIVE_RECONCILE = os.getenv("SPECULATIVE_RECONCILE", "adjust")
+
+# Research findings that can change a verdict (ES/EN)
+RED_FLAG_TERMS = [
+    r"layoffs?", r"despidos?", r"\bERE\b", r"expediente de regulaci[oó]n", r"t[oó]xic[oa]s?", r"toxic",
+    r"lawsuits?", r"demandas?", r"bankrupt(?:cy)?", r"quiebra", r"concurso de acreedores", r"insolven(?:cy|cia)",
+    r"scam", r"estafa", r"fraud", r"fraude", r"unpaid", r"impagos?", r"sin pagar", r"burn ?out",
+    r"high turnover", r"alta rotaci[oó]n", r"hiring freeze", r"congelaci[oó]n de contrataciones",
+]
+_RED_FLAG_RE = re.compile("|".join(RED_FLAG_TERMS), re.IGNORECASE)
+# A negation up to three words before the term
+_NEGATION_RE = re.compile(r"\b(?:no|not|never|sin|without|nunca|ning[uú]n[oa]?)\b(?:[^\w.;]+\w+){0,3}[^\w.;]*$", re.IGNORECASE)
+# "- [title](href): body", as formatted by the search tool
+_RESULT_LINE_RE = re.compile(r"^- \[(?P<title>.*?)\]\(.*?\): (?P<body>.*)$")
+
+ADJUST_OPTIONS = {"num_predict": 256}
+
+ADJUST_PROMPT = """
+You already evaluated a job offer without company research. This is your preliminary result:
+{preliminary}
+
+New company research found these warning signs: {red_flags}
+
+CONTEXTO INVESTIGACIÓN EMPRESA:
+{research}
+
+Revise the evaluation considering ONLY the research. Output ONLY JSON:
+{{"match_score": <int 0-100>, "verdict": "APPLY" | "CONSIDER" | "IGNORE", "cons_to_add": ["<short con in Spanish>"]}}
+"""
+
+# Targeted re-ask when the streamed analysis lacks fields (truncated or invalid output)
+MAX_REASKS = int(os.getenv("ANALYSIS_MAX_REASKS", "1"))
+REASK_OPTIONS = {"num_predict": 512}
+
+REASK_PROMPT = """{user_prompt}
+
+TU RESPUESTA ANTERIOR QUEDÓ INCOMPLETA O CON CAMPOS INVÁLIDOS.
+Campos ya válidos: {partial}
+Problemas: {problems}
+
+Devuelve ÚNICAMENTE un objeto JSON con estas claves: {fields}
+"""
+
+# Batched scoring (feed triage): several condensed offers per LLM call, no company research
+BATCH_SCORING_MAX_OFFERS = int(os.getenv("BATCH_SCORING_MAX_OFFERS", "6"))
+# Job text per offer in a batch, and the output reserved for each offer's result
+BATCH_OFFER_MAX_TOKENS = int(os.getenv("BATCH_OFFER_MAX_TOKENS", "600"))
+BATCH_RESULT_TOKENS = int(os.getenv("BATCH_RESULT_TOKENS", "256"))
+
+class BatchAnswer(BaseModel):
+    results: List[Any] = [] # elements are validated one by one
+
+def is_researchable_company(company_name: str) -> bool:
+    """Returns True if the company name is specific enough to run web research."""
+    return bool(company_name) and company_name.lower() not in GENERIC_COMPANY_NAMES
+
+def find_red_flags(research_context: str) -> List[str]:
+    """Distinct warning terms mentioned in the search results of the company research."""
+    found = []
+    for line in (research_context or "").splitlines():
+        # Only result lines: query headers, errors and timeouts mention the terms themselves
+        result = _RESULT_LINE_RE.match(line)
+        if not result:
+            continue
+        text = f"{result.group('title')} {result.group('body')}"
+        for match in _RED_FLAG_RE.finditer(text):
+            # "no layoffs", "sin despidos en 2023", "without any lawsuits"
+            if _NEGATION_RE.search(text[:match.start()]):
+                continue
+            term = match.group(0).lower()
+            if term not in found:
+                found.append(term)
+    return found
+
 class CareerAgent:
-    def __init__(self, portfolio: Portfolio):
+    def __init__(self, portfolio: Portfolio, use_cache: bool = True, prompt_layout: Optional[str] = None):
         self.portfolio = portfolio
         self.llm = LLMClient()
+        self.use_cache = use_cache
+        self.prompt_layout = prompt_layout or get_prompt_layout()
+        self.filter_rules = HardFilterRules.from_conditions(portfolio.professional_conditions)
+        # With retrieval the skills leave the system prompt; the relevant evidence goes with each offer
+        self.use_retrieval = RETRIEVAL_ENABLED
+        self.profile_prompt = get_profile_prompt(portfolio, self.filter_rules, include_skills=not self.use_retrieval)
+        self.skill_terms = {term for category in portfolio.skills for item in category.items for term in tokenize(item)}
+        # Stored analyses (dedup index) are only reused under the same profile, prompts and model
+        self.analysis_digest = hashlib.sha256("\n".join([
+            self.prompt_layout, self.llm.router.model_for("analyze"), self.profile_prompt.stable_system_prompt, portfolio.model_dump_json(),
+        ]).encode("utf-8")).hexdigest()
+
+    def prefilter(self, job_text: str, url: Optional[str] = None) -> Optional[AnalysisResult]:
+        """
+        Applies the deterministic hard filters. Returns an IGNORE result for offers that
+        clearly fail, so no search or LLM call is needed; None if the offer must be analyzed.
+        """
+        decision = evaluate_hard_filters(extract_job_offer(job_text, url), self.filter_rules)
+        if not decision.rejected:
+            return None
+        logger.info(f"Offer rejected by hard filters: {decision.reasons}")
+        return AnalysisResult(
+            match_score=0,
+            verdict="IGNORE",
+            reasoning_summary="Descartada por filtros duros (sin análisis LLM): " + " ".join(decision.reasons),
+            pros=[],
+            cons=decision.reasons,
+            hard_filter_check=decision.status,
+        )
 
     def perform_research(self, company_name: str) -> str:
-        """Performs deep research on the company."""
-        from app.tools.search import search_company_reputation
-        return search_company_reputation(company_name)
+        """Performs deep research on the company (served from the local research store when fresh)."""
+        from app.tools.research_store import get_research_store
+        return get_research_store().lookup(company_name)
+
+    def extract_company_name(self, job_text: str, url: Optional[str] = None, metadata: Optional[Dict[str, str]] = None) -> str:
+        """
+        Finds the employer locally (URL patterns, page metadata, known companies, text cues)
+        and only asks the LLM when the local guess is not confident enough.
+        """
+        local_name = self.extract_company_name_local(job_text, url=url, metadata=metadata)
+        if local_name:
+            return local_name
 
-    def extract_company_name(self, job_text: str) -> str:
+        clean_name = self._extract_company_name_llm(job_text)
+        # Learn names the LLM found verbatim in the text, so next time no LLM call is needed
+        if is_researchable_company(clean_name) and clean_name.lower() in job_text.lower():
+            get_gazetteer().learn(clean_name)
+        return clean_name
+
+    def extract_company_name_local(self, job_text: str, url: Optional[str] = None, metadata: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """The locally extracted company name, or None if not confident enough (no LLM call)."""
+        gazetteer = get_gazetteer()
+        guess = extract_company_local(job_text, url=url, metadata=metadata, gazetteer=gazetteer)
+        if guess.name and guess.confidence >= CONFIDENCE_THRESHOLD:
+            logger.info(f"Company '{guess.name}' found locally ({guess.source}, confidence {guess.confidence})")
+            gazetteer.learn(guess.name)
+            return guess.name
+        return None
+
+    def _extract_company_name_llm(self, job_text: str) -> str:
         """Simple extraction of company name using LLM to ensure accuracy."""
         prompt = f"""
         Extract ONLY the company name from this job text.
         Output ONLY the name. Do not write full sentences like "The company is...".
         If not found, return 'Unknown'. 
         
-        Text substring: {job_text[:500]}
+        Text substring: {head_text(job_text, 500)}
         """
         # Cleaner extraction
-        raw_name = self.llm.generate(prompt).strip()
+        raw_name = self.llm.generate(prompt, use_cache=self.use_cache, task="extract").strip()
         # Remove common chat prefixes if they still appear
         clean_name = raw_name.replace("The company name is", "").replace("is ", "").replace(".", "").strip()
         return clean_name
 
-    def analyze(self, job_text: str, research_context: str = "") -> AnalysisResult:
-        # 1. Prepare Profile Context
-        profile_summary = {
-            "name": self.portfolio.personal_info.name,
-            "title": self.portfolio.personal_info.title,
-            "summary": self.portfolio.professional_summary['short'],
-            "hard_filters": {
-                "salary_min": "52000 EUR",
-                "remote": "100% Remote required (or very flexible)",
-                "visa": "Needs Sponsorship (Spain/EU) if not already valid"
-            },
-            "skills": [s.dict() for s in self.portfolio.skills],
-        }
-        
-        profile_json = json.dumps(profile_summary, indent=2, ensure_ascii=False)
+    def job_text_budget(self, research_context: str = "") -> int:
+        """
+        Max tokens of job text that fit in num_ctx next to the prompt and the reserved output.
+        Ollama drops the *start* of an overflowing prompt, which would also discard the cached prefix.
+        """
+        used = estimate_tokens(self.profile_prompt.stable_system_prompt) + estimate_tokens(research_context)
+        if self.use_retrieval:
+            used += RETRIEVAL_MAX_TOKENS
+        free_tokens = OLLAMA_OPTIONS["num_ctx"] - OLLAMA_OPTIONS["num_predict"] - used - 64
+        return max(0, min(JOB_TEXT_MAX_TOKENS, free_tokens))
 
-        # 2. Construct Prompt
-        system_prompt = f"""
-        Actúa como un Coach de Carrera y Reclutador Técnico experto para Álvaro (El Candidato).
-        
-        PERFIL CANDIDATO (JSON):
-        {profile_json}
-
-        CONTEXTO INVESTIGACIÓN EMPRESA:
-        {research_context if research_context else "No external research available."}
-
-        ESTRATEGIA DE EVALUACIÓN:
-        1. **Filtros Duros (CRÍTICOS)**: 
-           - **Remoto**: Si dice explícitamente "Presencial", "Híbrido (obligatorio)" -> VERDICT: IGNORE.
-           - **Visa**: Si dice "No sponsor", "EU citizens only" -> VERDICT: IGNORE.
-           - **Salario**: Si el max es < 52k EUR -> VERDICT: IGNORE.
-
-        2. **Ajuste Técnico y Rol (El Score)**:
-           - Analiza gaps entre Skills del Candidato vs Requisitos.
-           - **CRÍTICO: NO ALUCINES NI INVENTES REQUISITOS.**
-             - Solo evalúa stack técnico mencionado explícitamente en la descripción.
-             - Si la oferta NO menciona "Go", NO penalices por falta de Go.
-             - Si la oferta NO menciona "AWS", NO penalices por falta de AWS.
-           - **Si el Score < 100%**: OBLIGATORIAMENTE debes explicar POR QUÉ en 'cons' (ej: "Falta experiencia en Go", "El rol es Junior", "Stack desconocido").
-           - **Si el Score es 100%**: Debe ser un match perfecto en todo.
-
-        INSTRUCCIONES DE SALIDA (ESPAÑOL):
-        - Todos los textos de `reasoning_summary`, `pros` y `cons` DEBEN estar en **ESPAÑOL**.
-        - **PROS**: Sé ESPECÍFICO sobre el match técnico/cultural.
-          - MAL: "Buen salario", "100% remoto".
-          - BIEN: "Tu experiencia de 15 años en Java coincide con el stack core", "Haber sido CTO encaja con el liderazgo requerido".
-        - **CONS**: Gaps técnicos específicos, dudas sobre la empresa o seniority.
-
-        FORMATO OUTPUT (JSON PURO):
-        Debes responder ÚNICAMENTE con el objeto JSON válido.
-        NO escribas texto introductorio (ej: "Here is...").
-        NO uses bloques de código markdown (```json). Devuelve SOLO el RAW JSON.
-        
-        {{
-          "match_score": <int 0-100>,
-          "verdict": "<STRONGLY_APPLY | APPLY | CONSIDER | IGNORE>",
-          "reasoning_summary": "<Explicación detallada en ESPAÑOL>",
-          "pros": ["<Match específico 1>", "<Match específico 2>"],
-          "cons": ["<Gap o Red Flag 1>", "<Gap o Red Flag 2>"],
-          "hard_filter_check": {{
-            "remote_pass": <boolean true/false>,
-            "visa_pass": <boolean true/false>,
-            "salary_pass": <boolean true/false>
-          }}
-        }}
+    def batch_budget(self) -> int:
+        """Tokens of num_ctx left for the offers of a batched call and their answers."""
+        used = estimate_tokens(self.profile_prompt.stable_system_prompt) + estimate_tokens(BATCH_INSTRUCTIONS) + estimate_tokens(NO_RESEARCH)
+        if self.use_retrieval:
+            used += RETRIEVAL_MAX_TOKENS
+        return max(0, OLLAMA_OPTIONS["num_ctx"] - used - 64)
+
+    def pack_offers(self, job_texts: List[str], max_offers: int = BATCH_SCORING_MAX_OFFERS) -> List[List[int]]:
+        """Consecutive groups of offer indices whose texts and reserved answers fit in one call."""
+        budget = self.batch_budget()
+        packs, current, used = [], [], 0
+        for index, text in enumerate(job_texts):
+            cost = estimate_tokens(text) + BATCH_RESULT_TOKENS + 8 # offer header
+            if current and (used + cost > budget or len(current) >= max_offers):
+                packs.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += cost
+        if current:
+            packs.append(current)
+        return packs
+
+    def warm_up(self):
+        """Preloads the model with the invariant system prompt (stable layout only)."""
+        if self.prompt_layout == "stable":
+            return self.llm.preload(self.profile_prompt.stable_system_prompt)
+        return None
+
+    def find_duplicate(self, job_text: str) -> Optional[DuplicateMatch]:
+        """A previously analyzed near-duplicate of the offer (reposts on other boards), if any."""
+        index = get_offer_index() if self.use_cache else None
+        if index is None:
+            return None
+        try:
+            with span("dedup.lookup") as lookup_span:
+                duplicate = index.find(job_text, context=self.analysis_digest)
+                lookup_span.set(found=duplicate is not None, similarity=duplicate.similarity if duplicate else None)
+                return duplicate
+        except Exception as e:
+            logger.warning(f"Dedup lookup failed: {e}")
+            return None
+
+    def remember(self, job_text: str, result: AnalysisResult, url: Optional[str] = None, company_name: Optional[str] = None) -> None:
+        """Stores an LLM analysis in the dedup index so reposts of the offer can reuse it."""
+        index = get_offer_index()
+        if index is None or result.verdict == "ERROR":
+            return
+        try:
+            index.add(job_text, result, url=url, company_name=company_name, context=self.analysis_digest)
+        except Exception as e:
+            logger.warning(f"Could not store offer in the dedup index: {e}")
+
+    def research_company(
+        self, job_text: str, url: Optional[str] = None, metadata: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Extracts the company and researches it, timing both stages."""
+        start = time.perf_counter()
+        with span("company.extract") as company_span:
+            company_name = self.extract_company_name(job_text, url=url, metadata=metadata)
+            company_span.set(company=company_name)
+        timings = {"company": time.perf_counter() - start}
+
+        research_context = ""
+        if is_researchable_company(company_name):
+            start = time.perf_counter()
+            with span("research", company=company_name) as research_span:
+                research_context = self.perform_research(company_name)
+                research_span.set(bytes=len(research_context), red_flags=len(find_red_flags(research_context)))
+            timings["research"] = time.perf_counter() - start
+        return {"company_name": company_name, "research_context": research_context, "timings": timings}
+
+    def run_analysis(
+        self,
+        job_text: str,
+        url: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        mode: Optional[str] = None,
+        on_stage: Optional[Callable[[str], None]] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> StagedAnalysis:
         """
+        Full analysis of an offer: company extraction, research and LLM evaluation.
 
-        user_prompt = f"JOB DESCRIPTION:\n{job_text[:6000]}" # Limit job text
+        In speculative mode the evaluation starts right away without research while the
+        company is researched in a background thread. If the research brings red flags the
+        preliminary result is reconciled (a short adjustment call or a full re-run).
+        `on_field(name, value)` gets each validated result field (match_score, verdict...)
+        as soon as it is streamed. Callbacks are always invoked from the caller's thread. Reposts of an already analyzed
+        offer reuse its result, unless the facts behind the hard filters changed.
+        """
+        mode = mode or ANALYSIS_MODE
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        with span("analysis", mode=mode, chars=len(job_text)) as analysis_span:
+            staged = self._run_analysis(job_text, url, metadata, on_token, mode, on_stage, on_field)
+            analysis_span.set(verdict=staged.result.verdict, match_score=staged.result.match_score, reused=staged.mode == "duplicate")
+        return staged
+
+    def _run_analysis(
+        self,
+        job_text: str,
+        url: Optional[str],
+        metadata: Optional[Dict[str, str]],
+        on_token: Optional[Callable[[str], None]],
+        mode: str,
+        on_stage: Optional[Callable[[str], None]],
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> StagedAnalysis:
+        notify = on_stage or (lambda stage: None)
+        started = time.perf_counter()
 
+        duplicate = self.find_duplicate(job_text)
+        dedup_time = time.perf_counter() - started
+        if duplicate and duplicate.reusable:
+            return StagedAnalysis(
+                result=duplicate.result,
+                mode="duplicate",
+                company_name=duplicate.company_name or "",
+                duplicate_of=duplicate.offer_id,
+                similarity=duplicate.similarity,
+                timings={"dedup": dedup_time, "total": time.perf_counter() - started},
+            )
+
+        if mode == "serial":
+            notify("research")
+            research = self.research_company(job_text, url=url, metadata=metadata)
+            notify("analyze")
+            start = time.perf_counter()
+            result = self.analyze(job_text, research["research_context"], on_token=on_token, on_field=on_field)
+            timings = {**research["timings"], "analyze": time.perf_counter() - start}
+            staged = StagedAnalysis(
+                result=result,
+                llm_stats=self.llm.last_stats,
+                mode=mode,
+                company_name=research["company_name"],
+                research_context=research["research_context"],
+                red_flags=find_red_flags(research["research_context"]),
+                timings=timings,
+            )
+        else:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-research") as executor:
+                future = executor.submit(propagate(self.research_company), job_text, url, metadata)
+                notify("analyze")
+                start = time.perf_counter()
+                result = self.analyze(job_text, "", on_token=on_token, on_field=on_field)
+                analyze_time = time.perf_counter() - start
+                # Read here: the client's stats are per thread, and the research thread runs the company extraction
+                llm_stats = self.llm.last_stats
+                notify("research")
+                try:
+                    research = future.result()
+                except Exception as e:
+                    logger.warning(f"Speculative research failed, keeping preliminary result: {e}")
+                    research = {"company_name": "", "research_context": "", "timings": {}}
+
+            staged = StagedAnalysis(
+                result=result,
+                llm_stats=llm_stats,
+                mode=mode,
+                company_name=research["company_name"],
+                research_context=research["research_context"],
+                red_flags=find_red_flags(research["research_context"]),
+                timings={**research["timings"], "analyze": analyze_time},
+            )
+            if staged.red_flags and result.verdict != "ERROR":
+                notify("reconcile")
+                self._reconcile(staged, job_text, on_token, on_field)
+
+        staged.timings["dedup"] = dedup_time
+        if duplicate:
+            staged.duplicate_of = duplicate.offer_id
+            staged.similarity = duplicate.similarity
+            staged.changed_fields = duplicate.changed_fields
+            staged.previous_result = duplicate.result
+        self.remember(job_text, staged.result, url=url, company_name=staged.company_name)
+        staged.timings["total"] = time.perf_counter() - started
+        logger.info(f"Analysis ({mode}) timings: " + ", ".join(f"{k}={v:.2f}s" for k, v in staged.timings.items()))
+        return staged
+
+    def _reconcile(
+        self, staged: StagedAnalysis, job_text: str, on_token: Optional[Callable[[str], None]], on_field: Optional[Callable[[str, Any], None]] = None
+    ) -> None:
+        """Updates a speculative result with research red flags, in place."""
+        with span("reconcile", strategy=SPECULATIVE_RECONCILE, red_flags=len(staged.red_flags)):
+            self._reconcile_result(staged, job_text, on_token, on_field)
+
+    def _reconcile_result(
+        self, staged: StagedAnalysis, job_text: str, on_token: Optional[Callable[[str], None]], on_field: Optional[Callable[[str, Any], None]] = None
+    ) -> None:
+        start = time.perf_counter()
+        if SPECULATIVE_RECONCILE == "rerun":
+            staged.reconciliation = "rerun"
+            staged.result = self.analyze(job_text, staged.research_context, on_token=on_token, on_field=on_field)
+            staged.llm_stats = self.llm.last_stats
+            staged.timings["rerun"] = time.perf_counter() - start
+            return
+
+        staged.reconciliation = "adjust"
+        result = staged.result
+        prompt = ADJUST_PROMPT.format(
+            preliminary=json.dumps({"match_score": result.match_score, "verdict": result.verdict, "reasoning_summary": result.reasoning_summary}, ensure_ascii=False),
+            red_flags=", ".join(staged.red_flags),
+            research=staged.research_context,
+        )
+        response_text = self.llm.generate(prompt, json_mode=True, use_cache=self.use_cache, options=ADJUST_OPTIONS, task="adjust")
         try:
-            logger.info("Sending prompt to LLM...")
-            # FORCE JSON MODE
-            response_text = self.llm.generate(prompt=user_prompt, system_prompt=system_prompt, json_mode=True)
-            
-            # Robust extraction strategy
-            extracted_json = None
-            import re
-
-            # Since we forced JSON mode, the response SHOULD be valid JSON directly
+            data = json.loads(response_text)
+            result.match_score = max(0, min(100, int(data.get("match_score", result.match_score))))
+            if data.get("verdict") in ("APPLY", "CONSIDER", "IGNORE"):
+                result.verdict = data["verdict"]
+            result.cons.extend(str(con) for con in data.get("cons_to_add", []) if con)
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            logger.warning(f"Could not parse adjustment, keeping preliminary result: {e}")
+        staged.timings["adjust"] = time.perf_counter() - start
+
+    def retrieve_evidence(self, job_text: str) -> str:
+        """Portfolio projects, companies, skills and expertise most related to the offer."""
+        if not self.use_retrieval:
+            return ""
+        with span("retrieval") as retrieval_span:
+            evidence = retrieve_evidence(self.portfolio, job_text)
+            retrieval_span.set(items=evidence.count("\n") + 1 if evidence else 0, tokens=estimate_tokens(evidence))
+            return evidence
+
+    def analyze(
+        self,
+        job_text: str,
+        research_context: str = "",
+        on_token: Optional[Callable[[str], None]] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> AnalysisResult:
+        """
+        Scores the offer against the portfolio. `on_token` receives the completion as it streams,
+        `on_field` each result field as soon as it is complete and valid.
+        """
+        with span("analyze", research_chars=len(research_context), streaming=on_token is not None) as analyze_span:
+            self.llm.last_stats = None # a failure before the LLM call must not report the previous call's stats
+            result = self._analyze(job_text, research_context, on_token, on_field)
+            analyze_span.set(verdict=result.verdict, match_score=result.match_score)
+            return result
+
+    def analyze_batch(self, job_texts: List[str], max_offers: int = BATCH_SCORING_MAX_OFFERS) -> List[AnalysisResult]:
+        """
+        Scores many offers with few LLM calls: offers rejected by the hard filters get their
+        IGNORE result directly, the rest are condensed and packed into num_ctx, and each call
+        returns one result per offer (without company research, as in triage). Each result is
+        validated on its own; offers whose result is missing or invalid get a regular `analyze`.
+        Results are in the order of `job_texts`.
+        """
+        results: List[Optional[AnalysisResult]] = [self.prefilter(text) for text in job_texts]
+        survivors = [index for index, result in enumerate(results) if result is None]
+        offer_tokens = max(0, min(BATCH_OFFER_MAX_TOKENS, self.batch_budget() - BATCH_RESULT_TOKENS))
+        condensed = [condense_job_text(job_texts[index], offer_tokens, self.skill_terms) for index in survivors]
+        with span("analyze.batch", offers=len(job_texts), rejected=len(job_texts) - len(survivors)) as batch_span:
+            packs = [pack for pack in self.pack_offers(condensed, max_offers) if len(pack) > 1]
+            for pack in packs:
+                for position, result in self._score_pack([condensed[index] for index in pack]).items():
+                    results[survivors[pack[position]]] = result
+            fallbacks = [index for index, result in enumerate(results) if result is None]
+            for index in fallbacks:
+                results[index] = self.analyze(job_texts[index])
+            batch_span.set(calls=len(packs), fallbacks=len(fallbacks))
+        if fallbacks:
+            logger.info(f"Batched scoring: {len(job_texts) - len(fallbacks)}/{len(job_texts)} offers in {len(packs)} calls, {len(fallbacks)} analyzed one by one")
+        return results
+
+    def _score_pack(self, job_texts: List[str]) -> Dict[int, AnalysisResult]:
+        """One batched call; maps positions in the pack to the results that passed validation."""
+        with span("analyze.pack", offers=len(job_texts)) as pack_span:
+            evidence = ""
+            if self.use_retrieval:
+                with span("retrieval", offers=len(job_texts)):
+                    evidence = retrieve_shared_evidence(self.portfolio, job_texts)
+            system_prompt, user_prompt = self.profile_prompt.build_batch_messages(job_texts, self.prompt_layout, evidence)
+            pack_span.set(system_tokens=estimate_tokens(system_prompt), user_tokens=estimate_tokens(user_prompt))
+
+            parser = StreamingJSONParser(model=BatchAnswer)
             try:
-                data = json.loads(response_text)
-                return AnalysisResult(**data)
-            except json.JSONDecodeError:
-                 # Logic for when even json-mode fails or returns extra text (rare in Llama3 but possible)
-                 pass
-
-            # Fallback (same as before just in case)
-            pattern = re.compile(r'\{.*"match_score".*\}', re.DOTALL)
-            match = pattern.search(response_text)
-            
-            if match:
-                potential_json = match.group(0)
-                potential_json = re.sub(r'^\s*//.*$', '', potential_json, flags=re.MULTILINE)
-                potential_json = re.sub(r',\s*\}', '}', potential_json)
-                potential_json = re.sub(r',\s*\]', ']', potential_json)
-                data = json.loads(potential_json)
-                return AnalysisResult(**data)
-
-            # If all fails
-            logger.error(f"LLM Response (Failed extraction): {response_text}")
-            raise ValueError(f"Could not extract valid JSON. Raw text: {response_text[:500]}...")
+                logger.info(f"Sending {len(job_texts)} offers to LLM in one prompt...")
+                self._stream_json(system_prompt, user_prompt, parser, options={"num_predict": len(job_texts) * BATCH_RESULT_TOKENS})
+            except Exception as e:
+                logger.warning(f"Batched scoring of {len(job_texts)} offers failed: {e}")
+                pack_span.set(error=str(e)[:200])
+                return {}
+
+            # A truncated answer still yields its complete elements
+            elements = parser.fields.get("results") or salvage_array(parser.text, "results")
+            results = {}
+            for position, element in enumerate(elements):
+                number = element.get("offer") if isinstance(element, dict) else None
+                index = number - 1 if type(number) is int and 0 < number <= len(job_texts) else position
+                if index >= len(job_texts) or index in results:
+                    continue
+                try:
+                    results[index] = validate_analysis(element)
+                except ValueError as e:
+                    logger.warning(f"Batched result for offer {index + 1} rejected: {e}")
+            pack_span.set(valid=len(results), complete=parser.done)
+            return results
+
+    def _stream_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        parser: StreamingJSONParser,
+        on_token: Optional[Callable[[str], None]] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Streams a JSON-mode completion into the parser, stopping as soon as the object closes."""
+        chunks = []
+        for token in self.llm.stream(
+            prompt=user_prompt, system_prompt=system_prompt, json_mode=True, use_cache=self.use_cache,
+            options=options, stop_when=lambda token: parser.done,
+        ):
+            chunks.append(token)
+            parser.feed(token)
+            if on_token:
+                on_token(token)
+        return "".join(chunks)
+
+    def _reask(self, system_prompt: str, user_prompt: str, parser: StreamingJSONParser, on_field: Optional[Callable[[str, Any], None]]) -> None:
+        """Asks only for the fields that are missing or invalid and merges them into the parse."""
+        fields = parser.missing()
+        with span("json.reask", fields=",".join(fields)) as reask_span:
+            prompt = REASK_PROMPT.format(
+                user_prompt=user_prompt,
+                partial=json.dumps(parser.fields, ensure_ascii=False, default=str),
+                problems=json.dumps(parser.invalid, ensure_ascii=False) if parser.invalid else "-",
+                fields=", ".join(fields),
+            )
+            answer = StreamingJSONParser(on_field=on_field)
+            try:
+                self._stream_json(system_prompt, prompt, answer, options=REASK_OPTIONS)
+            except Exception as e:
+                logger.warning(f"Re-ask for {fields} failed: {e}")
+                return
+            parser.merge(answer, fields)
+            reask_span.set(recovered=",".join(name for name in fields if name in answer.fields))
+
+    def _analyze(
+        self,
+        job_text: str,
+        research_context: str,
+        on_token: Optional[Callable[[str], None]],
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> AnalysisResult:
+        with span("prompt.build", input_chars=len(job_text)) as prompt_span:
+            job_text = condense_job_text(job_text, self.job_text_budget(research_context), self.skill_terms)
+            evidence = self.retrieve_evidence(job_text)
+            system_prompt, user_prompt = self.profile_prompt.build_messages(job_text, research_context, self.prompt_layout, evidence)
+            prompt_span.set(
+                job_tokens=estimate_tokens(job_text),
+                evidence_tokens=estimate_tokens(evidence),
+                system_tokens=estimate_tokens(system_prompt),
+                user_tokens=estimate_tokens(user_prompt),
+            )
+
+        parser = StreamingJSONParser(on_field=on_field)
+        try:
+            logger.info("Sending prompt to LLM...")
+            # FORCE JSON MODE; fields are validated while they stream and generation stops at the closing brace
+            response_text = self._stream_json(system_prompt, user_prompt, parser, on_token)
+            with span("json.parse", bytes=len(response_text)) as parse_span:
+                parse_span.set(complete=parser.done, missing=",".join(parser.missing()) or None, invalid=",".join(parser.invalid) or None)
+
+            # Bounded recovery: one targeted re-ask for what is missing instead of a full retry
+            for _ in range(MAX_REASKS):
+                if not parser.missing():
+                    break
+                self._reask(system_prompt, user_prompt, parser, on_field)
+
+            missing = parser.missing(ESSENTIAL_FIELDS)
+            if missing:
+                logger.error(f"LLM Response (Failed extraction): {response_text}")
+                raise ValueError(f"Could not extract valid JSON ({', '.join(missing)} missing). Raw text: {response_text[:500]}...")
+            return parser.to_model()
 
         except Exception as e:
             logger.error(f"Agent Analysis Error: {e}")
             return AnalysisResult(
                 match_score=0, 
                 verdict="ERROR", 
-                reasoning_summary=f"**Error de Análisis de IA**:\n\n{str(e)}\n\n**Texto recibido (Debug)**:\n```\n{response_text if 'response_text' in locals() else 'No response'}\n```",
+                reasoning_summary=f"**Error de Análisis de IA**:\n\n{str(e)}\n\n**Texto recibido (Debug)**:\n```\n{parser.text or 'No response'}\n```",
                 pros=[], cons=[]
             )
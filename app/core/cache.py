@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """
+    Persistent, content-addressed cache of LLM completions (SQLite).
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted
+    once the stored responses exceed `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        filename: str = "llm_cache.sqlite",
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+
+    @staticmethod
+    def make_key(endpoint: str, payload: Dict[str, Any]) -> str:
+        """Hashes everything that affects the completion: model, prompts, options and format."""
+        material = json.dumps({"endpoint": endpoint, **payload}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    with self._conn:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        logger.info(f"LLM cache evicted {len(victims)} entries ({freed} bytes)")
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+_response_cache: Optional[LLMResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Returns the shared response cache, or None if disabled with LLM_CACHE_ENABLED=false."""
+    global _response_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = LLMResponseCache()
+        return _response_cache
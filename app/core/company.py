@@ -0,0 +1,218 @@
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+
+from app.core.storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Below this confidence the agent falls back to the LLM
+CONFIDENCE_THRESHOLD = float(os.getenv("COMPANY_CONFIDENCE_THRESHOLD", "0.7"))
+# A known company mentioned in the text may be a client or former employer, not the one hiring:
+# on its own it stays below the threshold, agreeing with another source it passes
+GAZETTEER_CONFIDENCE = 0.55
+
+# Trailing legal-form tokens ignored when matching company names
+LEGAL_SUFFIXES = {
+    "inc", "llc", "ltd", "limited", "gmbh", "sl", "slu", "sa", "sau", "bv", "ag", "plc",
+    "corp", "corporation", "co", "company", "group", "spa", "srl", "sas", "sarl", "ab", "oy",
+}
+
+# Hosts and site names that belong to job boards, never to the employer
+JOB_BOARDS = {
+    "linkedin", "indeed", "glassdoor", "infojobs", "tecnoempleo", "computrabajo", "monster", "welcometothejungle",
+    "otta", "wellfound", "angel", "stackoverflow", "remoteok", "weworkremotely", "getmanfred", "manfred", "jooble",
+    "greenhouse", "lever", "workday", "myworkdayjobs", "ashbyhq", "ashby", "smartrecruiters", "workable", "recruitee",
+    "teamtailor", "bamboohr", "personio", "join", "careers", "jobs", "empleo", "trabajo",
+}
+
+# ATS and job-board URL layouts that carry the employer slug
+URL_PATTERNS = [
+    (re.compile(r"(?:boards|job-boards)(?:\.eu)?\.greenhouse\.io/(?:embed/job_board\?for=)?([\w-]+)"), "greenhouse", 0.9),
+    (re.compile(r"jobs(?:\.eu)?\.lever\.co/([\w.-]+)"), "lever", 0.9),
+    (re.compile(r"([\w-]+)\.wd\d+\.myworkdayjobs\.com"), "workday", 0.9),
+    (re.compile(r"jobs\.ashbyhq\.com/([\w.-]+)"), "ashby", 0.9),
+    (re.compile(r"apply\.workable\.com/([\w-]+)"), "workable", 0.85),
+    (re.compile(r"jobs\.smartrecruiters\.com/([\w-]+)"), "smartrecruiters", 0.85),
+    (re.compile(r"([\w-]+)\.(?:recruitee|teamtailor|bamboohr|jobs\.personio)\.(?:com|de|es)"), "ats-subdomain", 0.85),
+    (re.compile(r"linkedin\.com/company/([\w-]+)"), "linkedin-company", 0.85),
+    # Title and company share the slug ("ingeniero-en-datos-en-acme-corp"): the last separator wins, and
+    # the guess stays below the threshold unless another source agrees
+    (re.compile(r"linkedin\.com/jobs/view/[\w%-]*-(?:at|en)-([\w%-]+?)-\d{6,}"), "linkedin-job", 0.65),
+]
+
+# Up to four capitalized words on the same line ("Nimbus Health", "Banco de Chile")
+_NAME = r"([A-ZÁÉÍÓÚÑ0-9][\w&'.\-]*(?:[ \t]+(?:de[ \t]+|of[ \t]+|&[ \t]+)?[A-ZÁÉÍÓÚÑ0-9][\w&'.\-]*){0,3})"
+TEXT_PATTERNS = [
+    (re.compile(rf"(?:Company|Empresa|Employer|Compañía)\s*:\s*{_NAME}"), 0.75),
+    (re.compile(rf"\b(?:About|Sobre|Acerca de)\s+{_NAME}\s*$", re.MULTILINE), 0.65),
+    (re.compile(rf"\b{_NAME}\s+(?:is hiring|está contratando|busca|is looking for|is seeking)"), 0.6),
+    (re.compile(rf"\b(?:Join|Únete a|Join us at)\s+{_NAME}"), 0.6),
+    (re.compile(rf"^{_NAME}\s+(?:is|es)\s+(?:a|an|una|un|the|la|el)\b", re.MULTILINE), 0.55),
+    (re.compile(rf"\bat\s+{_NAME}(?:\s*[,.!(]|\s+(?:we|you|is)\b)"), 0.5),
+]
+STOPWORD_NAMES = {
+    "us", "the company", "the role", "the team", "nosotros", "la empresa", "el puesto", "el equipo", "you", "we",
+    "our company", "our team", "this role", "role", "company", "team", "home", "remote", "unknown",
+}
+
+def normalize_company_name(name: str) -> str:
+    """'Acme Software, S.L.' and 'ACME software' both map to 'acme software'."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"(?<=\b\w)\.(?=\w\b)", "", text)  # s.l. -> sl, s.a. -> sa
+    tokens = re.sub(r"[^a-z0-9]+", " ", text).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+def humanize_slug(slug: str) -> str:
+    return " ".join(part.capitalize() for part in re.split(r"(?:%20|[-_.])+", slug) if part)
+
+class CompanyGuess(BaseModel):
+    name: Optional[str] = None
+    confidence: float = 0.0
+    source: str = "none"
+
+class CompanyGazetteer:
+    """Companies seen in previous analyses, matched verbatim in new offers."""
+
+    def __init__(self, filename: str = "companies.sqlite"):
+        self._lock = threading.Lock()
+        self._pattern: Optional[re.Pattern] = None
+        self._names: Dict[str, str] = {}
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS companies (
+                    key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    seen_count INTEGER NOT NULL DEFAULT 1,
+                    last_seen REAL NOT NULL
+                )
+                """
+            )
+        self._reload()
+
+    def _reload(self) -> None:
+        rows = self._conn.execute("SELECT key, name FROM companies WHERE length(key) >= 3").fetchall()
+        self._names = {key: name for key, name in rows}
+        names = sorted({name for _, name in rows}, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + "|".join(re.escape(n) for n in names) + r")\b", re.IGNORECASE) if names else None
+
+    def canonical(self, name: str) -> Optional[str]:
+        return self._names.get(normalize_company_name(name))
+
+    def learn(self, name: str) -> None:
+        key = normalize_company_name(name)
+        if not key or key in STOPWORD_NAMES or key in JOB_BOARDS:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO companies (key, name, seen_count, last_seen) VALUES (?, ?, 1, ?)
+                ON CONFLICT(key) DO UPDATE SET seen_count = seen_count + 1, last_seen = excluded.last_seen
+                """,
+                (key, name.strip(), time.time()),
+            )
+            if key not in self._names:
+                self._reload()
+
+    def find(self, text: str) -> Optional[str]:
+        """Most mentioned known company in the text."""
+        if self._pattern is None:
+            return None
+        counts: Dict[str, int] = {}
+        for match in self._pattern.finditer(text):
+            key = normalize_company_name(match.group(1))
+            counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return None
+        return self._names.get(max(counts, key=counts.get))
+
+def _from_url(url: str) -> List[CompanyGuess]:
+    guesses = []
+    for pattern, source, confidence in URL_PATTERNS:
+        match = pattern.search(url)
+        if match and normalize_company_name(match.group(1)) not in JOB_BOARDS:
+            guesses.append(CompanyGuess(name=humanize_slug(match.group(1)), confidence=confidence, source=f"url:{source}"))
+    host = (urlparse(url).hostname or "").lower()
+    parts = [p for p in host.split(".") if p not in ("www", "careers", "jobs", "empleo", "trabajo", "apply")]
+    if len(parts) >= 2 and re.search(r"(?:^|\.)(?:careers|jobs|empleo|trabajo)\.|/(?:careers|jobs|empleo|trabaja-con-nosotros)\b", host + urlparse(url).path):
+        domain = parts[-2]
+        if domain not in JOB_BOARDS:
+            guesses.append(CompanyGuess(name=humanize_slug(domain), confidence=0.6, source="url:careers-site"))
+    return guesses
+
+def _from_metadata(metadata: Dict[str, str]) -> List[CompanyGuess]:
+    guesses = []
+    if metadata.get("hiring_organization"):
+        guesses.append(CompanyGuess(name=metadata["hiring_organization"], confidence=0.95, source="jsonld:hiringOrganization"))
+    site_name = metadata.get("og_site_name")
+    if site_name and normalize_company_name(site_name) not in JOB_BOARDS:
+        guesses.append(CompanyGuess(name=site_name, confidence=0.7, source="meta:og:site_name"))
+    return guesses
+
+def _from_text(text: str) -> List[CompanyGuess]:
+    guesses = []
+    for pattern, confidence in TEXT_PATTERNS:
+        for match in pattern.finditer(text):
+            name = match.group(1).strip(" .,'")
+            key = normalize_company_name(name)
+            if key and key not in STOPWORD_NAMES and key not in JOB_BOARDS and len(key) > 1:
+                guesses.append(CompanyGuess(name=name, confidence=confidence, source="text"))
+                break
+    return guesses
+
+def extract_company_local(
+    job_text: str,
+    url: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+    gazetteer: Optional[CompanyGazetteer] = None,
+) -> CompanyGuess:
+    """
+    Finds the employer from URL patterns, page metadata, known companies and text cues.
+    Independent sources agreeing on the same name raise the confidence.
+    """
+    head = job_text[:3000]
+    guesses = _from_metadata(metadata or {}) + (_from_url(url) if url else []) + _from_text(head)
+    if gazetteer:
+        known = gazetteer.find(head)
+        if known:
+            guesses.append(CompanyGuess(name=known, confidence=GAZETTEER_CONFIDENCE, source="gazetteer"))
+    if not guesses:
+        return CompanyGuess()
+
+    by_key: Dict[str, List[CompanyGuess]] = {}
+    for guess in guesses:
+        by_key.setdefault(normalize_company_name(guess.name), []).append(guess)
+
+    best = None
+    for key, group in by_key.items():
+        top = max(group, key=lambda g: g.confidence)
+        confidence = top.confidence
+        for other in group:
+            if other is not top:
+                confidence += (1 - confidence) * other.confidence * 0.5
+        name = (gazetteer.canonical(top.name) if gazetteer else None) or top.name
+        candidate = CompanyGuess(name=name, confidence=round(confidence, 3), source="+".join(g.source for g in group))
+        if best is None or candidate.confidence > best.confidence:
+            best = candidate
+    return best
+
+_gazetteer: Optional[CompanyGazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer() -> CompanyGazetteer:
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = CompanyGazetteer()
+        return _gazetteer
@@ -0,0 +1,123 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import Iterable, List, Set
+
+from app.core.prompts import estimate_tokens, CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Terms that mark the parts of a posting the evaluation depends on (ES/EN)
+FOCUS_TERMS = {
+    "requisitos", "requirements", "required", "requerimos", "buscamos", "looking", "experiencia", "experience",
+    "years", "años", "skills", "stack", "tecnologías", "technologies", "responsabilidades", "responsibilities",
+    "funciones", "role", "rol", "puesto", "position", "salario", "salary", "compensation", "retribución",
+    "sueldo", "bruto", "remoto", "remote", "teletrabajo", "híbrido", "hybrid", "presencial", "onsite",
+    "oficina", "office", "visa", "visado", "sponsorship", "patrocinio", "permiso", "senior", "lead",
+    "nice", "valorable", "plus", "ofrecemos", "offer", "benefits", "beneficios", "inglés", "english",
+}
+
+# Whole lines only: a requirement can mention cookies or privacy ("build our cookie-consent platform")
+BOILERPLATE_PATTERNS = [
+    r"(?:this (?:site|website) uses|we use|usamos|utilizamos|este (?:sitio|portal)(?: web)? (?:usa|utiliza)) cookies\b.*",
+    r"(?:accept|reject|aceptar|rechazar)(?: all| todas)?(?: cookies)?", r"(?:cookie|cookies) (?:policy|settings|preferences)",
+    r"pol[ií]tica de (?:cookies|privacidad)", r"privacy policy", r"terms of (?:use|service)", r"t[ée]rminos y condiciones",
+    r"(?:©|\(c\)|copyright)?.{0,60}(?:all rights reserved|todos los derechos reservados)\.?",
+    r"sign in", r"iniciar sesi[oó]n", r"(?:apply|aplicar|postular)(?: now| ahora)?", r"share", r"compartir",
+    r"save", r"guardar", r"show more", r"mostrar m[aá]s", r"report this job", r"denunciar.*",
+    r"(?:similar jobs|empleos similares|ofertas similares)", r"skip to.*", r"ir al contenido.*",
+]
+_BOILERPLATE_RE = re.compile("|".join(f"(?:{pattern})" for pattern in BOILERPLATE_PATTERNS), re.IGNORECASE)
+# Keeps language names like "c++", "c#", ".net" and "node.js" as single terms
+_WORD_RE = re.compile(r"\.net\b|\w(?:[\w+#.]*\w)?(?:\+\+|#)?", re.UNICODE)
+# "Requisitos:", "WHAT YOU'LL DO", "Sobre nosotros" (short lines that are not bullets or sentences)
+_HEADING_RE = re.compile(r"^[#*\s]*[^\n]{2,60}:$|^[^\-•*·\s][^.!?;,]{1,40}$")
+
+MAX_SECTION_LINES = 12
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 1]
+
+def clean_lines(text: str) -> List[str]:
+    """Strips boilerplate and drops repeated lines (scraped pages repeat menus, CTAs and footers)."""
+    seen: Set[str] = set()
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        key = " ".join(line.lower().split())
+        if len(key) < 2 or key in seen or _BOILERPLATE_RE.fullmatch(key):
+            continue
+        seen.add(key)
+        lines.append(line)
+    return lines
+
+def split_sections(lines: List[str]) -> List[List[str]]:
+    """Groups lines into sections starting at heading-like lines, capping section length."""
+    sections: List[List[str]] = []
+    current: List[str] = []
+    for line in lines:
+        if current and (_HEADING_RE.match(line) or len(current) >= MAX_SECTION_LINES):
+            sections.append(current)
+            current = []
+        current.append(line)
+    if current:
+        sections.append(current)
+    return sections
+
+def bm25_scores(query: Iterable[str], documents: List[List[str]], k1: float = 1.2, b: float = 0.75) -> List[float]:
+    """Okapi BM25 of every tokenized document against the query terms."""
+    query_terms = set(query)
+    n_docs = len(documents)
+    avg_len = sum(len(doc) for doc in documents) / n_docs if n_docs else 0.0
+    doc_freq = Counter(term for doc in documents for term in set(doc) if term in query_terms)
+    scores = []
+    for doc in documents:
+        counts = Counter(doc)
+        score = 0.0
+        for term in query_terms:
+            tf = counts.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / (avg_len or 1)))
+        scores.append(score)
+    return scores
+
+def condense_job_text(job_text: str, max_tokens: int, extra_terms: Iterable[str] = ()) -> str:
+    """
+    Fits a scraped posting into `max_tokens`: removes boilerplate and duplicate lines,
+    then keeps the sections most related to requirements, conditions and the candidate's
+    skills, in their original order. The opening section (title, company) is always kept.
+    """
+    # Never condense a posting to nothing, even if every line looked like boilerplate
+    lines = clean_lines(job_text) or [line.strip() for line in job_text.splitlines() if line.strip()]
+    text = "\n".join(lines)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sections = split_sections(lines)
+    query = FOCUS_TERMS | set(extra_terms)
+    scores = bm25_scores(query, [tokenize("\n".join(section)) for section in sections])
+
+    ranked = sorted(range(1, len(sections)), key=lambda i: scores[i], reverse=True)
+    selected = {0}
+    used = estimate_tokens("\n".join(sections[0]))
+    for i in ranked:
+        if scores[i] <= 0:
+            break
+        cost = estimate_tokens("\n".join(sections[i]))
+        if used + cost <= max_tokens:
+            selected.add(i)
+            used += cost
+
+    condensed = "\n\n".join("\n".join(sections[i]) for i in sorted(selected))
+    if estimate_tokens(condensed) > max_tokens:
+        # A huge opening section: fall back to clipping it
+        condensed = condensed[:int(max_tokens * CHARS_PER_TOKEN)]
+    logger.info(f"Condensed job text from ~{estimate_tokens(job_text)} to ~{estimate_tokens(condensed)} tokens ({len(selected)}/{len(sections)} sections)")
+    return condensed
+
+def head_text(job_text: str, max_chars: int = 500) -> str:
+    """The opening of the posting without boilerplate, where the employer is usually named."""
+    return "\n".join(clean_lines(job_text))[:max_chars]
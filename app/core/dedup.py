@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import time
+import random
+import struct
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+from app.core.models import AnalysisResult
+from app.core.filters import extract_job_offer
+from app.core.condense import clean_lines
+from app.core.storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Estimated Jaccard similarity above which two postings are the same offer
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() != "false"
+# Stored analyses older than this are not reused (and are pruned)
+DEDUP_MAX_AGE_DAYS = float(os.getenv("DEDUP_MAX_AGE_DAYS", "30"))
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a bucket
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)  # fixed seed: signatures must be stable across runs
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+# JobOffer fields that drive the hard filters; a repost that changes them needs a new analysis
+KEY_FIELDS = ("work_mode", "salary_min", "salary_max", "currency", "visa_sponsorship")
+
+class DuplicateMatch(BaseModel):
+    offer_id: int
+    similarity: float
+    url: Optional[str] = None
+    company_name: Optional[str] = None
+    result: AnalysisResult
+    changed_fields: List[str] = [] # KEY_FIELDS that differ from the stored offer
+
+    @property
+    def reusable(self) -> bool:
+        return not self.changed_fields
+
+def normalize_job_text(job_text: str) -> str:
+    """Lowercase ASCII words without boilerplate, so reposts on different boards compare equal."""
+    text = "\n".join(clean_lines(job_text))
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+def shingles(normalized: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    words = normalized.split()
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode(), digest_size=4).digest(), "little")
+        for i in range(len(words) - size + 1)
+    }
+
+def minhash(shingle_hashes: Set[int]) -> List[int]:
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in shingle_hashes) if shingle_hashes else _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+def _band_keys(signature: List[int]) -> List[str]:
+    return [
+        hashlib.blake2b(struct.pack(f"<{LSH_ROWS}I", *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]), digest_size=8).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+def offer_facts(job_text: str) -> Dict[str, object]:
+    offer = extract_job_offer(job_text)
+    return {field: getattr(offer, field) for field in KEY_FIELDS}
+
+class OfferIndex:
+    """
+    Near-duplicate index of analyzed offers: MinHash signatures of word shingles,
+    bucketed with LSH bands in SQLite, together with the stored AnalysisResult.
+    Each entry carries the `context` it was analyzed in (a digest of the profile, prompts
+    and model): only entries of the current context and younger than the max age match.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, filename: str = "offers.sqlite", max_age_days: Optional[float] = None):
+        self.threshold = threshold if threshold is not None else DEDUP_THRESHOLD
+        self.max_age = (max_age_days if max_age_days is not None else DEDUP_MAX_AGE_DAYS) * 86400
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS offer_signatures (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    url TEXT,
+                    company_name TEXT,
+                    facts TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    context TEXT NOT NULL DEFAULT '',
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(offer_signatures)")}
+            if "context" not in columns:
+                # Indexes created before the context existed: their entries never match again and age out
+                self._conn.execute("ALTER TABLE offer_signatures ADD COLUMN context TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_offer_signatures_fingerprint ON offer_signatures (fingerprint)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS offer_bands (
+                    band INTEGER NOT NULL,
+                    bucket TEXT NOT NULL,
+                    offer_id INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_offer_bands_bucket ON offer_bands (band, bucket)")
+        self.prune()
+
+    @staticmethod
+    def _signature(job_text: str):
+        normalized = normalize_job_text(job_text)
+        fingerprint = hashlib.sha256(normalized.encode()).hexdigest()
+        return normalized, fingerprint, minhash(shingles(normalized))
+
+    def find(self, job_text: str, context: str = "") -> Optional[DuplicateMatch]:
+        """The most similar stored offer above the threshold, with the key facts that changed."""
+        _, fingerprint, signature = self._signature(job_text)
+        bands = _band_keys(signature)
+        oldest = time.time() - self.max_age
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT id, signature, url, company_name, facts, result FROM offer_signatures
+                WHERE fingerprint = ? AND context = ? AND created_at >= ? ORDER BY id DESC LIMIT 1
+                """,
+                (fingerprint, context, oldest),
+            ).fetchall()
+            if not rows:
+                placeholders = " OR ".join("(band = ? AND bucket = ?)" for _ in bands)
+                params = [value for band, bucket in enumerate(bands) for value in (band, bucket)]
+                rows = self._conn.execute(
+                    f"""
+                    SELECT id, signature, url, company_name, facts, result FROM offer_signatures
+                    WHERE id IN (SELECT offer_id FROM offer_bands WHERE {placeholders}) AND context = ? AND created_at >= ?
+                    """,
+                    params + [context, oldest],
+                ).fetchall()
+
+        best = None
+        for offer_id, stored_signature, url, company_name, facts, result in rows:
+            similarity = estimate_similarity(signature, list(struct.unpack(f"<{NUM_PERM}I", stored_signature)))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (offer_id, similarity, url, company_name, facts, result)
+        if best is None:
+            return None
+
+        offer_id, similarity, url, company_name, facts, result = best
+        stored_facts = json.loads(facts)
+        current_facts = offer_facts(job_text)
+        changed = [field for field in KEY_FIELDS if stored_facts.get(field) != current_facts[field]]
+        logger.info(f"Near-duplicate of offer #{offer_id} (similarity {similarity:.2f}, changed: {changed or 'none'})")
+        return DuplicateMatch(
+            offer_id=offer_id,
+            similarity=round(similarity, 3),
+            url=url,
+            company_name=company_name,
+            result=AnalysisResult.model_validate_json(result),
+            changed_fields=changed,
+        )
+
+    def add(
+        self, job_text: str, result: AnalysisResult, url: Optional[str] = None, company_name: Optional[str] = None, context: str = ""
+    ) -> int:
+        _, fingerprint, signature = self._signature(job_text)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO offer_signatures (fingerprint, signature, url, company_name, facts, result, context, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    struct.pack(f"<{NUM_PERM}I", *signature),
+                    url,
+                    company_name,
+                    json.dumps(offer_facts(job_text)),
+                    result.model_dump_json(),
+                    context,
+                    time.time(),
+                ),
+            )
+            offer_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO offer_bands (band, bucket, offer_id) VALUES (?, ?, ?)",
+                [(band, bucket, offer_id) for band, bucket in enumerate(_band_keys(signature))],
+            )
+        return offer_id
+
+    def prune(self) -> int:
+        """Drops entries older than the max age (also run on startup); returns how many."""
+        oldest = time.time() - self.max_age
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM offer_bands WHERE offer_id IN (SELECT id FROM offer_signatures WHERE created_at < ?)", (oldest,)
+            )
+            return self._conn.execute("DELETE FROM offer_signatures WHERE created_at < ?", (oldest,)).rowcount
+
+_offer_index: Optional[OfferIndex] = None
+_offer_index_lock = threading.Lock()
+
+def get_offer_index() -> Optional[OfferIndex]:
+    """Returns the shared index, or None when deduplication is disabled (DEDUP_ENABLED=false)."""
+    global _offer_index
+    if not DEDUP_ENABLED:
+        return None
+    with _offer_index_lock:
+        if _offer_index is None:
+            _offer_index = OfferIndex()
+        return _offer_index
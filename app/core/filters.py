@@ -0,0 +1,301 @@
+import re
+import logging
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.models import JobOffer, HardFilterStatus, ProfessionalConditions
+
+logger = logging.getLogger(__name__)
+
+# --- Work mode signals (ES/EN) ---
+
+REMOTE_PATTERNS = [
+    r"100\s?%\s*(?:remoto|remote|teletrabajo)",
+    r"full(?:y)?[\s-]remote", r"remote[\s-]first", r"remote[\s-]only", r"remote[\s-]friendly",
+    r"work from (?:home|anywhere|wherever)", r"\bwork(?:ing)? remotely\b", r"\bremotely\b",
+    r"\bteletrabajo\b", r"\ben remoto\b", r"\bremoto\b", r"\bremote\b",
+]
+HYBRID_PATTERNS = [
+    r"\bh[ií]brid[oa]\b", r"\bhybrid\b",
+    r"\d\s*(?:d[ií]as?|days?)\s*(?:a la semana|por semana|per week|a week)?\s*(?:en|in|at)\s*(?:la\s*)?(?:oficina|the office|office)",
+]
+ONSITE_PATTERNS = [
+    r"\bpresencial\b", r"\bon[\s-]?site\b", r"\bin[\s-]office\b", r"\boffice[\s-]based\b",
+    r"\bno (?:es )?remoto\b", r"\bnot (?:a )?remote\b", r"\bno remote\b", r"\bsin teletrabajo\b",
+]
+# An on-site mention next to one of these is an occasional visit, not the work mode
+ONSITE_QUALIFIER_RE = re.compile(
+    r"\boccasional(?:ly)?\b|\boptional\b|\bvisits?\b|\boffsites?\b|\bfrom time to time\b|"
+    r"\bocasional(?:es|mente)?\b|\bopcional(?:es)?\b|\bvisitas?\b|\bpuntual(?:es|mente)?\b",
+    re.IGNORECASE,
+)
+ONSITE_QUALIFIER_WINDOW = 25
+# Negated remote wording overrides any remote signal
+NOT_REMOTE_PATTERNS = [r"\bno (?:es )?remoto\b", r"\bnot (?:a )?remote\b", r"\bno remote\b", r"\bsin teletrabajo\b"]
+
+# --- Visa signals (ES/EN) ---
+
+NO_SPONSORSHIP_PATTERNS = [
+    r"\b(?:do not|does not|don't|doesn't|cannot|can't|won't|will not|unable to|(?:are|is) not able to)\s+"
+    r"(?:offer|provide|support|sponsor)\b[^.\n]{0,20}?\b(?:visas?|sponsorship|sponsor)\b",
+    r"\bno\s+(?:visa\s+)?sponsorship\b(?!\s+(?:requirements?|needs?|required|needed|necessary))",
+    r"\bsponsorship (?:is )?not (?:available|offered|provided)",
+    r"\bwithout (?:the )?need (?:for|of) (?:visa )?sponsorship",
+    r"\b(?:eu|ue|european union|uk|us) citizens? only",
+    r"\b(?:must|need to|required to) (?:have|hold) (?:the )?(?:right|authori[sz]ation|permit) to work",
+    r"\bvalid (?:work|working) (?:permit|authori[sz]ation) (?:is )?required",
+    r"\bsin (?:posibilidad de )?patrocinio", r"\bno (?:se )?(?:ofrece|ofrecemos|patrocinamos) (?:patrocinio|visado|visa)",
+    r"\b(?:imprescindible|necesario|requisito)[^.\n]{0,40}permiso de trabajo",
+    r"\bsolo (?:ciudadanos|candidatos) (?:de la )?(?:ue|uni[oó]n europea|europeos)",
+    r"\bnacionalidad (?:espa[ñn]ola|europea) (?:obligatoria|imprescindible)",
+]
+# A no-sponsorship phrase right after one of these is a preference, not a deal breaker
+PREFERENCE_RE = re.compile(r"\b(?:ideally|preferably|preferred|nice to have|a plus|idealmente|preferiblemente|se valorar[aá])\b", re.IGNORECASE)
+SPONSORSHIP_PATTERNS = [
+    r"visa sponsorship (?:is )?(?:available|offered|provided)", r"(?:we|will) sponsor", r"relocation and visa",
+    r"(?:ofrecemos|se ofrece|posibilidad de) (?:patrocinio|visado|visa)", r"patrocinio de visado",
+]
+
+# --- Salary ---
+
+_NUM = r"\d{1,3}(?:[.,\s]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d+)?"
+_CURRENCY = r"€|eur(?:os?)?\b|\$|usd\b|£|gbp\b"
+# k/mil: thousands. M/millones: millions (funding, revenue), never a salary
+_MULTIPLIER = r"k\b|mil\b|m\b|mn\b|millones\b|millions?\b"
+_RANGE_SEP = r"\s*(?:-|–|—|to|a|hasta|y)\s*"
+SALARY_RANGE_RE = re.compile(
+    rf"(?P<cur1>{_CURRENCY})?\s*(?P<low>{_NUM})\s*(?P<k1>{_MULTIPLIER})?\s*(?P<cur2>{_CURRENCY})?"
+    rf"{_RANGE_SEP}(?P<cur3>{_CURRENCY})?\s*(?P<high>{_NUM})\s*(?P<k2>{_MULTIPLIER})?\s*(?P<cur4>{_CURRENCY})?",
+    re.IGNORECASE,
+)
+SALARY_SINGLE_RE = re.compile(
+    rf"(?P<bound>hasta|up to|max(?:imum|imo)?|desde|from|min(?:imum|imo)?|a partir de)?:?\s*"
+    rf"(?P<cur1>{_CURRENCY})?\s*(?P<value>{_NUM})\s*(?P<k>{_MULTIPLIER})?\s*(?P<cur2>{_CURRENCY})?",
+    re.IGNORECASE,
+)
+# Words that make a currency amount a salary (not a meal allowance, team size or funding round)
+SALARY_CONTEXT_RE = re.compile(
+    r"salari[oa]s?|salary|sueldo|\bbrut[oa]s?\b|\bgross\b|compensa(?:tion|ci[oó]n)|retribuci[oó]n|remuneraci[oó]n|"
+    r"\bpay(?:s|ing)?\b|\bpaga\b|\bote\b|per annum|\bp\.?a\.|\banual(?:es)?\b|\bannual(?:ly)?\b|\byearly\b|"
+    r"/\s?a[ñn]o|al a[ñn]o|por a[ñn]o|/\s?year|a year|per year|/\s?mes|al mes|mensual|per month|a month|monthly",
+    re.IGNORECASE,
+)
+SALARY_CONTEXT_BEFORE = 80
+SALARY_CONTEXT_AFTER = 40
+MONTHLY_RE = re.compile(r"^[^.\n]{0,25}(?:/\s?mes|al mes|mensual|/\s?month|per month|a month|monthly)", re.IGNORECASE)
+SHORT_PERIOD_RE = re.compile(r"^[^.\n]{0,25}(?:/\s?h\b|por hora|/\s?hour|per hour|hourly|por d[ií]a|al d[ií]a|per day|a day|daily)", re.IGNORECASE)
+CURRENCY_CODES = {"€": "EUR", "eur": "EUR", "euro": "EUR", "euros": "EUR", "$": "USD", "usd": "USD", "£": "GBP", "gbp": "GBP"}
+
+def _find(patterns: List[str], text: str) -> List[str]:
+    found = []
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            found.append(match.group(0))
+    return found
+
+def _find_onsite(text: str) -> List[str]:
+    """On-site statements, leaving out occasional visits ("occasional on-site visits", "office-based optional")."""
+    found = []
+    for pattern in ONSITE_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_end = text.find("\n", match.end())
+            line_end = len(text) if line_end < 0 else line_end
+            window = text[max(line_start, match.start() - ONSITE_QUALIFIER_WINDOW):min(line_end, match.end() + ONSITE_QUALIFIER_WINDOW)]
+            if not ONSITE_QUALIFIER_RE.search(window):
+                found.append(match.group(0))
+                break
+    return found
+
+def _find_no_sponsorship(text: str) -> List[str]:
+    """Explicit no-sponsorship statements, leaving out those phrased as a preference."""
+    found = []
+    for pattern in NO_SPONSORSHIP_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            if not PREFERENCE_RE.search(text[max(line_start, match.start() - 40):match.start()]):
+                found.append(match.group(0))
+                break
+    return found
+
+def _parse_amount(raw: str, multiplier: Optional[str]) -> Optional[float]:
+    raw = raw.strip()
+    if re.fullmatch(r"\d{1,3}(?:[.,\s]\d{3})+", raw):
+        value = float(re.sub(r"[.,\s]", "", raw))
+    else:
+        try:
+            value = float(raw.replace(",", "."))
+        except ValueError:
+            return None
+    multiplier = (multiplier or "").lower()
+    if multiplier in ("k", "mil"):
+        value *= 1_000
+    elif multiplier:
+        value *= 1_000_000
+    return value
+
+def _currency(*groups: Optional[str]) -> Optional[str]:
+    for group in groups:
+        if group:
+            return CURRENCY_CODES.get(group.lower().strip())
+    return None
+
+def _annualize(value: float, tail: str) -> Optional[float]:
+    if SHORT_PERIOD_RE.match(tail):
+        return None
+    if MONTHLY_RE.match(tail):
+        return value * 12
+    return value
+
+def _salary_context(text: str, start: int, end: int) -> bool:
+    """True if the amount at text[start:end] sits next to a salary word on its line."""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line_end = len(text) if line_end == -1 else line_end
+    before = text[max(line_start, start - SALARY_CONTEXT_BEFORE):start]
+    after = text[end:min(line_end, end + SALARY_CONTEXT_AFTER)]
+    return bool(SALARY_CONTEXT_RE.search(before) or SALARY_CONTEXT_RE.search(after))
+
+def _salary_candidates(text: str) -> List[Tuple[Optional[float], Optional[float], str, str]]:
+    """Currency amounts in a plausible annual salary range that sit next to salary wording."""
+    candidates, ranges = [], []
+    for match in SALARY_RANGE_RE.finditer(text):
+        currency = _currency(match.group("cur1"), match.group("cur2"), match.group("cur3"), match.group("cur4"))
+        if not currency:
+            continue
+        # A bare multiplier on one side applies to both ("50-60k")
+        k1, k2 = match.group("k1"), match.group("k2")
+        low = _parse_amount(match.group("low"), k1 or k2)
+        high = _parse_amount(match.group("high"), k2 or k1)
+        if low is None or high is None or low > high:
+            continue
+        ranges.append(match.span())
+        tail = text[match.end():]
+        low, high = _annualize(low, tail), _annualize(high, tail)
+        if low is None or not 10_000 <= low <= high <= 1_000_000 or not _salary_context(text, *match.span()):
+            continue
+        candidates.append((low, high, currency, match.group(0).strip()))
+
+    for match in SALARY_SINGLE_RE.finditer(text):
+        if any(start <= match.start("value") < end for start, end in ranges):
+            continue
+        currency = _currency(match.group("cur1"), match.group("cur2"))
+        if not currency:
+            continue
+        value = _parse_amount(match.group("value"), match.group("k"))
+        if value is None:
+            continue
+        value = _annualize(value, text[match.end():])
+        if value is None or not 10_000 <= value <= 1_000_000 or not _salary_context(text, *match.span()):
+            continue
+        bound = (match.group("bound") or "").lower()
+        if bound in ("desde", "from", "min", "minimum", "minimo", "a partir de"):
+            candidates.append((value, None, currency, match.group(0).strip()))
+        elif bound:
+            candidates.append((None, value, currency, match.group(0).strip()))
+        else:
+            candidates.append((value, value, currency, match.group(0).strip()))
+    return candidates
+
+def extract_salary(text: str) -> Optional[Tuple[Optional[float], Optional[float], str, str]]:
+    """
+    Returns (min, max, currency, matched text) of the salary, or None when no amount is
+    clearly a salary. With several candidates the most generous one is kept, so a smaller
+    unrelated figure can never make the hard filter reject the offer.
+    """
+    candidates = _salary_candidates(text)
+    if not candidates:
+        return None
+    # Open-ended maxima ("desde 50k") sort above any published maximum
+    return max(candidates, key=lambda c: (c[1] is None, c[1] or 0, c[0] or 0))
+
+def extract_job_offer(job_text: str, url: Optional[str] = None) -> JobOffer:
+    """Rule-based extraction of the hard-filter fields of a job offer (Spanish and English)."""
+    text = job_text.lower()
+    offer = JobOffer(raw_text=job_text, url=url)
+
+    not_remote = _find(NOT_REMOTE_PATTERNS, text)
+    remote = [] if not_remote else _find(REMOTE_PATTERNS, text)
+    hybrid = _find(HYBRID_PATTERNS, text)
+    onsite = _find_onsite(text)
+    # Only clear cases are decided here: remote next to hybrid or on-site wording is left for the LLM
+    if remote:
+        offer.work_mode = None if hybrid or onsite else "remote"
+    elif hybrid:
+        offer.work_mode = "hybrid"
+    elif onsite:
+        offer.work_mode = "onsite"
+    offer.is_remote = offer.work_mode == "remote"
+    offer.signals += remote + hybrid + onsite
+
+    no_sponsor = _find_no_sponsorship(text)
+    sponsor = _find(SPONSORSHIP_PATTERNS, text)
+    if no_sponsor:
+        offer.visa_sponsorship = False
+    elif sponsor:
+        offer.visa_sponsorship = True
+    offer.signals += no_sponsor + sponsor
+
+    salary = extract_salary(job_text)
+    if salary:
+        offer.salary_min, offer.salary_max, offer.currency, matched = salary
+        offer.signals.append(matched)
+
+    return offer
+
+class HardFilterRules(BaseModel):
+    remote_only: bool = True
+    accept_hybrid: bool = False
+    requires_sponsorship: bool = False
+    salary_min: Optional[float] = None
+    salary_currency: str = "EUR"
+
+    @classmethod
+    def from_conditions(cls, conditions: ProfessionalConditions) -> "HardFilterRules":
+        """Reads the structured deal breakers from `professional_conditions` in portfolio.yaml."""
+        availability = conditions.availability
+        salary = conditions.salary_expectations
+        return cls(
+            remote_only=bool(availability.get("remote_only", False)),
+            accept_hybrid=bool(availability.get("accept_hybrid", True)),
+            requires_sponsorship=bool(conditions.work_permit.get("requires_sponsorship", False)),
+            salary_min=salary.get("minimum_annual"),
+            salary_currency=salary.get("currency", "EUR"),
+        )
+
+class HardFilterDecision(BaseModel):
+    offer: JobOffer
+    status: HardFilterStatus
+    reasons: List[str] = []
+
+    @property
+    def rejected(self) -> bool:
+        return not (self.status.remote_pass and self.status.visa_pass and self.status.salary_pass)
+
+def evaluate_hard_filters(offer: JobOffer, rules: HardFilterRules) -> HardFilterDecision:
+    """
+    Applies the deal breakers. Missing data always passes: only explicit
+    contradictions (on-site, no sponsorship, published max below the minimum) fail.
+    """
+    status = HardFilterStatus()
+    reasons = []
+
+    if rules.remote_only:
+        if offer.work_mode == "onsite" or (offer.work_mode == "hybrid" and not rules.accept_hybrid):
+            status.remote_pass = False
+            reasons.append(f"Modalidad {offer.work_mode}: se requiere 100% remoto.")
+
+    if rules.requires_sponsorship and offer.visa_sponsorship is False:
+        status.visa_pass = False
+        reasons.append("La oferta excluye explícitamente el patrocinio de visado.")
+
+    if rules.salary_min and offer.currency == rules.salary_currency:
+        if offer.salary_max is not None and offer.salary_max < rules.salary_min:
+            status.salary_pass = False
+            reasons.append(
+                f"Salario máximo publicado ({offer.salary_max:,.0f} {offer.currency}) inferior al mínimo de {rules.salary_min:,.0f} {rules.salary_currency}."
+            )
+
+    return HardFilterDecision(offer=offer, status=status, reasons=reasons)
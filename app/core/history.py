@@ -0,0 +1,200 @@
+import os
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.models import AnalysisResult, JobOffer
+from app.core.filters import extract_job_offer
+from app.core.company import normalize_company_name
+from app.core.storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").lower() != "false"
+
+# Columns of the listing; the heavy JSON columns are only read for a single entry
+_SUMMARY_COLUMNS = "id, created_at, source, url, company_name, title, verdict, match_score, work_mode, salary_min, salary_max, currency, llm_used"
+
+class HistoryFilter(BaseModel):
+    verdicts: List[str] = []
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    company: Optional[str] = None # prefix of the normalized company name
+    since: Optional[float] = None # unix timestamps
+    until: Optional[float] = None
+
+    def where(self) -> Tuple[str, list]:
+        clauses, params = [], []
+        if self.verdicts:
+            clauses.append(f"verdict IN ({', '.join('?' for _ in self.verdicts)})")
+            params.extend(self.verdicts)
+        if self.min_score is not None:
+            clauses.append("match_score >= ?")
+            params.append(self.min_score)
+        if self.max_score is not None:
+            clauses.append("match_score <= ?")
+            params.append(self.max_score)
+        if self.company:
+            key = normalize_company_name(self.company)
+            # Prefix range instead of LIKE, so the company index is used
+            clauses.append("company_key >= ? AND company_key < ?")
+            params.extend([key, key + "\uffff"])
+        if self.since is not None:
+            clauses.append("created_at >= ?")
+            params.append(self.since)
+        if self.until is not None:
+            clauses.append("created_at < ?")
+            params.append(self.until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+class HistoryEntry(BaseModel):
+    id: int
+    created_at: float
+    source: str
+    url: Optional[str] = None
+    company_name: Optional[str] = None
+    title: Optional[str] = None
+    verdict: str
+    match_score: int
+    work_mode: Optional[str] = None
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    currency: Optional[str] = None
+    llm_used: bool = True
+    # Only filled by HistoryStore.get
+    offer: Optional[JobOffer] = None
+    research_context: Optional[str] = None
+    result: Optional[AnalysisResult] = None
+
+class HistoryStore:
+    """Every analyzed offer with its research and result, indexed for filtered, paginated listings."""
+
+    def __init__(self, filename: str = "history.sqlite"):
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    source TEXT NOT NULL,
+                    url TEXT,
+                    company_name TEXT,
+                    company_key TEXT,
+                    title TEXT,
+                    verdict TEXT NOT NULL,
+                    match_score INTEGER NOT NULL,
+                    work_mode TEXT,
+                    salary_min REAL,
+                    salary_max REAL,
+                    currency TEXT,
+                    llm_used INTEGER NOT NULL DEFAULT 1,
+                    offer TEXT NOT NULL,
+                    research TEXT,
+                    result TEXT NOT NULL
+                )
+                """
+            )
+            for name, columns in (
+                ("created", "created_at DESC"),
+                ("verdict", "verdict, created_at DESC"),
+                ("score", "match_score, created_at DESC"),
+                ("company", "company_key, created_at DESC"),
+            ):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_analyses_{name} ON analyses ({columns})")
+
+    def record(
+        self,
+        job_text: str,
+        result: AnalysisResult,
+        url: Optional[str] = None,
+        company_name: Optional[str] = None,
+        title: Optional[str] = None,
+        research_context: str = "",
+        llm_used: bool = True,
+    ) -> int:
+        offer = extract_job_offer(job_text, url)
+        offer.company_name = company_name or None
+        offer.title = title or next((line.strip() for line in job_text.splitlines() if line.strip()), "")[:200]
+        source = url or offer.title or "Texto"
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO analyses (
+                    created_at, source, url, company_name, company_key, title, verdict, match_score,
+                    work_mode, salary_min, salary_max, currency, llm_used, offer, research, result
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    time.time(), source, url, offer.company_name,
+                    normalize_company_name(company_name) if company_name else None, offer.title,
+                    result.verdict, result.match_score, offer.work_mode, offer.salary_min, offer.salary_max,
+                    offer.currency, int(llm_used), offer.model_dump_json(), research_context or None,
+                    result.model_dump_json(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def query(self, filters: Optional[HistoryFilter] = None, limit: int = 50, offset: int = 0, order: str = "date") -> List[HistoryEntry]:
+        """One page of summaries, newest first (or best score first with order='score')."""
+        where, params = (filters or HistoryFilter()).where()
+        order_by = "match_score DESC, created_at DESC" if order == "score" else "created_at DESC, id DESC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM analyses{where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        names = [column.strip() for column in _SUMMARY_COLUMNS.split(",")]
+        return [HistoryEntry(**dict(zip(names, row))) for row in rows]
+
+    def count(self, filters: Optional[HistoryFilter] = None) -> int:
+        where, params = (filters or HistoryFilter()).where()
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def get(self, entry_id: int) -> Optional[HistoryEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS}, offer, research, result FROM analyses WHERE id = ?", (entry_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        names = [column.strip() for column in _SUMMARY_COLUMNS.split(",")]
+        entry = HistoryEntry(**dict(zip(names, row[:-3])))
+        entry.offer = JobOffer.model_validate_json(row[-3])
+        entry.research_context = row[-2]
+        entry.result = AnalysisResult.model_validate_json(row[-1])
+        return entry
+
+    def version(self) -> int:
+        """Changes whenever an analysis is recorded; used to invalidate UI caches."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM analyses").fetchone()[0]
+
+_history_store: Optional[HistoryStore] = None
+_history_store_lock = threading.Lock()
+
+def get_history_store() -> Optional[HistoryStore]:
+    """Returns the shared store, or None when history is disabled (HISTORY_ENABLED=false)."""
+    global _history_store
+    if not HISTORY_ENABLED:
+        return None
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore()
+        return _history_store
+
+def record_analysis(job_text: str, result: AnalysisResult, **kwargs) -> Optional[int]:
+    """Records an analysis in the shared store; failures are logged, never raised."""
+    store = get_history_store()
+    if store is None:
+        return None
+    try:
+        return store.record(job_text, result, **kwargs)
+    except Exception as e:
+        logger.warning(f"Could not record analysis in history: {e}")
+        return None
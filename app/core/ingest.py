@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.agent import CareerAgent
+from app.core.pipeline import BatchItem, BatchPipeline
+from app.core.storage import connect_sqlite, get_storage_dir
+from app.core.tracing import span
+from app.tools.feeds import FeedPosting, FeedSource, fetch_postings
+
+logger = logging.getLogger(__name__)
+
+# Postings handed to the pipeline at once: bounds memory and queues, the stage limits do the rest
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "10"))
+# A posting that keeps failing is given up after this many runs
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# Seen IDs are forgotten after this; the per-source high-water mark still skips old postings
+INGEST_SEEN_RETENTION_DAYS = float(os.getenv("INGEST_SEEN_RETENTION_DAYS", "90"))
+# Verdicts written to the notification file
+INGEST_NOTIFY_MIN_SCORE = int(os.getenv("INGEST_NOTIFY_MIN_SCORE", "70"))
+INGEST_NOTIFY_VERDICTS = ("STRONGLY_APPLY", "APPLY")
+INGEST_NOTIFY_MAX_MB = float(os.getenv("INGEST_NOTIFY_MAX_MB", "5"))
+# Longest wait between polls of a failing source
+MAX_BACKOFF_S = 24 * 3600
+MAINTENANCE_INTERVAL_S = 6 * 3600
+
+class IngestReport(BaseModel):
+    polled: List[str] = []
+    failed_sources: Dict[str, str] = {}
+    new: int = 0
+    analyzed: int = 0
+    failed: int = 0
+    notified: int = 0
+
+class IngestState:
+    """Per-source polling schedule and high-water mark, and the postings already processed."""
+
+    def __init__(self, filename: str = "ingest.sqlite"):
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS seen_postings (
+                    source TEXT NOT NULL,
+                    posting_id TEXT NOT NULL,
+                    url TEXT,
+                    published REAL,
+                    first_seen REAL NOT NULL,
+                    status TEXT NOT NULL, -- done, failed
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    verdict TEXT,
+                    match_score INTEGER,
+                    PRIMARY KEY (source, posting_id)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_postings_first_seen ON seen_postings (first_seen)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS source_state (
+                    source TEXT PRIMARY KEY,
+                    high_water REAL,
+                    last_polled REAL,
+                    next_poll REAL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT
+                )
+                """
+            )
+
+    def next_poll(self, source: str) -> float:
+        with self._lock:
+            row = self._conn.execute("SELECT next_poll FROM source_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row and row[0] else 0.0
+
+    def high_water(self, source: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT high_water FROM source_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def polled(self, source: FeedSource, error: Optional[str] = None) -> None:
+        """Schedules the next poll; failing sources back off exponentially."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT failures FROM source_state WHERE source = ?", (source.name,)).fetchone()
+            failures = (row[0] if row else 0) + 1 if error else 0
+            delay = min(MAX_BACKOFF_S, source.interval_minutes * 60 * (2 ** min(failures, 6)))
+            self._conn.execute(
+                """
+                INSERT INTO source_state (source, last_polled, next_poll, failures, last_error) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET last_polled = excluded.last_polled, next_poll = excluded.next_poll,
+                    failures = excluded.failures, last_error = excluded.last_error
+                """,
+                (source.name, now, now + delay, failures, error),
+            )
+
+    def advance_high_water(self, source: str, published: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO source_state (source, high_water) VALUES (?, ?)
+                ON CONFLICT(source) DO UPDATE SET high_water = MAX(COALESCE(high_water, 0), excluded.high_water)
+                """,
+                (source, published),
+            )
+
+    def new_postings(self, source: str, postings: List[FeedPosting]) -> List[FeedPosting]:
+        """Postings not processed yet: unseen and newer than the high-water mark, or failed with retries left."""
+        if not postings:
+            return []
+        high_water = self.high_water(source)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT posting_id, status, attempts FROM seen_postings WHERE source = ? AND posting_id IN ({', '.join('?' for _ in postings)})",
+                [source] + [posting.id for posting in postings],
+            ).fetchall()
+        seen = {posting_id: (status, attempts) for posting_id, status, attempts in rows}
+        fresh = []
+        for posting in postings:
+            if posting.id in seen:
+                status, attempts = seen[posting.id]
+                if status == "failed" and attempts < INGEST_MAX_ATTEMPTS:
+                    fresh.append(posting)
+            elif not (high_water and posting.published and posting.published <= high_water):
+                fresh.append(posting)
+        return fresh
+
+    def record(self, posting: FeedPosting, item: BatchItem) -> None:
+        status = "done" if item.result is not None and item.result.verdict != "ERROR" else "failed"
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO seen_postings (source, posting_id, url, published, first_seen, status, attempts, verdict, match_score)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(source, posting_id) DO UPDATE SET status = excluded.status, attempts = attempts + 1,
+                    verdict = excluded.verdict, match_score = excluded.match_score
+                """,
+                (
+                    posting.source, posting.id, posting.url, posting.published, time.time(), status,
+                    item.result.verdict if item.result else None, item.result.match_score if item.result else None,
+                ),
+            )
+
+    def prune(self) -> int:
+        """Forgets postings first seen before the retention window."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM seen_postings WHERE first_seen < ?", (time.time() - INGEST_SEEN_RETENTION_DAYS * 86400,)
+            )
+        return cursor.rowcount
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT s.source, s.last_polled, s.next_poll, s.failures, s.last_error,
+                       (SELECT COUNT(*) FROM seen_postings p WHERE p.source = s.source) AS seen
+                FROM source_state s ORDER BY s.source
+                """
+            ).fetchall()
+        names = ["source", "last_polled", "next_poll", "failures", "last_error", "seen"]
+        return [dict(zip(names, row)) for row in rows]
+
+class NotificationFile:
+    """Appends good matches as JSON lines, rotating the file to '.1' when it grows past max_mb."""
+
+    def __init__(self, path: Optional[Path] = None, max_mb: float = INGEST_NOTIFY_MAX_MB):
+        self.path = Path(path or os.getenv("INGEST_NOTIFY_FILE", "") or get_storage_dir() / "notifications.jsonl")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                self.path.replace(self.path.with_suffix(self.path.suffix + ".1"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+class IngestService:
+    """
+    Polls job feeds on their schedules and runs only the new postings through the batch
+    pipeline, a few at a time. Analyses land in the history store; good matches are also
+    appended to the notification file.
+    """
+
+    def __init__(
+        self,
+        agent: CareerAgent,
+        sources: List[FeedSource],
+        state: Optional[IngestState] = None,
+        notifications: Optional[NotificationFile] = None,
+        min_score: int = INGEST_NOTIFY_MIN_SCORE,
+        batch_size: int = INGEST_BATCH_SIZE,
+    ):
+        self.sources = sources
+        self.pipeline = BatchPipeline(agent)
+        self.state = state or IngestState()
+        self.notifications = notifications or NotificationFile()
+        self.min_score = min_score
+        self.batch_size = max(1, batch_size)
+        self._last_maintenance = 0.0
+
+    def run_once(self, force: bool = False) -> IngestReport:
+        """Polls every due source (all of them with force=True) and processes what is new."""
+        report = IngestReport()
+        now = time.time()
+        for source in self.sources:
+            if force or self.state.next_poll(source.name) <= now:
+                self._poll(source, report)
+        return report
+
+    def _poll(self, source: FeedSource, report: IngestReport) -> None:
+        with span("ingest.poll", source=source.name, type=source.type) as poll_span:
+            try:
+                postings = fetch_postings(source)
+            except Exception as e:
+                logger.warning(f"Feed '{source.name}' failed: {e}")
+                self.state.polled(source, error=str(e)[:500])
+                report.failed_sources[source.name] = str(e)[:200]
+                poll_span.set(error=str(e)[:200])
+                return
+            self.state.polled(source)
+            report.polled.append(source.name)
+
+            new = self.state.new_postings(source.name, postings)
+            poll_span.set(postings=len(postings), new=len(new))
+            report.new += len(new)
+            if new:
+                logger.info(f"Feed '{source.name}': {len(new)} new of {len(postings)} postings")
+            # Oldest first, so the high-water mark only moves past processed postings
+            new.sort(key=lambda posting: posting.published or 0)
+            for start in range(0, len(new), self.batch_size):
+                self._process(new[start:start + self.batch_size], report)
+
+    def _process(self, postings: List[FeedPosting], report: IngestReport) -> None:
+        items = []
+        for index, posting in enumerate(postings):
+            metadata = {"title": posting.title} if posting.title else {}
+            if posting.company:
+                metadata["hiring_organization"] = posting.company
+            items.append(BatchItem(
+                index=index,
+                source=posting.url or f"{posting.source}:{posting.id}",
+                url=posting.url,
+                text=posting.text,
+                metadata=metadata,
+            ))
+
+        def on_item(item: BatchItem, done: int, total: int) -> None:
+            posting = postings[item.index]
+            self.state.record(posting, item)
+            if item.error or item.result is None or item.result.verdict == "ERROR":
+                report.failed += 1
+                return
+            report.analyzed += 1
+            if item.result.verdict in INGEST_NOTIFY_VERDICTS and item.result.match_score >= self.min_score:
+                self._notify(posting, item)
+                report.notified += 1
+
+        self.pipeline.run_items(items, on_item=on_item)
+        processed = [posting.published for posting in postings if posting.published]
+        if processed:
+            self.state.advance_high_water(postings[0].source, max(processed))
+
+    def _notify(self, posting: FeedPosting, item: BatchItem) -> None:
+        result = item.result
+        self.notifications.write({
+            "time": time.time(),
+            "source": posting.source,
+            "url": posting.url,
+            "title": posting.title or item.metadata.get("title"),
+            "company": item.company_name or posting.company,
+            "verdict": result.verdict,
+            "match_score": result.match_score,
+            "summary": result.reasoning_summary,
+        })
+        logger.info(f"Match: {result.verdict} ({result.match_score}%) {posting.title or posting.url}")
+
+    def maintenance(self) -> None:
+        """Keeps the on-disk state bounded when running for weeks."""
+        from app.tools.scrape_session import get_scraper_session
+        pruned = self.state.prune()
+        get_scraper_session().prune()
+        self._last_maintenance = time.time()
+        logger.info(f"Ingest maintenance: forgot {pruned} old postings")
+
+    def seconds_until_next_poll(self) -> float:
+        next_poll = min((self.state.next_poll(source.name) for source in self.sources), default=time.time() + 60)
+        return max(0.0, next_poll - time.time())
+
+    def run_forever(self, stop: threading.Event, idle_s: float = 300.0) -> None:
+        """Polls until `stop` is set, sleeping until the next source is due (at most idle_s)."""
+        while not stop.is_set():
+            if time.time() - self._last_maintenance >= MAINTENANCE_INTERVAL_S:
+                self.maintenance()
+            try:
+                report = self.run_once()
+                if report.polled or report.failed_sources:
+                    logger.info(f"Ingest run: {report.model_dump()}")
+            except Exception as e:
+                logger.error(f"Ingest run failed: {e}")
+            stop.wait(min(idle_s, max(1.0, self.seconds_until_next_poll())))
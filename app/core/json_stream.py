@@ -0,0 +1,227 @@
+import re
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.core.models import AnalysisResult, VERDICTS
+
+logger = logging.getLogger(__name__)
+
+# Fields without which an analysis is asked again (only the missing ones)
+REQUIRED_FIELDS = ("match_score", "verdict", "reasoning_summary", "pros", "cons")
+# Fields without which there is no usable result at all
+ESSENTIAL_FIELDS = ("match_score", "verdict")
+
+def repair_json(raw: str) -> str:
+    """Bounded repairs of one value: line comments and trailing commas."""
+    raw = re.sub(r"^\s*//.*$", "", raw, flags=re.MULTILINE)
+    raw = re.sub(r",\s*\}", "}", raw)
+    return re.sub(r",\s*\]", "]", raw)
+
+def salvage_array(text: str, key: str) -> List[Any]:
+    """The complete elements of a top-level array member `key`, even if the text was cut off inside it."""
+    match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text)
+    if not match:
+        return []
+    decoder = json.JSONDecoder()
+    items, position = [], match.end()
+    while True:
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        if position >= len(text) or text[position] == "]":
+            return items
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            return items
+        items.append(item)
+
+def _normalize_verdict(value: Any) -> str:
+    verdict = re.sub(r"[\s-]+", "_", str(value).strip().upper())
+    if verdict not in VERDICTS:
+        raise ValueError(f"unknown verdict {value!r}")
+    return verdict
+
+def _normalize_score(value: Any) -> int:
+    return max(0, min(100, int(round(float(value)))))
+
+ANALYSIS_NORMALIZERS: Dict[str, Callable[[Any], Any]] = {"verdict": _normalize_verdict, "match_score": _normalize_score}
+
+@lru_cache(maxsize=64)
+def _adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+class StreamingJSONParser:
+    """
+    Incremental parser for one JSON object streamed token by token.
+
+    Each top-level member is parsed and validated against the model's field type as soon as
+    its value is complete, and reported through `on_field(name, value)`; `done` turns True when
+    the object closes, so the caller can stop the generation. Text before the first '{'
+    (chatter, markdown fences) and after the closing '}' is ignored.
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel] = AnalysisResult,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        normalizers: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    ):
+        self.model = model
+        self.on_field = on_field
+        self.normalizers = ANALYSIS_NORMALIZERS if normalizers is None and model is AnalysisResult else (normalizers or {})
+        self.fields: Dict[str, Any] = {}
+        self.invalid: Dict[str, str] = {} # field -> why it was rejected
+        self.started = False
+        self.done = False
+        self._text: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._phase = "key" # key, key_string, colon, value_start, value, after_value
+        self._key_start = 0
+        self._key = ""
+        self._value_start = 0
+        self._value_kind = "" # string, container, literal
+
+    @property
+    def text(self) -> str:
+        return "".join(self._text)
+
+    def feed(self, chunk: str) -> bool:
+        """Consumes a chunk of the stream; returns True once the object is complete."""
+        for char in chunk:
+            if self.done:
+                break
+            self._text.append(char)
+            self._step(char, len(self._text) - 1)
+        return self.done
+
+    def _slice(self, start: int, end: int) -> str:
+        return "".join(self._text[start:end])
+
+    def _step(self, char: str, index: int) -> None:
+        if not self.started:
+            if char == "{":
+                self.started = True
+                self._depth = 1
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._phase == "key_string":
+                    raw_key = self._slice(self._key_start, index + 1)
+                    try:
+                        self._key = json.loads(raw_key)
+                    except ValueError:
+                        self._key = raw_key.strip('"')
+                    self._phase = "colon"
+                elif self._depth == 1 and self._phase == "value" and self._value_kind == "string":
+                    self._emit(self._slice(self._value_start, index + 1))
+            return
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._phase in ("key", "after_value"): # tolerates a missing comma
+                self._key_start, self._phase = index, "key_string"
+            elif self._depth == 1 and self._phase == "value_start":
+                self._value_start, self._value_kind, self._phase = index, "string", "value"
+            return
+
+        if self._depth > 1:
+            if char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._emit(self._slice(self._value_start, index + 1))
+            return
+
+        # Top level of the object
+        if self._phase == "colon":
+            if char == ":":
+                self._phase = "value_start"
+            return
+        if self._phase == "value_start":
+            if char.isspace():
+                return
+            self._value_start, self._phase = index, "value"
+            if char in "[{":
+                self._value_kind = "container"
+                self._depth += 1
+            else:
+                self._value_kind = "literal"
+            return
+        if self._phase == "value" and self._value_kind == "literal":
+            if not (char in ",}" or char.isspace()):
+                return
+            self._emit(self._slice(self._value_start, index))
+        if char == ",":
+            self._phase = "key"
+        elif char == "}":
+            self._depth = 0
+            self.done = True
+        # Anything else between members (comments, stray text) is skipped
+
+    def _emit(self, raw: str) -> None:
+        self._phase = "after_value"
+        name = self._key
+        try:
+            try:
+                value = json.loads(raw)
+            except json.JSONDecodeError:
+                value = json.loads(repair_json(raw))
+            value = self.validate(name, value)
+        except (ValueError, TypeError, ValidationError) as e:
+            self.invalid[name] = str(e).splitlines()[0][:200]
+            logger.debug(f"Rejected streamed field '{name}': {e}")
+            return
+        self.fields[name] = value
+        self.invalid.pop(name, None)
+        if self.on_field and name in self.model.model_fields:
+            self.on_field(name, value)
+
+    def validate(self, name: str, value: Any) -> Any:
+        """The value checked (and coerced) against the model field of that name; unknown names pass."""
+        field = self.model.model_fields.get(name)
+        if field is None:
+            return value
+        if name in self.normalizers:
+            value = self.normalizers[name](value)
+        return _adapter(field.annotation).validate_python(value)
+
+    def missing(self, required=REQUIRED_FIELDS) -> List[str]:
+        return [name for name in required if name not in self.fields]
+
+    def merge(self, other: "StreamingJSONParser", names: List[str]) -> None:
+        """Takes the given fields from another parse (e.g. a re-ask answer)."""
+        for name in names:
+            if name in other.fields:
+                self.fields[name] = other.fields[name]
+                self.invalid.pop(name, None)
+
+    def to_model(self) -> BaseModel:
+        return self.model(**{name: value for name, value in self.fields.items() if name in self.model.model_fields})
+
+def validate_analysis(data: Any, required=REQUIRED_FIELDS) -> AnalysisResult:
+    """An already decoded analysis object (e.g. one element of a batched answer), checked field by field."""
+    if not isinstance(data, dict):
+        raise ValueError(f"expected an object, got {type(data).__name__}")
+    parser = StreamingJSONParser()
+    for name, value in data.items():
+        try:
+            parser.fields[name] = parser.validate(name, value)
+        except (ValueError, TypeError) as e:
+            parser.invalid[name] = str(e).splitlines()[0][:200]
+    missing = parser.missing(required)
+    if missing:
+        raise ValueError(f"missing or invalid fields: {', '.join(missing)} {parser.invalid or ''}".strip())
+    return parser.to_model()
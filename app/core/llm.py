@@ -1,90 +1,249 @@
 import os
 import json
+import time
 import logging
-import requests
-from typing import Optional, Dict, Any
+import threading
+from typing import Callable, Optional, Dict, Any, Iterator, Tuple
+
+from app.core.cache import LLMResponseCache, get_response_cache
+from app.core.ollama import OllamaStats
+from app.core.router import get_llm_router
+from app.core.tracing import Span, span, record_span
 
 logger = logging.getLogger(__name__)
 
+OLLAMA_OPTIONS = {
+    "num_ctx": int(os.getenv("OLLAMA_NUM_CTX", "8192")),
+    "temperature": 0.1,
+    "num_gpu": 999,
+    "num_predict": int(os.getenv("OLLAMA_NUM_PREDICT", "2048"))
+}
+# How long Ollama keeps the model (and its prompt KV cache) loaded after a request
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# After `stop_when`, tokens read and dropped while waiting for Ollama's final chunk (the one with the stats);
+# past either bound the request is aborted instead
+STREAM_DRAIN_MAX_TOKENS = int(os.getenv("LLM_STREAM_DRAIN_TOKENS", "8"))
+STREAM_DRAIN_TIMEOUT_S = float(os.getenv("LLM_STREAM_DRAIN_TIMEOUT_S", "2"))
+
+# Providers served through the LLM router (see app.core.router)
+ROUTED_PROVIDERS = ("ollama", "fake")
+
 class LLMClient:
     def __init__(self):
         self.provider = os.getenv("LLM_PROVIDER", "ollama")
-        self.ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        self.ollama_model = os.getenv("OLLAMA_MODEL", "llama3")
+        self.router = get_llm_router()
         self.gemini_key = os.getenv("GEMINI_API_KEY")
+        # Per thread: the speculative research and batch workers share the client
+        self._local = threading.local()
 
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, json_mode: bool = False) -> str:
+    @property
+    def last_stats(self) -> Optional[OllamaStats]:
+        """Stats of the last completion this thread got from Ollama (None for cache hits)."""
+        return getattr(self._local, "stats", None)
+
+    @last_stats.setter
+    def last_stats(self, stats: Optional[OllamaStats]) -> None:
+        self._local.stats = stats
+
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        json_mode: bool = False,
+        use_cache: bool = True,
+        options: Optional[Dict[str, Any]] = None,
+        task: str = "analyze",
+    ) -> str:
         """
         Generates text using the configured LLM provider.
+        Identical requests are answered from the on-disk response cache unless `use_cache` is False.
+        `options` overrides the default Ollama options (e.g. a smaller num_predict).
+        `task` picks the model tier (e.g. "extract" goes to the small model).
         """
-        if self.provider == "ollama":
-            return self._call_ollama(prompt, system_prompt, json_mode)
+        if self.provider in ROUTED_PROVIDERS:
+            return self._call_ollama(prompt, system_prompt, json_mode, use_cache, options, task)
         elif self.provider == "gemini":
              # Placeholder for Gemini implementation
             return "Gemini support not fully implemented yet."
         else:
             raise ValueError(f"Unknown LLM Provider: {self.provider}")
 
-    def _call_ollama(self, prompt: str, system_prompt: Optional[str] = None, json_mode: bool = False) -> str:
-        url = f"{self.ollama_base_url}/api/generate"
-        
-        full_prompt = prompt
-        if system_prompt:
-            return self._call_ollama_chat(prompt, system_prompt, json_mode)
-
-        payload = {
-            "model": self.ollama_model,
-            "prompt": full_prompt,
-            "stream": False,
-            "options": {
-                "num_ctx": 8192,
-                "temperature": 0.1,
-                "num_gpu": 999,
-                "num_predict": 2048
-            }
-        }
-        
-        if json_mode:
-            payload["format"] = "json"
+    def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        json_mode: bool = False,
+        use_cache: bool = True,
+        options: Optional[Dict[str, Any]] = None,
+        task: str = "analyze",
+        stop_when: Optional[Callable[[str], bool]] = None,
+    ) -> Iterator[str]:
+        """
+        Yields tokens as they are generated. Cached responses are yielded in one piece.
+        Unlike `generate`, transport errors are raised to the caller.
+        After each token is consumed, `stop_when(token)` ends the output early: the rest of the
+        stream is drained (within a small bound) so the final stats still arrive, otherwise the
+        HTTP stream is closed, which makes Ollama stop. Only complete answers are cached: the
+        stream reached Ollama's final chunk without hitting num_predict, or `stop_when` ended it.
+        """
+        if self.provider not in ROUTED_PROVIDERS:
+            yield self.generate(prompt, system_prompt, json_mode, use_cache, options, task)
+            return
+
+        endpoint, payload = self._ollama_request(prompt, system_prompt, json_mode, options, task)
+        cache = get_response_cache() if use_cache else None
+        key = LLMResponseCache.make_key(endpoint, payload) if cache else None
+        with span("llm.stream", endpoint=endpoint, model=payload["model"], task=task, prompt_chars=len(prompt) + len(system_prompt or "")) as llm_span:
+            if cache:
+                cached = cache.get(key)
+                if cached is not None:
+                    self.last_stats = None
+                    llm_span.set(cache_hit=True, output_chars=len(cached))
+                    yield cached
+                    return
+
+            stream = self.router.stream(endpoint, payload)
+            tokens = []
+            stopped = False
+            try:
+                for token in stream:
+                    tokens.append(token)
+                    yield token
+                    if stop_when and stop_when(token):
+                        stopped = True
+                        llm_span.set(stopped_early=True, drained=self._drain(stream))
+                        break
+            finally:
+                stream.close()
+                llm_span.set(backend=stream.backend_name)
+            self.last_stats = stream.stats
+            self._log_stats()
 
+            text = "".join(tokens)
+            self._trace_stats(llm_span, text)
+            if cache and text and (stopped or self._complete(stream.stats)):
+                cache.set(key, text)
+
+    @staticmethod
+    def _complete(stats: Optional[OllamaStats]) -> bool:
+        """The completion reached Ollama's final chunk and was not cut by num_predict."""
+        return stats is not None and not stats.truncated
+
+    @staticmethod
+    def _drain(stream) -> bool:
+        """Drops the tokens left after the caller stopped; False if the final chunk did not come within the bound."""
+        deadline = time.monotonic() + STREAM_DRAIN_TIMEOUT_S
         try:
-            response = requests.post(url, json=payload, timeout=120)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("response", "")
+            for count, _ in enumerate(stream, 1):
+                if count >= STREAM_DRAIN_MAX_TOKENS or time.monotonic() > deadline:
+                    return False
         except Exception as e:
-            logger.error(f"Ollama API Error: {e}")
-            return f"Error calling Ollama: {str(e)}"
+            # The caller already has what it needs
+            logger.debug(f"Stream failed while draining: {e}")
+            return False
+        return True
 
-    def _call_ollama_chat(self, prompt: str, system_prompt: str, json_mode: bool = False) -> str:
-        url = f"{self.ollama_base_url}/api/chat"
-        
-        messages = []
+    def _ollama_request(
+        self, prompt: str, system_prompt: Optional[str], json_mode: bool, options: Optional[Dict[str, Any]] = None, task: str = "analyze"
+    ) -> Tuple[str, Dict[str, Any]]:
+        model = self.router.model_for(task)
         if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        messages.append({"role": "user", "content": prompt})
-
-        payload = {
-            "model": self.ollama_model,
-            "messages": messages,
-            "stream": False,
-            "options": {
-                "num_ctx": 8192,
-                "temperature": 0.1,
-                "num_gpu": 999,
-                "num_predict": 2048
+            endpoint = "/api/chat"
+            payload = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
             }
-        }
-        
+        else:
+            endpoint = "/api/generate"
+            payload = {"model": model, "prompt": prompt}
+
+        payload["options"] = {**OLLAMA_OPTIONS, **(options or {})}
+        payload["keep_alive"] = OLLAMA_KEEP_ALIVE
         if json_mode:
             payload["format"] = "json"
+        return endpoint, payload
+
+    def preload(self, system_prompt: str) -> Optional[OllamaStats]:
+        """
+        Loads the model and evaluates a system prompt without generating, so the
+        next request sharing that prefix skips most of its prompt evaluation.
+        Every backend serving the analysis model is warmed.
+        """
+        if self.provider not in ROUTED_PROVIDERS:
+            return None
+        endpoint, payload = self._ollama_request("", system_prompt, json_mode=False, options={"num_predict": 1})
+        self.last_stats = self.router.preload(endpoint, payload)
+        return self.last_stats
 
+    def _call_ollama(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        json_mode: bool = False,
+        use_cache: bool = True,
+        options: Optional[Dict[str, Any]] = None,
+        task: str = "analyze",
+    ) -> str:
+        endpoint, payload = self._ollama_request(prompt, system_prompt, json_mode, options, task)
         try:
-            response = requests.post(url, json=payload, timeout=120)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("message", {}).get("content", "")
+            return self._complete_cached(endpoint, payload, use_cache)
         except Exception as e:
-             logger.error(f"Ollama Chat API Error: {e}")
-             return f"Error calling Ollama Chat: {str(e)}"
+            logger.error(f"Ollama API Error ({endpoint}): {e}")
+            return f"Error calling Ollama: {str(e)}"
+
+    def _complete_cached(self, endpoint: str, payload: Dict[str, Any], use_cache: bool) -> str:
+        """Runs a completion through the response cache. Failed or truncated completions are never cached."""
+        cache = get_response_cache() if use_cache else None
+        key = LLMResponseCache.make_key(endpoint, payload) if cache else None
+        prompt_chars = sum(len(m["content"]) for m in payload.get("messages", [])) + len(payload.get("prompt", ""))
+        with span("llm.generate", endpoint=endpoint, model=payload["model"], prompt_chars=prompt_chars) as llm_span:
+            if cache:
+                cached = cache.get(key)
+                if cached is not None:
+                    logger.info("LLM cache hit")
+                    self.last_stats = None
+                    llm_span.set(cache_hit=True, output_chars=len(cached))
+                    return cached
+
+            text, self.last_stats, backend = self.router.complete(endpoint, payload)
+            llm_span.set(backend=backend)
+            self._log_stats()
+            self._trace_stats(llm_span, text)
+
+            if cache and text and self._complete(self.last_stats):
+                cache.set(key, text)
+            elif cache and text:
+                logger.warning(f"Not caching an incomplete completion ({self.last_stats.done_reason if self.last_stats else 'no final chunk'})")
+            return text
+
+    def _trace_stats(self, llm_span: Span, text: str) -> None:
+        """Attaches Ollama token counts to the span and adds its prompt-eval and generation phases."""
+        llm_span.set(cache_hit=False, output_chars=len(text))
+        stats = self.last_stats
+        if not stats:
+            return
+        llm_span.set(
+            prompt_eval_count=stats.prompt_eval_count,
+            prompt_eval_s=round(stats.prompt_eval_duration_s, 3),
+            eval_count=stats.eval_count,
+            eval_s=round(stats.eval_duration_s, 3),
+            tokens_per_second=round(stats.tokens_per_second, 1),
+            time_to_first_token_s=stats.time_to_first_token_s,
+        )
+        # Ollama reports durations, not timestamps: evaluation ends where generation starts
+        end_ns = time.time_ns()
+        generation_start = end_ns - int(stats.eval_duration_s * 1e9)
+        record_span("ollama.prompt_eval", generation_start - int(stats.prompt_eval_duration_s * 1e9), generation_start, tokens=stats.prompt_eval_count)
+        record_span("ollama.generation", generation_start, end_ns, tokens=stats.eval_count)
+
+    def _log_stats(self) -> None:
+        stats = self.last_stats
+        if stats:
+            logger.info(
+                f"Ollama: {stats.latency_s:.1f}s total, prompt eval {stats.prompt_eval_count} tok "
+                f"in {stats.prompt_eval_duration_s:.1f}s, {stats.eval_count} tok at {stats.tokens_per_second:.1f} tok/s"
+            )
@@ -1,6 +1,8 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Union
 from pydantic import BaseModel, Field
 
+from app.core.ollama import OllamaStats
+
 # --- Portfolio Models ---
 
 class PersonalInfo(BaseModel):
@@ -19,6 +21,26 @@ class Project(BaseModel):
     description: str
     technologies: List[str] = []
     business_impact: Optional[str] = None
+    company_ref: Optional[str] = None
+    duration: Optional[str] = None
+    key_responsibilities: List[str] = []
+    achievements: List[str] = []
+
+class Position(BaseModel):
+    role: str
+    duration: Optional[str] = None
+    location: Optional[str] = None
+    projects_worked_on: List[str] = []
+
+class Company(BaseModel):
+    id: str
+    name: str
+    positions: List[Position] = []
+
+class ExpertiseLevel(BaseModel):
+    level: str
+    years: Optional[Union[int, str]] = None # e.g. 5 or "15+"
+    note: Optional[str] = None
 
 class SkillCategory(BaseModel):
     category: str
@@ -36,6 +58,8 @@ class Portfolio(BaseModel):
     projects: Dict[str, Project]
     skills: List[SkillCategory]
     professional_conditions: ProfessionalConditions
+    companies: Dict[str, Company] = {}
+    expertise_levels: Dict[str, ExpertiseLevel] = {}
     class Config:
         extra = "ignore" 
 
@@ -47,16 +71,20 @@ class JobOffer(BaseModel):
     company_name: Optional[str] = None
     title: Optional[str] = None
     is_remote: bool = False
+    work_mode: Optional[str] = None # remote, hybrid, onsite
     salary_min: Optional[float] = None
     salary_max: Optional[float] = None
     currency: str = "EUR"
     visa_sponsorship: Optional[bool] = None
+    signals: List[str] = [] # Phrases that drove the extracted values
     
 class HardFilterStatus(BaseModel):
     remote_pass: bool = True
     visa_pass: bool = True
     salary_pass: bool = True
 
+VERDICTS = ("STRONGLY_APPLY", "APPLY", "CONSIDER", "IGNORE")
+
 class AnalysisResult(BaseModel):
     match_score: int = 0
     verdict: str = "PENDING" # STRONGLY_APPLY, APPLY, CONSIDER, IGNORE
@@ -64,3 +92,23 @@ class AnalysisResult(BaseModel):
     pros: List[str] = []
     cons: List[str] = []
     hard_filter_check: Optional[HardFilterStatus] = None
+
+class StagedAnalysis(BaseModel):
+    """An analysis together with the intermediate data and per-stage timings (seconds)."""
+    result: AnalysisResult
+    mode: str = "serial" # serial, speculative, duplicate
+    company_name: str = ""
+    research_context: str = ""
+    red_flags: List[str] = []
+    reconciliation: Optional[str] = None # None, adjust, rerun
+    duplicate_of: Optional[int] = None # id of the near-duplicate offer in the dedup index
+    similarity: Optional[float] = None
+    changed_fields: List[str] = [] # key facts that changed since the duplicate was analyzed
+    previous_result: Optional[AnalysisResult] = None # the duplicate's result, when it could not be reused
+    timings: Dict[str, float] = {}
+    llm_stats: Optional[OllamaStats] = None # Ollama stats of the call that produced `result` (None if cached or reused)
+
+    @property
+    def serial_seconds(self) -> float:
+        """Wall-clock time the same stages would take one after another."""
+        return sum(v for k, v in self.timings.items() if k != "total")
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+NANOSECONDS = 1_000_000_000
+
+class OllamaStats(BaseModel):
+    """Timing stats of one completion, taken from Ollama's final stream chunk."""
+    latency_s: float = 0.0
+    time_to_first_token_s: Optional[float] = None
+    load_duration_s: float = 0.0
+    prompt_eval_count: int = 0
+    prompt_eval_duration_s: float = 0.0
+    eval_count: int = 0
+    eval_duration_s: float = 0.0
+    total_duration_s: float = 0.0
+    done_reason: Optional[str] = None # "stop", or "length" when num_predict cut the completion
+
+    @property
+    def truncated(self) -> bool:
+        return self.done_reason == "length"
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.eval_count / self.eval_duration_s if self.eval_duration_s else 0.0
+
+    @property
+    def prompt_tokens_per_second(self) -> float:
+        return self.prompt_eval_count / self.prompt_eval_duration_s if self.prompt_eval_duration_s else 0.0
+
+    @classmethod
+    def from_chunk(cls, chunk: Dict[str, Any], latency_s: float, ttft_s: Optional[float]) -> "OllamaStats":
+        return cls(
+            latency_s=latency_s,
+            time_to_first_token_s=ttft_s,
+            load_duration_s=chunk.get("load_duration", 0) / NANOSECONDS,
+            prompt_eval_count=chunk.get("prompt_eval_count", 0),
+            prompt_eval_duration_s=chunk.get("prompt_eval_duration", 0) / NANOSECONDS,
+            eval_count=chunk.get("eval_count", 0),
+            eval_duration_s=chunk.get("eval_duration", 0) / NANOSECONDS,
+            total_duration_s=chunk.get("total_duration", 0) / NANOSECONDS,
+            done_reason=chunk.get("done_reason"),
+        )
+
+def _chunk_token(chunk: Dict[str, Any]) -> str:
+    # /api/generate streams {"response": ...}, /api/chat streams {"message": {"content": ...}}
+    if "response" in chunk:
+        return chunk["response"]
+    return chunk.get("message", {}).get("content", "")
+
+class TokenStream:
+    """
+    Async iterator over the tokens of one streamed completion.
+    `stats` is available once the stream is exhausted. Closing the stream early
+    closes the HTTP response, which makes Ollama stop generating.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, endpoint: str, payload: Dict[str, Any]):
+        self._client = client
+        self._endpoint = endpoint
+        self._payload = {**payload, "stream": True}
+        self._iterator = None
+        self.stats: Optional[OllamaStats] = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        if self._iterator is None:
+            self._iterator = self._iterate()
+        return self._iterator
+
+    async def aclose(self) -> None:
+        if self._iterator is not None:
+            await self._iterator.aclose()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        ttft = None
+        async with self._client.stream("POST", self._endpoint, json=self._payload) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                token = _chunk_token(chunk)
+                if token:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield token
+                if chunk.get("done"):
+                    self.stats = OllamaStats.from_chunk(chunk, time.perf_counter() - started, ttft)
+                    break
+
+class AsyncOllamaClient:
+    """asyncio-native Ollama client sharing one keep-alive connection pool."""
+
+    def __init__(self, base_url: str, max_connections: Optional[int] = None):
+        self.base_url = base_url.rstrip("/")
+        read_timeout = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+        max_connections = max_connections or int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8"))
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            # The read timeout applies between streamed chunks, not to the whole completion
+            timeout=httpx.Timeout(connect=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")), read=read_timeout, write=30.0, pool=None),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def stream(self, endpoint: str, payload: Dict[str, Any]) -> TokenStream:
+        """Streams NDJSON from /api/generate or /api/chat as tokens."""
+        return TokenStream(self._client, endpoint, payload)
+
+    async def complete(self, endpoint: str, payload: Dict[str, Any]):
+        """Returns (text, stats) for a full completion."""
+        stream = self.stream(endpoint, payload)
+        tokens = [token async for token in stream]
+        return "".join(tokens), stream.stats
+
+    async def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        """One embedding per text, from /api/embed (a single batched request)."""
+        response = await self._client.post("/api/embed", json={"model": model, "input": texts})
+        response.raise_for_status()
+        data = response.json()
+        if "error" in data:
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        return data["embeddings"]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+class _EventLoopThread:
+    """Background event loop so sync callers (Streamlit, worker threads) share the async pool."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="ollama-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+class SyncTokenStream:
+    """Blocking iterator facade over a TokenStream."""
+
+    def __init__(self, runner: _EventLoopThread, stream: TokenStream):
+        self._runner = runner
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+
+    @property
+    def stats(self) -> Optional[OllamaStats]:
+        return self._stream.stats
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return self._runner.run(self._iterator.__anext__())
+        except StopAsyncIteration:
+            raise StopIteration
+
+    def close(self) -> None:
+        self._runner.run(self._stream.aclose())
+
+class OllamaClient:
+    """Sync facade over AsyncOllamaClient."""
+
+    def __init__(self, base_url: str):
+        self._runner = _EventLoopThread()
+        self.aio = self._runner.run(self._create(base_url))
+
+    @staticmethod
+    async def _create(base_url: str) -> AsyncOllamaClient:
+        # httpx binds the pool to the loop it is created on
+        return AsyncOllamaClient(base_url)
+
+    def stream(self, endpoint: str, payload: Dict[str, Any]) -> SyncTokenStream:
+        return SyncTokenStream(self._runner, self.aio.stream(endpoint, payload))
+
+    def complete(self, endpoint: str, payload: Dict[str, Any]):
+        return self._runner.run(self.aio.complete(endpoint, payload))
+
+    def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        return self._runner.run(self.aio.embed(model, texts))
+
+_clients: Dict[str, OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+def get_ollama_client(base_url: str) -> OllamaClient:
+    """Returns the process-wide pooled client for an Ollama base URL."""
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = OllamaClient(base_url)
+        return _clients[base_url]
@@ -0,0 +1,191 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.agent import CareerAgent, is_researchable_company
+from app.core.models import AnalysisResult
+from app.core.history import record_analysis
+from app.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("scrape", "research", "llm")
+
+def default_concurrency() -> Dict[str, int]:
+    """Per-stage limits from the environment, read when a pipeline is built (after .env is loaded)."""
+    return {
+        "scrape": int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "8")),
+        "research": int(os.getenv("BATCH_RESEARCH_CONCURRENCY", "4")),
+        # 0: as many as the LLM backends have slots (see app.core.router)
+        "llm": int(os.getenv("BATCH_LLM_CONCURRENCY", "0")),
+    }
+
+class BatchItem(BaseModel):
+    index: int
+    source: str
+    url: Optional[str] = None
+    text: str = ""
+    metadata: Dict[str, str] = {}
+    company_name: Optional[str] = None
+    research_context: str = ""
+    result: Optional[AnalysisResult] = None
+    duplicate_of: Optional[int] = None # offer id in the dedup index whose result was reused
+    error: Optional[str] = None
+    timings: Dict[str, float] = {}
+
+class BatchReport(BaseModel):
+    items: List[BatchItem]
+    elapsed_seconds: float
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for item in self.items if item.result is not None)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for item in self.items if item.error is not None)
+
+    @property
+    def offers_per_minute(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.completed * 60.0 / self.elapsed_seconds
+
+def is_url(value: str) -> bool:
+    return value.strip().lower().startswith(("http://", "https://"))
+
+def build_items(inputs: Iterable[str]) -> List[BatchItem]:
+    """Turns raw inputs (URLs or pasted job texts) into pipeline items."""
+    items = []
+    for raw in inputs:
+        raw = raw.strip()
+        if not raw:
+            continue
+        index = len(items)
+        if is_url(raw):
+            items.append(BatchItem(index=index, source=raw, url=raw))
+        else:
+            items.append(BatchItem(index=index, source=f"Texto #{index + 1}", text=raw))
+    return items
+
+class BatchPipeline:
+    """
+    Runs many offers through scrape -> research -> LLM analysis.
+    Every offer advances independently, so stages overlap across offers, while each
+    stage is bounded by its own semaphore (I/O stages wide, LLM calls rationed).
+    """
+
+    def __init__(self, agent: CareerAgent, concurrency: Optional[Dict[str, int]] = None):
+        self.agent = agent
+        self.concurrency = default_concurrency()
+        self.concurrency.update(concurrency or {})
+        if not self.concurrency["llm"]:
+            self.concurrency["llm"] = agent.llm.router.capacity
+        self._limits = {stage: threading.BoundedSemaphore(max(1, self.concurrency[stage])) for stage in STAGES}
+
+    def run(
+        self,
+        inputs: Iterable[str],
+        on_item: Optional[Callable[[BatchItem, int, int], None]] = None,
+    ) -> BatchReport:
+        """
+        Processes all inputs and returns the report once every item has finished.
+        `on_item(item, done, total)` is called from the caller's thread as items complete.
+        """
+        return self.run_items(build_items(inputs), on_item)
+
+    def run_items(
+        self,
+        items: List[BatchItem],
+        on_item: Optional[Callable[[BatchItem, int, int], None]] = None,
+    ) -> BatchReport:
+        """Like `run` for prepared items; items with a URL and text already (e.g. from a feed) are not scraped."""
+        total = len(items)
+        workers = max(1, sum(self.concurrency[stage] for stage in STAGES))
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(self._process, item) for item in items]
+            for done, future in enumerate(as_completed(futures), start=1):
+                item = future.result()
+                if on_item:
+                    on_item(item, done, total)
+
+        report = BatchReport(items=items, elapsed_seconds=time.perf_counter() - started)
+        logger.info(
+            f"Batch finished: {report.completed}/{total} analyzed, {report.failed} failed, "
+            f"{report.offers_per_minute:.1f} offers/min"
+        )
+        return report
+
+    def _stage(self, stage: str, item: BatchItem, label: str, func: Callable, *args):
+        with span(f"batch.{label}", stage=stage) as stage_span:
+            queued = time.perf_counter()
+            with self._limits[stage]:
+                started = time.perf_counter()
+                stage_span.set(wait_s=round(started - queued, 3))
+                try:
+                    return func(*args)
+                finally:
+                    item.timings[label] = time.perf_counter() - started
+
+    def _process(self, item: BatchItem) -> BatchItem:
+        with span("batch.item", source=item.source[:200]) as item_span:
+            self._process_item(item)
+            item_span.set(verdict=item.result.verdict if item.result else None, error=item.error)
+        if item.result and item.result.verdict != "ERROR" and item.duplicate_of is None:
+            record_analysis(
+                item.text,
+                item.result,
+                url=item.url,
+                company_name=item.company_name,
+                title=item.metadata.get("title"),
+                research_context=item.research_context,
+                llm_used="analyze" in item.timings,
+            )
+        return item
+
+    def _process_item(self, item: BatchItem) -> None:
+        try:
+            if item.url and not item.text:
+                from app.tools.scraper import scrape_job_page
+                page = self._stage("scrape", item, "scrape", scrape_job_page, item.url)
+                item.metadata = {**item.metadata, **page.metadata}
+                item.text = page.text
+
+            started = time.perf_counter()
+            item.result = self.agent.prefilter(item.text, url=item.url)
+            item.timings["prefilter"] = time.perf_counter() - started
+            if item.result:
+                return
+
+            started = time.perf_counter()
+            duplicate = self.agent.find_duplicate(item.text)
+            item.timings["dedup"] = time.perf_counter() - started
+            if duplicate and duplicate.reusable:
+                item.result = duplicate.result
+                item.duplicate_of = duplicate.offer_id
+                item.company_name = duplicate.company_name
+                return
+
+            # Local extraction needs no LLM slot; only the fallback is rationed
+            item.company_name = self.agent.extract_company_name_local(item.text, item.url, item.metadata)
+            if not item.company_name:
+                item.company_name = self._stage(
+                    "llm", item, "company", self.agent.extract_company_name, item.text, item.url, item.metadata
+                )
+            if is_researchable_company(item.company_name):
+                item.research_context = self._stage(
+                    "research", item, "research", self.agent.perform_research, item.company_name
+                )
+
+            item.result = self._stage("llm", item, "analyze", self.agent.analyze, item.text, item.research_context)
+            self.agent.remember(item.text, item.result, url=item.url, company_name=item.company_name)
+        except Exception as e:
+            logger.error(f"Batch item failed ({item.source}): {e}")
+            item.error = str(e)
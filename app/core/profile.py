@@ -1,19 +1,65 @@
+import json
+import hashlib
+import logging
+import threading
 import yaml
 from pathlib import Path
+from typing import Optional, Tuple
 from app.core.models import Portfolio
+from app.core.storage import get_storage_dir
+
+logger = logging.getLogger(__name__)
 
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 portfolio_path = DATA_DIR / "portfolio.yaml"
 
+# In-process cache: (mtime_ns, size) of the YAML -> parsed Portfolio
+_loaded: Optional[Tuple[Tuple[int, int], Portfolio]] = None
+_load_lock = threading.Lock()
+_schema_digest: Optional[str] = None
+
+def _compiled_path(raw: bytes) -> Path:
+    """Compiled artifacts are keyed by YAML content and model schema, so either change invalidates them."""
+    global _schema_digest
+    if _schema_digest is None:
+        schema = json.dumps(Portfolio.model_json_schema(), sort_keys=True).encode("utf-8")
+        _schema_digest = hashlib.sha256(schema).hexdigest()[:8]
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return get_storage_dir() / f"portfolio-{digest}-{_schema_digest}.json"
+
+def _compile_portfolio(raw: bytes) -> Portfolio:
+    compiled = _compiled_path(raw)
+    if compiled.exists():
+        try:
+            return Portfolio.model_validate_json(compiled.read_bytes())
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable compiled portfolio {compiled.name}: {e}")
+
+    portfolio = Portfolio(**yaml.safe_load(raw))
+    tmp = compiled.with_suffix(".tmp")
+    tmp.write_text(portfolio.model_dump_json(), encoding="utf-8")
+    tmp.replace(compiled)
+    logger.info(f"Compiled portfolio to {compiled.name}")
+    return portfolio
+
 def load_portfolio() -> Portfolio:
-    """Loads the portfolio from the YAML file."""
+    """
+    Loads the portfolio from the YAML file.
+    The YAML is only parsed when it changed; otherwise the same Portfolio object is
+    returned (in-process) or read back from its compiled JSON form (new process).
+    """
+    global _loaded
     if not portfolio_path.exists():
         raise FileNotFoundError(f"Portfolio not found at {portfolio_path}")
-    
-    with open(portfolio_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-        
-    return Portfolio(**data)
+
+    stat = portfolio_path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _load_lock:
+        if _loaded is not None and _loaded[0] == version:
+            return _loaded[1]
+        portfolio = _compile_portfolio(portfolio_path.read_bytes())
+        _loaded = (version, portfolio)
+        return portfolio
 
 if __name__ == "__main__":
     # Test execution
@@ -0,0 +1,164 @@
+import os
+import json
+import threading
+from typing import Dict, List, Tuple
+
+from pydantic import BaseModel
+
+from app.core.models import Portfolio
+from app.core.filters import HardFilterRules
+
+NO_RESEARCH = "No external research available."
+
+# "stable": invariant profile + instructions in the system prompt and per-offer data last,
+# so Ollama can reuse the KV cache of the prefix between offers.
+# "legacy": research context embedded in the middle of the system prompt.
+PROMPT_LAYOUTS = ("stable", "legacy")
+RESEARCH_IN_USER_MESSAGE = "(Se incluye en el mensaje del usuario, antes de la descripción de la oferta.)"
+# Replaces the full skills list when the relevant portfolio evidence is retrieved per offer
+SKILLS_IN_USER_MESSAGE = "Ver EVIDENCIA RELEVANTE DEL PORTFOLIO en el mensaje del usuario (proyectos, empresas, skills y niveles más relacionados con la oferta)."
+
+# Rough chars-per-token ratio for Llama 3 on mixed Spanish/English text
+CHARS_PER_TOKEN = 3.5
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def get_prompt_layout() -> str:
+    layout = os.getenv("PROMPT_LAYOUT", "stable").lower()
+    if layout not in PROMPT_LAYOUTS:
+        raise ValueError(f"Unknown prompt layout: {layout}")
+    return layout
+
+SYSTEM_PROMPT_HEAD = """
+        Actúa como un Coach de Carrera y Reclutador Técnico experto para Álvaro (El Candidato).
+        
+        PERFIL CANDIDATO (JSON):
+        {profile_json}
+
+        CONTEXTO INVESTIGACIÓN EMPRESA:
+        """
+
+SYSTEM_PROMPT_TAIL = """
+
+        ESTRATEGIA DE EVALUACIÓN:
+        1. **Filtros Duros (CRÍTICOS)**: 
+           - **Remoto**: Si dice explícitamente "Presencial", "Híbrido (obligatorio)" -> VERDICT: IGNORE.
+           - **Visa**: Si dice "No sponsor", "EU citizens only" -> VERDICT: IGNORE.
+           - **Salario**: Si el max es < {salary_floor} -> VERDICT: IGNORE.
+
+        2. **Ajuste Técnico y Rol (El Score)**:
+           - Analiza gaps entre Skills del Candidato vs Requisitos.
+           - **CRÍTICO: NO ALUCINES NI INVENTES REQUISITOS.**
+             - Solo evalúa stack técnico mencionado explícitamente en la descripción.
+             - Si la oferta NO menciona "Go", NO penalices por falta de Go.
+             - Si la oferta NO menciona "AWS", NO penalices por falta de AWS.
+           - **Si el Score < 100%**: OBLIGATORIAMENTE debes explicar POR QUÉ en 'cons' (ej: "Falta experiencia en Go", "El rol es Junior", "Stack desconocido").
+           - **Si el Score es 100%**: Debe ser un match perfecto en todo.
+
+        INSTRUCCIONES DE SALIDA (ESPAÑOL):
+        - Todos los textos de `reasoning_summary`, `pros` y `cons` DEBEN estar en **ESPAÑOL**.
+        - **PROS**: Sé ESPECÍFICO sobre el match técnico/cultural.
+          - MAL: "Buen salario", "100% remoto".
+          - BIEN: "Tu experiencia de 15 años en Java coincide con el stack core", "Haber sido CTO encaja con el liderazgo requerido".
+        - **CONS**: Gaps técnicos específicos, dudas sobre la empresa o seniority.
+
+        FORMATO OUTPUT (JSON PURO):
+        Debes responder ÚNICAMENTE con el objeto JSON válido.
+        NO escribas texto introductorio (ej: "Here is...").
+        NO uses bloques de código markdown (```json). Devuelve SOLO el RAW JSON.
+        
+        {{
+          "match_score": <int 0-100>,
+          "verdict": "<STRONGLY_APPLY | APPLY | CONSIDER | IGNORE>",
+          "reasoning_summary": "<Explicación detallada en ESPAÑOL>",
+          "pros": ["<Match específico 1>", "<Match específico 2>"],
+          "cons": ["<Gap o Red Flag 1>", "<Gap o Red Flag 2>"],
+          "hard_filter_check": {{
+            "remote_pass": <boolean true/false>,
+            "visa_pass": <boolean true/false>,
+            "salary_pass": <boolean true/false>
+          }}
+        }}
+        """
+
+# Several condensed offers scored in one call; each offer is introduced by BATCH_OFFER_HEADER
+BATCH_OFFER_HEADER = "### OFERTA {number}"
+
+BATCH_INSTRUCTIONS = """EVALÚA CADA UNA DE LAS {count} OFERTAS SIGUIENTES POR SEPARADO, con los mismos criterios.
+Ignora el formato de salida anterior y devuelve ÚNICAMENTE este objeto JSON, con un elemento por oferta y en el mismo orden:
+{{"results": [{{"offer": <número de oferta>, "match_score": <int 0-100>, "verdict": "<STRONGLY_APPLY | APPLY | CONSIDER | IGNORE>", "reasoning_summary": "<1-2 frases en ESPAÑOL>", "pros": ["..."], "cons": ["..."], "hard_filter_check": {{"remote_pass": <bool>, "visa_pass": <bool>, "salary_pass": <bool>}}}}]}}"""
+
+class ProfilePrompt(BaseModel):
+    """Portfolio-derived prompt pieces, built once per portfolio version."""
+    profile_json: str
+    system_head: str
+    system_tail: str
+    stable_system_prompt: str
+
+    def render_system_prompt(self, research_context: str = "") -> str:
+        return self.system_head + (research_context or NO_RESEARCH) + self.system_tail
+
+    def build_messages(self, job_text: str, research_context: str = "", layout: str = "stable", evidence: str = "") -> Tuple[str, str]:
+        """Returns (system_prompt, user_prompt) for one offer in the given layout."""
+        evidence_block = f"EVIDENCIA RELEVANTE DEL PORTFOLIO:\n{evidence}\n\n" if evidence else ""
+        if layout == "legacy":
+            return self.render_system_prompt(research_context), f"{evidence_block}JOB DESCRIPTION:\n{job_text}"
+        user_prompt = (
+            f"CONTEXTO INVESTIGACIÓN EMPRESA:\n{research_context or NO_RESEARCH}\n\n"
+            f"{evidence_block}JOB DESCRIPTION:\n{job_text}"
+        )
+        return self.stable_system_prompt, user_prompt
+
+    def build_batch_messages(self, job_texts: List[str], layout: str = "stable", evidence: str = "") -> Tuple[str, str]:
+        """Returns (system_prompt, user_prompt) scoring several offers at once, without research."""
+        evidence_block = f"EVIDENCIA RELEVANTE DEL PORTFOLIO:\n{evidence}\n\n" if evidence else ""
+        offers = "\n\n".join(f"{BATCH_OFFER_HEADER.format(number=n)}\n{text}" for n, text in enumerate(job_texts, 1))
+        user_prompt = f"{evidence_block}{BATCH_INSTRUCTIONS.format(count=len(job_texts))}\n\n{offers}"
+        if layout == "legacy":
+            return self.render_system_prompt(), user_prompt
+        return self.stable_system_prompt, f"CONTEXTO INVESTIGACIÓN EMPRESA:\n{NO_RESEARCH}\n\n{user_prompt}"
+
+def build_profile_summary(portfolio: Portfolio, rules: HardFilterRules, include_skills: bool = True) -> Dict:
+    return {
+        "name": portfolio.personal_info.name,
+        "title": portfolio.personal_info.title,
+        "summary": portfolio.professional_summary['short'],
+        "hard_filters": {
+            "salary_min": f"{rules.salary_min:.0f} {rules.salary_currency}" if rules.salary_min else "Not specified",
+            "remote": "100% Remote required (or very flexible)" if rules.remote_only else "Remote preferred",
+            "visa": "Needs Sponsorship (Spain/EU) if not already valid" if rules.requires_sponsorship else "No sponsorship needed"
+        },
+        "skills": [s.model_dump() for s in portfolio.skills] if include_skills else SKILLS_IN_USER_MESSAGE,
+    }
+
+def build_profile_prompt(portfolio: Portfolio, rules: HardFilterRules, include_skills: bool = True) -> ProfilePrompt:
+    profile_json = json.dumps(build_profile_summary(portfolio, rules, include_skills), indent=2, ensure_ascii=False)
+    salary_floor = f"{rules.salary_min / 1000:.0f}k {rules.salary_currency}" if rules.salary_min else "el mínimo del candidato"
+    return ProfilePrompt(
+        profile_json=profile_json,
+        system_head=SYSTEM_PROMPT_HEAD.format(profile_json=profile_json),
+        system_tail=SYSTEM_PROMPT_TAIL.format(salary_floor=salary_floor),
+        stable_system_prompt=(
+            SYSTEM_PROMPT_HEAD.format(profile_json=profile_json)
+            + RESEARCH_IN_USER_MESSAGE
+            + SYSTEM_PROMPT_TAIL.format(salary_floor=salary_floor)
+        ),
+    )
+
+# load_portfolio() returns the same object until the YAML changes, so identity is a valid key.
+# The portfolio is kept in the entry so its id cannot be reused while cached.
+_prompt_cache: Dict[Tuple[int, str, bool], Tuple[Portfolio, ProfilePrompt]] = {}
+_prompt_cache_lock = threading.Lock()
+
+def get_profile_prompt(portfolio: Portfolio, rules: HardFilterRules, include_skills: bool = True) -> ProfilePrompt:
+    """Memoized build_profile_prompt."""
+    key = (id(portfolio), rules.model_dump_json(), include_skills)
+    with _prompt_cache_lock:
+        entry = _prompt_cache.get(key)
+        if entry is None:
+            if len(_prompt_cache) >= 8:
+                _prompt_cache.clear()
+            entry = (portfolio, build_profile_prompt(portfolio, rules, include_skills))
+            _prompt_cache[key] = entry
+        return entry[1]
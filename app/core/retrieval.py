@@ -0,0 +1,261 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.models import Portfolio
+from app.core.condense import tokenize
+from app.core.router import get_llm_router
+from app.core.prompts import estimate_tokens
+from app.core.storage import get_storage_dir
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() != "false"
+# "ollama": embeddings from OLLAMA_EMBED_MODEL (falls back to hashing if unavailable). "hashing": local only
+RETRIEVAL_EMBEDDER = os.getenv("RETRIEVAL_EMBEDDER", "ollama")
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+# Prompt budget of the retrieved evidence, in estimated tokens
+RETRIEVAL_MAX_TOKENS = int(os.getenv("RETRIEVAL_MAX_TOKENS", "600"))
+
+HASHING_DIM = 1024
+DOC_MAX_CHARS = 700
+QUERY_MAX_CHARS = 4000
+
+KIND_LABELS = {"project": "Proyecto", "company": "Empresa", "skills": "Skills", "expertise": "Nivel"}
+
+class EvidenceDoc(BaseModel):
+    id: str # e.g. "project:proj_andes"
+    kind: str # project, company, skills, expertise
+    title: str
+    text: str
+
+class Evidence(BaseModel):
+    doc: EvidenceDoc
+    score: float
+
+    def to_line(self) -> str:
+        return f"- [{KIND_LABELS.get(self.doc.kind, self.doc.kind)}] {self.doc.title}: {self.doc.text}"
+
+def _clip(text: str, max_chars: int = DOC_MAX_CHARS) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+def portfolio_documents(portfolio: Portfolio) -> List[EvidenceDoc]:
+    """Projects, companies, skill categories and expertise levels as short, self-contained documents."""
+    docs = []
+    for key, project in portfolio.projects.items():
+        company = portfolio.companies.get(project.company_ref or "")
+        header = ", ".join(part for part in (company.name if company else None, project.duration) if part)
+        parts = [f"Rol: {project.role}.", project.description]
+        if project.technologies:
+            parts.append("Tecnologías: " + ", ".join(project.technologies) + ".")
+        if project.achievements:
+            parts.append("Logros: " + " ".join(project.achievements))
+        if project.business_impact:
+            parts.append("Impacto: " + project.business_impact)
+        title = f"{project.name} ({header})" if header else project.name
+        docs.append(EvidenceDoc(id=f"project:{key}", kind="project", title=title, text=_clip(" ".join(parts))))
+
+    for key, company in portfolio.companies.items():
+        positions = []
+        for position in company.positions:
+            projects = [portfolio.projects[ref].name for ref in position.projects_worked_on if ref in portfolio.projects]
+            line = f"{position.role} ({', '.join(p for p in (position.duration, position.location) if p)})"
+            positions.append(line + (f", proyectos: {', '.join(projects)}" if projects else ""))
+        docs.append(EvidenceDoc(id=f"company:{key}", kind="company", title=company.name, text=_clip("; ".join(positions))))
+
+    for category in portfolio.skills:
+        docs.append(EvidenceDoc(id=f"skills:{category.category}", kind="skills", title=category.category, text=", ".join(category.items)))
+
+    for key, expertise in portfolio.expertise_levels.items():
+        years = f", {expertise.years} años" if expertise.years is not None else ""
+        text = f"{expertise.level}{years}. {expertise.note or ''}".strip()
+        docs.append(EvidenceDoc(id=f"expertise:{key}", kind="expertise", title=key.replace("_", " "), text=_clip(text)))
+    return docs
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+def hashing_embed(texts: List[str], dim: int = HASHING_DIM) -> np.ndarray:
+    """Signed feature hashing of words and word bigrams: no model needed, lexical matches only."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = tokenize(text)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vectors[row, value % dim] += 1.0 if (value >> 63) else -1.0
+    return _normalize(vectors)
+
+class Embedder:
+    """Turns texts into L2-normalized float32 rows; `name` identifies the vector space."""
+    name = "hashing"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return hashing_embed(texts)
+
+class OllamaEmbedder(Embedder):
+    """Embeddings from OLLAMA_EMBED_MODEL, on whichever LLM backend serves it."""
+
+    def __init__(self, model: str = OLLAMA_EMBED_MODEL):
+        self.model = model
+        self.name = f"ollama:{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize(np.asarray(get_llm_router().embed(self.model, texts), dtype=np.float32))
+
+def get_embedder(name: Optional[str] = None) -> Embedder:
+    name = name or RETRIEVAL_EMBEDDER
+    if name == "hashing":
+        return Embedder()
+    if name.startswith("ollama"):
+        model = name.split(":", 1)[1] if ":" in name else OLLAMA_EMBED_MODEL
+        return OllamaEmbedder(model)
+    raise ValueError(f"Unknown embedder: {name}")
+
+class PortfolioIndex:
+    """
+    Embeddings of the portfolio documents, computed once per portfolio/embedder and kept
+    on disk as a NumPy memmap next to a JSON list of the documents. Search is cosine top-k.
+    """
+
+    def __init__(self, documents: List[EvidenceDoc], vectors: np.ndarray, embedder: Embedder):
+        self.documents = documents
+        self.vectors = vectors
+        self.embedder = embedder
+
+    @staticmethod
+    def _paths(documents: List[EvidenceDoc], embedder: Embedder):
+        digest = hashlib.sha256(json.dumps([d.model_dump() for d in documents], sort_keys=True).encode() + embedder.name.encode()).hexdigest()[:16]
+        base = get_storage_dir() / f"portfolio-index-{digest}"
+        return base.with_suffix(".npy"), base.with_suffix(".json")
+
+    @classmethod
+    def load_or_build(cls, documents: List[EvidenceDoc], embedder: Embedder) -> "PortfolioIndex":
+        vectors_path, docs_path = cls._paths(documents, embedder)
+        if vectors_path.exists() and docs_path.exists():
+            try:
+                vectors = np.load(vectors_path, mmap_mode="r")
+                if vectors.shape[0] == len(documents):
+                    return cls(documents, vectors, embedder)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable portfolio index {vectors_path.name}: {e}")
+
+        embedded = embedder.embed([f"{doc.title}: {doc.text}" for doc in documents])
+        tmp = vectors_path.with_name(vectors_path.name + ".tmp")
+        vectors = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=embedded.shape)
+        vectors[:] = embedded
+        vectors.flush()
+        del vectors
+        os.replace(tmp, vectors_path)
+        docs_path.write_text(json.dumps({"embedder": embedder.name, "documents": [d.model_dump() for d in documents]}, ensure_ascii=False), encoding="utf-8")
+        logger.info(f"Built portfolio index {vectors_path.name} ({len(documents)} documents, {embedder.name})")
+        return cls(documents, np.load(vectors_path, mmap_mode="r"), embedder)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Evidence]:
+        """The k documents most similar to the query (cosine), best first."""
+        if not self.documents:
+            return []
+        query_vector = self.embedder.embed([query[:QUERY_MAX_CHARS]])[0]
+        scores = np.asarray(self.vectors @ query_vector)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Evidence(doc=self.documents[i], score=round(float(scores[i]), 4)) for i in top]
+
+    def search_many(self, queries: List[str], k: int = RETRIEVAL_TOP_K) -> List[Evidence]:
+        """
+        The top k of each query interleaved (each query's best first, then each one's second...),
+        without repeats: evidence shared by several offers scored in one prompt.
+        """
+        if not self.documents or not queries:
+            return []
+        scores = np.asarray(self.vectors @ self.embedder.embed([query[:QUERY_MAX_CHARS] for query in queries]).T)
+        k = min(k, scores.shape[0])
+        rankings = []
+        for column in scores.T:
+            top = np.argpartition(-column, k - 1)[:k]
+            rankings.append([(int(i), float(column[i])) for i in top[np.argsort(-column[top])]])
+        evidence, seen = [], set()
+        for rank in range(k):
+            for ranking in rankings:
+                i, score = ranking[rank]
+                if i not in seen:
+                    seen.add(i)
+                    evidence.append(Evidence(doc=self.documents[i], score=round(score, 4)))
+        return evidence
+
+    def fallback(self) -> List[Evidence]:
+        """Skill categories in portfolio order, when the query cannot be embedded."""
+        return [Evidence(doc=doc, score=0.0) for doc in self.documents if doc.kind == "skills"]
+
+def format_evidence(evidence: List[Evidence], max_tokens: int = RETRIEVAL_MAX_TOKENS) -> str:
+    """Evidence lines, best first, until the token budget is spent."""
+    lines, used = [], 0
+    for item in evidence:
+        line = item.to_line()
+        tokens = estimate_tokens(line)
+        if used + tokens > max_tokens:
+            continue
+        lines.append(line)
+        used += tokens
+    return "\n".join(lines)
+
+def _build_index(portfolio: Portfolio) -> PortfolioIndex:
+    documents = portfolio_documents(portfolio)
+    embedder = get_embedder()
+    try:
+        return PortfolioIndex.load_or_build(documents, embedder)
+    except Exception as e:
+        if embedder.name == "hashing":
+            raise
+        logger.warning(f"Embeddings with {embedder.name} failed, using the hashing embedder: {e}")
+        return PortfolioIndex.load_or_build(documents, Embedder())
+
+# Same keying as the prompt cache: load_portfolio() returns one object per YAML version
+_indexes: Dict[int, Tuple[Portfolio, PortfolioIndex]] = {}
+_indexes_lock = threading.Lock()
+
+def get_portfolio_index(portfolio: Portfolio) -> Optional[PortfolioIndex]:
+    """The shared index of a portfolio (built on first use), or None when RETRIEVAL_ENABLED=false."""
+    if not RETRIEVAL_ENABLED:
+        return None
+    with _indexes_lock:
+        entry = _indexes.get(id(portfolio))
+        if entry is None:
+            if len(_indexes) >= 4:
+                _indexes.clear()
+            entry = (portfolio, _build_index(portfolio))
+            _indexes[id(portfolio)] = entry
+        return entry[1]
+
+def retrieve_evidence(portfolio: Portfolio, query: str, k: int = RETRIEVAL_TOP_K, max_tokens: int = RETRIEVAL_MAX_TOKENS) -> str:
+    """The portfolio evidence most relevant to an offer, formatted for the prompt ("" if disabled)."""
+    index = get_portfolio_index(portfolio)
+    if index is None:
+        return ""
+    try:
+        evidence = index.search(query, k)
+    except Exception as e:
+        logger.warning(f"Portfolio retrieval failed, using skill categories: {e}")
+        evidence = index.fallback()
+    return format_evidence(evidence, max_tokens)
+
+def retrieve_shared_evidence(portfolio: Portfolio, queries: List[str], k: int = RETRIEVAL_TOP_K, max_tokens: int = RETRIEVAL_MAX_TOKENS) -> str:
+    """Like `retrieve_evidence` for several offers sharing one prompt and one evidence budget."""
+    index = get_portfolio_index(portfolio)
+    if index is None:
+        return ""
+    try:
+        evidence = index.search_many(queries, k)
+    except Exception as e:
+        logger.warning(f"Portfolio retrieval failed, using skill categories: {e}")
+        evidence = index.fallback()
+    return format_evidence(evidence, max_tokens)
@@ -0,0 +1,362 @@
+import os
+import re
+import json
+import time
+import zlib
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.core.ollama import OllamaStats, get_ollama_client
+
+logger = logging.getLogger(__name__)
+
+# Which model tier each kind of call uses
+TASK_TIERS = {"extract": "small", "adjust": "large", "analyze": "large"}
+
+class BackendConfig(BaseModel):
+    name: str
+    kind: str = "ollama" # ollama, fake
+    url: str = ""
+    models: List[str] = [] # models the backend serves; empty serves any
+    # Parallel requests unless LLM_BACKENDS says otherwise (match OLLAMA_NUM_PARALLEL on the server)
+    max_concurrency: int = Field(default_factory=lambda: int(os.getenv("LLM_BACKEND_CONCURRENCY", "2")))
+
+def load_backend_configs() -> List[BackendConfig]:
+    """
+    Backends from LLM_BACKENDS, a JSON list such as
+    [{"name": "gpu1", "url": "http://gpu1:11434", "models": ["llama3:8b"], "max_concurrency": 2}].
+    Without it: one Ollama backend at OLLAMA_BASE_URL (or the fake one with LLM_PROVIDER=fake).
+    """
+    raw = os.getenv("LLM_BACKENDS", "").strip()
+    if raw:
+        return [BackendConfig(**item) for item in json.loads(raw)]
+    if os.getenv("LLM_PROVIDER", "ollama") == "fake":
+        return [BackendConfig(name="fake", kind="fake", max_concurrency=4)]
+    return [BackendConfig(name="ollama", url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"))]
+
+def _prompt_of(payload: Dict[str, Any]) -> str:
+    return "\n".join(m.get("content", "") for m in payload.get("messages", [])) + payload.get("prompt", "")
+
+class _FakeStream:
+    def __init__(self, text: str, stats: OllamaStats):
+        self._tokens = iter([text[i:i + 4] for i in range(0, len(text), 4)])
+        self._stats = stats
+        self.stats: Optional[OllamaStats] = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._tokens)
+        except StopIteration:
+            self.stats = self._stats
+            raise
+
+    def close(self) -> None:
+        pass
+
+class Backend:
+    """One inference endpoint with its concurrency slots and circuit breaker state (guarded by the router)."""
+
+    def __init__(self, config: BackendConfig):
+        self.config = config
+        self.name = config.name
+        self._slots = threading.BoundedSemaphore(max(1, config.max_concurrency))
+        self.in_flight = 0
+        self.waiting = 0
+        self.served = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def serves(self, model: str) -> bool:
+        return not self.config.models or model in self.config.models
+
+    @property
+    def load(self) -> float:
+        return (self.in_flight + self.waiting) / max(1, self.config.max_concurrency)
+
+    def available(self, now: float) -> bool:
+        """Closed circuit, or open but cooled down and not already probed by another request."""
+        return self.open_until <= now and not self.probing
+
+    def stream(self, endpoint: str, payload: Dict[str, Any]):
+        return get_ollama_client(self.config.url).stream(endpoint, payload)
+
+    def complete(self, endpoint: str, payload: Dict[str, Any]) -> Tuple[str, Optional[OllamaStats]]:
+        return get_ollama_client(self.config.url).complete(endpoint, payload)
+
+    def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        return get_ollama_client(self.config.url).embed(model, texts)
+
+class FakeBackend(Backend):
+    """Deterministic local answers, for development and tests without an inference box."""
+
+    @staticmethod
+    def _analysis(prompt: str) -> Dict[str, Any]:
+        score = zlib.crc32(prompt.encode()) % 101
+        return {
+            "match_score": score,
+            "verdict": "APPLY" if score >= 70 else "CONSIDER" if score >= 40 else "IGNORE",
+            "reasoning_summary": "Respuesta simulada (backend fake).",
+            "pros": [],
+            "cons": [],
+            "hard_filter_check": {"remote_pass": True, "visa_pass": True, "salary_pass": True},
+        }
+
+    def _reply(self, payload: Dict[str, Any]) -> Tuple[str, OllamaStats]:
+        prompt = _prompt_of(payload)
+        if payload.get("format") == "json":
+            offers = re.split(r"^### OFERTA (\d+)\n", prompt, flags=re.MULTILINE)
+            if len(offers) > 1 and '"results"' in prompt:
+                results = [{"offer": int(number), **self._analysis(offer)} for number, offer in zip(offers[1::2], offers[2::2])]
+                text = json.dumps({"results": results}, ensure_ascii=False)
+            else:
+                text = json.dumps({**self._analysis(prompt), "cons_to_add": []}, ensure_ascii=False)
+        elif "Extract ONLY the company name" in prompt:
+            text = "Unknown"
+        else:
+            text = "OK"
+        return text, OllamaStats(prompt_eval_count=len(prompt) // 4, eval_count=len(text) // 4)
+
+    def stream(self, endpoint: str, payload: Dict[str, Any]) -> _FakeStream:
+        return _FakeStream(*self._reply(payload))
+
+    def complete(self, endpoint: str, payload: Dict[str, Any]) -> Tuple[str, Optional[OllamaStats]]:
+        return self._reply(payload)
+
+    def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 64
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode()) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+BACKEND_KINDS = {"ollama": Backend, "fake": FakeBackend}
+
+class NoBackendAvailable(RuntimeError):
+    pass
+
+class RoutedStream:
+    """
+    Token stream that holds a backend slot until it is exhausted or closed.
+    A backend that fails before the first token is marked and the next one is tried.
+    """
+
+    def __init__(self, router: "LLMRouter", endpoint: str, payload: Dict[str, Any]):
+        self._router = router
+        self._endpoint = endpoint
+        self._payload = payload
+        self._tried: List[Backend] = []
+        self._backend: Optional[Backend] = None
+        self._stream = None
+        self._started = False
+        self._done = False
+        self.backend_name: Optional[str] = None
+        self.stats: Optional[OllamaStats] = None
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        while not self._done:
+            if self._backend is None:
+                self._backend = self._router.acquire(self._payload["model"], self._tried)
+                self.backend_name = self._backend.name
+            try:
+                if self._stream is None:
+                    self._stream = self._backend.stream(self._endpoint, self._payload)
+                token = next(self._stream)
+            except StopIteration:
+                self.stats = self._stream.stats
+                self._finish(ok=True)
+                raise
+            except Exception as e:
+                failed = self._backend
+                self._finish(ok=False)
+                if self._started or not self._router.has_alternative(self._payload["model"], self._tried):
+                    self._done = True
+                    raise
+                logger.warning(f"LLM backend '{failed.name}' failed before the first token, trying another: {e}")
+                continue
+            self._started = True
+            return token
+        raise StopIteration
+
+    def _finish(self, ok: bool) -> None:
+        backend, self._backend, self._stream = self._backend, None, None
+        if ok:
+            self._done = True
+        else:
+            self._tried.append(backend)
+        self._router.release(backend, ok)
+
+    def close(self) -> None:
+        """Stops generation early (closes the HTTP response) and frees the slot."""
+        if self._backend is None:
+            return
+        try:
+            if self._stream is not None:
+                self._stream.close()
+        finally:
+            self._finish(ok=True)
+
+class LLMRouter:
+    """
+    Routes completions to interchangeable backends: the model comes from the task tier,
+    the backend is the least loaded one (in flight + queued per slot) that serves the model
+    and whose circuit is closed. Each backend's semaphore caps its parallel requests.
+    """
+
+    def __init__(self, configs: Optional[List[BackendConfig]] = None):
+        configs = configs if configs is not None else load_backend_configs()
+        if not configs:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = [BACKEND_KINDS[config.kind](config) for config in configs]
+        self._lock = threading.Lock()
+        # Signalled when a half-open backend's probe finishes (guarded by _lock)
+        self._probe_done = threading.Condition(self._lock)
+        self.model = os.getenv("OLLAMA_MODEL", "llama3")
+        # Small, fast model for cheap calls such as company extraction (defaults to OLLAMA_MODEL)
+        self.small_model = os.getenv("OLLAMA_SMALL_MODEL", "") or self.model
+        # Consecutive failures that open a backend's circuit, and how long it stays open
+        self.breaker_failures = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+        self.breaker_cooldown_s = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+        # How long other requests wait for a half-open backend's probe before giving up
+        self.probe_wait_s = float(os.getenv("LLM_BREAKER_PROBE_WAIT_S", "60"))
+
+    @property
+    def capacity(self) -> int:
+        return sum(max(1, backend.config.max_concurrency) for backend in self.backends)
+
+    def model_for(self, task: str) -> str:
+        """The tier model for a task; the main model if no backend serves the small one."""
+        model = self.small_model if TASK_TIERS.get(task, "large") == "small" else self.model
+        if model != self.model and not any(backend.serves(model) for backend in self.backends):
+            return self.model
+        return model
+
+    def has_alternative(self, model: str, exclude: List[Backend]) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(b.serves(model) and b not in exclude and b.available(now) for b in self.backends)
+
+    def acquire(self, model: str, exclude: Optional[List[Backend]] = None) -> Backend:
+        """
+        Picks a backend for `model` and blocks until it has a free slot. While the only
+        usable backends are half-open and being probed, waits (bounded) for the probe's outcome.
+        """
+        deadline = None
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                serving = [b for b in self.backends if b.serves(model)]
+                if not serving:
+                    raise NoBackendAvailable(f"No LLM backend serves model '{model}'")
+                candidates = [b for b in serving if b not in (exclude or []) and b.available(now)]
+                if candidates:
+                    break
+                probed = any(b.probing for b in serving if b not in (exclude or []))
+                deadline = deadline or now + self.probe_wait_s
+                if not probed or now >= deadline:
+                    raise NoBackendAvailable(f"No LLM backend available for '{model}' (circuits open or all failed)")
+                self._probe_done.wait(deadline - now)
+            backend = min(candidates, key=lambda b: (b.load, b.served))
+            if backend.open_until:
+                backend.probing = True # half-open: this request decides
+            backend.waiting += 1
+        backend._slots.acquire()
+        with self._lock:
+            backend.waiting -= 1
+            backend.in_flight += 1
+        return backend
+
+    def release(self, backend: Backend, ok: bool) -> None:
+        with self._lock:
+            backend.in_flight -= 1
+            backend.served += 1
+            if backend.probing:
+                backend.probing = False
+                self._probe_done.notify_all()
+            if ok:
+                backend.failures = 0
+                backend.open_until = 0.0
+            else:
+                backend.failures += 1
+                if backend.failures >= self.breaker_failures or backend.open_until:
+                    backend.open_until = time.monotonic() + self.breaker_cooldown_s
+                    logger.warning(f"LLM backend '{backend.name}' circuit open for {self.breaker_cooldown_s:.0f}s after {backend.failures} failures")
+        backend._slots.release()
+
+    def _call(self, model: str, call):
+        """Runs `call(backend)` on the best backend, failing over to the others."""
+        tried: List[Backend] = []
+        while True:
+            backend = self.acquire(model, tried)
+            try:
+                result = call(backend)
+            except Exception as e:
+                self.release(backend, ok=False)
+                tried.append(backend)
+                if not self.has_alternative(model, tried):
+                    raise
+                logger.warning(f"LLM backend '{backend.name}' failed, trying another: {e}")
+                continue
+            self.release(backend, ok=True)
+            return result, backend
+
+    def complete(self, endpoint: str, payload: Dict[str, Any]) -> Tuple[str, Optional[OllamaStats], str]:
+        """Returns (text, stats, backend name)."""
+        (text, stats), backend = self._call(payload["model"], lambda b: b.complete(endpoint, payload))
+        return text, stats, backend.name
+
+    def stream(self, endpoint: str, payload: Dict[str, Any]) -> RoutedStream:
+        return RoutedStream(self, endpoint, payload)
+
+    def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        vectors, _ = self._call(model, lambda b: b.embed(model, texts))
+        return vectors
+
+    def preload(self, endpoint: str, payload: Dict[str, Any]) -> Optional[OllamaStats]:
+        """Runs the request on every backend serving the model (warms each KV cache)."""
+        stats = None
+        for backend in self.backends:
+            if not backend.serves(payload["model"]) or isinstance(backend, FakeBackend):
+                continue
+            try:
+                _, stats = backend.complete(endpoint, payload)
+            except Exception as e:
+                logger.warning(f"Preload on LLM backend '{backend.name}' failed: {e}")
+        return stats
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Per-backend load and circuit state, for the UI."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "backend": b.name,
+                    "models": ", ".join(b.config.models) or "*",
+                    "in_flight": b.in_flight,
+                    "waiting": b.waiting,
+                    "served": b.served,
+                    "circuit": "open" if b.open_until > now else "half-open" if b.open_until else "closed",
+                }
+                for b in self.backends
+            ]
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+def get_llm_router() -> LLMRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter()
+        return _router
@@ -0,0 +1,26 @@
+import os
+import sqlite3
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_DIR = Path(__file__).parent.parent.parent / "data" / ".cache"
+
+def get_storage_dir() -> Path:
+    """Directory for local caches and stores (override with STORAGE_DIR)."""
+    storage_dir = Path(os.getenv("STORAGE_DIR", str(DEFAULT_STORAGE_DIR)))
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    return storage_dir
+
+def connect_sqlite(filename: str) -> sqlite3.Connection:
+    """
+    Opens a SQLite database inside the storage dir.
+    The connection is shared between threads, so callers must guard it with a lock.
+    """
+    path = get_storage_dir() / filename
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    logger.debug(f"Opened SQLite store at {path}")
+    return conn
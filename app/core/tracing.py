@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.storage import get_storage_dir
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() != "false"
+TRACE_MAX_MB = float(os.getenv("TRACE_MAX_MB", "20"))
+
+class Span(BaseModel):
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    name: str
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = {}
+    status: str = "OK" # OK, ERROR
+    thread: str = ""
+
+    @property
+    def duration_s(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes: Any) -> "Span":
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+        return self
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OpenTelemetry-like JSON (one span per line in the exporter)."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+            "thread": self.thread,
+        }
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSONL file, rotating it to '.1' when it grows past max_mb."""
+
+    def __init__(self, path: Optional[Path] = None, max_mb: float = TRACE_MAX_MB):
+        self.path = Path(path or os.getenv("TRACE_FILE", "") or get_storage_dir() / "traces.jsonl")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_otlp(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                    self.path.replace(self.path.with_suffix(self.path.suffix + ".1"))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                logger.warning(f"Could not export span: {e}")
+
+    def read_recent(self, max_spans: int = 5000) -> List[Dict[str, Any]]:
+        """The last spans written (reads the end of the file only)."""
+        if not self.path.exists():
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - max_spans * 600))
+            lines = f.read().splitlines()[-max_spans:]
+        spans = []
+        for line in lines:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue  # first line may be cut
+        return spans
+
+class TraceCollector:
+    """Keeps the finished spans of one trace in memory, e.g. to draw a waterfall."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_collector: contextvars.ContextVar[Optional[TraceCollector]] = contextvars.ContextVar("trace_collector", default=None)
+_exporter: Optional[JsonlSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+def get_exporter() -> JsonlSpanExporter:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = JsonlSpanExporter()
+        return _exporter
+
+def _finish(span: Span) -> None:
+    span.end_ns = span.end_ns or time.time_ns()
+    collector = _collector.get()
+    if collector:
+        collector.add(span)
+    if TRACING_ENABLED:
+        get_exporter().export(span)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Times the block as a child of the current span (or as a new trace)."""
+    parent = _current_span.get()
+    current = Span(
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        start_ns=time.time_ns(),
+        thread=threading.current_thread().name,
+    ).set(**attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.set(error=str(e)[:300])
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current)
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes: Any) -> Optional[Span]:
+    """Adds an already finished child span (e.g. phases reported by Ollama after the fact)."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    finished = Span(
+        trace_id=parent.trace_id,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id,
+        name=name,
+        start_ns=start_ns,
+        end_ns=end_ns,
+        thread=threading.current_thread().name,
+    ).set(**attributes)
+    _finish(finished)
+    return finished
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def collect() -> Iterator[TraceCollector]:
+    """Collects every span finished inside the block, including those in propagated threads."""
+    collector = TraceCollector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+def propagate(func: Callable) -> Callable:
+    """Binds `func` to a copy of the current context, so spans in worker threads keep their parent."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+def percentiles(values: List[float], points=(50, 95)) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{p}": 0.0 for p in points}
+    return {f"p{p}": ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] for p in points}
+
+def stage_stats(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Count, p50 and p95 duration (seconds) per span name, slowest p95 first."""
+    durations: Dict[str, List[float]] = {}
+    for item in spans:
+        if item.get("endTimeUnixNano"):
+            durations.setdefault(item["name"], []).append((item["endTimeUnixNano"] - item["startTimeUnixNano"]) / 1e9)
+    rows = [{"stage": name, "count": len(values), **percentiles(values)} for name, values in durations.items()]
+    return sorted(rows, key=lambda row: row["p95"], reverse=True)
@@ -0,0 +1,63 @@
+"""
+Ingestion daemon: polls job feeds (RSS/Atom, Greenhouse, Lever, LinkedIn saved searches)
+and analyzes only the postings it has not seen yet.
+
+Usage:
+    python -m app.ingest --config data/feeds.yaml
+    python -m app.ingest --config data/feeds.yaml --once
+"""
+import sys
+import json
+import signal
+import logging
+import argparse
+import threading
+
+from dotenv import load_dotenv
+
+# Before the app imports: the INGEST_* settings (and the --min-score default) are read at import time
+load_dotenv()
+
+from app.core.profile import load_portfolio
+from app.core.agent import CareerAgent
+from app.core.ingest import INGEST_NOTIFY_MIN_SCORE, IngestService, NotificationFile
+from app.tools.feeds import load_feed_sources
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Poll job feeds and analyze new postings.")
+    parser.add_argument("--config", default="data/feeds.yaml", help="YAML file with the feed sources")
+    parser.add_argument("--once", action="store_true", help="Poll every source once and exit")
+    parser.add_argument("--notify-file", help="JSONL file for good matches (default: data/.cache/notifications.jsonl)")
+    parser.add_argument("--min-score", type=int, default=INGEST_NOTIFY_MIN_SCORE, help="Minimum match score to notify")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    sources = load_feed_sources(args.config)
+    if not sources:
+        parser.error(f"No enabled sources in {args.config}.")
+
+    service = IngestService(
+        CareerAgent(load_portfolio()),
+        sources,
+        notifications=NotificationFile(args.notify_file) if args.notify_file else None,
+        min_score=args.min_score,
+    )
+
+    if args.once:
+        report = service.run_once(force=True)
+        print(json.dumps(report.model_dump(), ensure_ascii=False, indent=2))
+        return 0 if not report.failed_sources else 1
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    logger.info(f"Polling {len(sources)} feed sources: {', '.join(source.name for source in sources)}")
+    service.run_forever(stop)
+    logger.info("Ingestion stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
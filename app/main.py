@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 from dotenv import load_dotenv
 from app.core.profile import load_portfolio
@@ -29,10 +30,38 @@ def main():
                 cond = portfolio.professional_conditions
                 st.write(f"**Remoto:** {cond.availability.get('remote_work', 'N/A')}")
                 st.write(f"**Visa:** {cond.work_permit.get('status', 'N/A')}")
+
+            from app.core.cache import get_response_cache
+            cache = get_response_cache()
+            if cache:
+                stats = cache.stats()
+                st.caption(f"🗄️ Caché LLM: {stats['entries']} respuestas · {stats['hits']} hits / {stats['misses']} misses")
+            st.checkbox("Ignorar caché LLM", key="bypass_llm_cache", help="Fuerza una nueva inferencia aunque la oferta ya se haya analizado.")
+            from app.core.agent import ANALYSIS_MODE
+            st.radio(
+                "Modo de análisis",
+                ["speculative", "serial"],
+                index=0 if ANALYSIS_MODE == "speculative" else 1,
+                format_func=lambda m: {"speculative": "Especulativo (investigación en paralelo)", "serial": "En serie"}[m],
+                key="analysis_mode",
+                help="En modo especulativo el análisis LLM empieza mientras se investiga la empresa.",
+            )
+            from app.core.router import get_llm_router
+            with st.expander("Backends LLM"):
+                st.dataframe(get_llm_router().status(), hide_index=True, use_container_width=True)
     except Exception as e:
         st.error(f"Error cargando portfolio.yaml: {e}")
         return
 
+    tab_single, tab_batch, tab_history = st.tabs(["🔎 Oferta individual", "📦 Análisis en lote", "🗂️ Historial"])
+    with tab_single:
+        render_single_offer(portfolio)
+    with tab_batch:
+        render_batch(portfolio)
+    with tab_history:
+        render_history()
+
+def render_single_offer(portfolio):
     # 2. Input Section
     st.header("1. Ingresa la Oferta")
     
@@ -51,15 +80,18 @@ def main():
             st.warning("Por favor ingresa una URL o el texto de la oferta.")
             return
 
-        with st.status("🔍 Procesando oferta...") as status:
+        from app.core.tracing import collect, span
+        with st.status("🔍 Procesando oferta...") as status, collect() as trace, span("offer", url=job_url or None):
             final_text = job_text
+            page_metadata = {}
             
             if job_url:
                 try:
                     status.update(label="🌍 Extrayendo contenido de la URL...", state="running")
-                    from app.tools.scraper import scrape_job_url
-                    scraped_text = scrape_job_url(job_url)
-                    final_text = scraped_text + "\n\n" + job_text # Append manual text if any
+                    from app.tools.scraper import scrape_job_page
+                    page = scrape_job_page(job_url)
+                    page_metadata = page.metadata
+                    final_text = page.text + "\n\n" + job_text # Append manual text if any
                     status.write("✅ Contenido extraído exitosamente.")
                 except Exception as e:
                     st.error(f"Error extrayendo URL: {e}")
@@ -74,26 +106,29 @@ def main():
             from app.core.agent import CareerAgent
             
             try:
-                agent = CareerAgent(portfolio)
-                
-                # Step 3.1: Extract Company & Deep Research
-                status.update(label="🕵️‍♂️ Investigando empresa (Búsqueda Profunda)...", state="running")
-                company_name = agent.extract_company_name(final_text)
-                research_context = ""
+                agent = CareerAgent(portfolio, use_cache=not st.session_state.get("bypass_llm_cache", False))
                 
-                # Filter generic names
-                if company_name and company_name.lower() not in ["unknown", "confidential", "cliente final"]:
-                    st.write(f"🏢 Empresa detectada: **{company_name}**. Buscando referencias...")
-                    research_context = agent.perform_research(company_name)
-                    with st.expander("🌐 Resultados de Investigación Web", expanded=False):
-                        st.markdown(research_context)
+                # Step 3.1: Deterministic hard filters (no search, no LLM)
+                result = agent.prefilter(final_text, url=job_url or None)
+                llm_used = result is None
+                staged = None
+                if result:
+                    status.write("⛔ Descartada por filtros duros: se omiten investigación y LLM.")
                 else:
-                    st.warning(f"⚠️ No se pudo detectar un nombre de empresa específico (Detectado: '{company_name}'). Se omitirá la investigación web.")
-
-                # Step 3.2: Final Analysis
-                status.update(label="🧠 Analizando compatibilidad final...", state="running")
-                result = agent.analyze(final_text, research_context=research_context)
+                    staged = run_llm_analysis(agent, final_text, status, url=job_url or None, metadata=page_metadata)
+                    result = staged.result
                 
+                if result.verdict != "ERROR" and not (staged and staged.mode == "duplicate"):
+                    from app.core.history import record_analysis
+                    record_analysis(
+                        final_text,
+                        result,
+                        url=job_url or None,
+                        company_name=staged.company_name if staged else None,
+                        title=page_metadata.get("title") if page_metadata else None,
+                        research_context=staged.research_context if staged else "",
+                        llm_used=llm_used,
+                    )
                 status.write("✅ Análisis completado.")
                 
                 # --- Result Display ---
@@ -131,6 +166,22 @@ def main():
                 # Raw JSON for debug
                 with st.expander("Ver JSON Completo (Debug)"):
                      st.json(result.model_dump())
+                     stats = staged.llm_stats if staged else None
+                     if stats:
+                         d1, d2, d3, d4 = st.columns(4)
+                         d1.metric("Latencia LLM", f"{stats.latency_s:.1f}s")
+                         d2.metric("Primer token", f"{stats.time_to_first_token_s or 0:.1f}s")
+                         d3.metric("Prompt eval", f"{stats.prompt_eval_duration_s:.1f}s ({stats.prompt_eval_count} tok)")
+                         d4.metric("Generación", f"{stats.tokens_per_second:.1f} tok/s")
+                     elif llm_used and staged.mode != "duplicate":
+                         st.caption("Respuesta servida desde la caché LLM.")
+                     if staged:
+                         st.caption(
+                             f"⏱️ Etapas ({staged.mode}): "
+                             + " · ".join(f"{stage} {seconds:.1f}s" for stage, seconds in staged.timings.items() if stage != "total")
+                             + f" — total {staged.timings.get('total', 0):.1f}s (en serie ≈ {staged.serial_seconds:.1f}s)"
+                         )
+                     render_trace(trace.spans)
 
             except Exception as e:
                 st.error(f"Error en Agente: {e}")
@@ -138,5 +189,272 @@ def main():
             
             status.update(label="✅ Proceso Finalizado", state="complete", expanded=False)
 
+def render_trace(spans):
+    """Waterfall of the spans of one analysis plus p50/p95 per stage over recent runs."""
+    from app.core.tracing import get_exporter, stage_stats
+    if not spans:
+        return
+    origin = min(s.start_ns for s in spans)
+    bars = [{
+        "stage": f"{s.name} [{s.span_id[:4]}]",
+        "start_ms": (s.start_ns - origin) / 1e6,
+        "end_ms": (s.end_ns - origin) / 1e6,
+        "duration_ms": round(s.duration_s * 1000, 1),
+        "thread": s.thread,
+        "details": ", ".join(f"{k}={v}" for k, v in s.attributes.items())[:200],
+    } for s in sorted(spans, key=lambda s: s.start_ns)]
+    st.markdown("**🧵 Traza del análisis**")
+    st.vega_lite_chart(
+        {"values": bars},
+        {
+            "mark": {"type": "bar", "cornerRadius": 2},
+            "encoding": {
+                "y": {"field": "stage", "type": "nominal", "sort": None, "title": None},
+                "x": {"field": "start_ms", "type": "quantitative", "title": "ms"},
+                "x2": {"field": "end_ms"},
+                "color": {"field": "thread", "type": "nominal"},
+                "tooltip": [{"field": "stage"}, {"field": "duration_ms"}, {"field": "details"}],
+            },
+            "height": max(120, 22 * len(bars)),
+        },
+        use_container_width=True,
+    )
+    stats = stage_stats(get_exporter().read_recent())
+    if stats:
+        st.caption("Latencia por etapa en ejecuciones recientes (segundos)")
+        st.dataframe(
+            [{**row, "p50": round(row["p50"], 3), "p95": round(row["p95"], 3)} for row in stats],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+def run_llm_analysis(agent, final_text, status, url=None, metadata=None):
+    from app.core.agent import is_researchable_company
+
+    # Step 3.2 + 3.3: Company research and final analysis (in parallel in speculative mode)
+    labels = {
+        "research": "🕵️‍♂️ Investigando empresa (Búsqueda Profunda)...",
+        "analyze": "🧠 Analizando compatibilidad final...",
+        "reconcile": "🚩 Ajustando el análisis con las alertas de la investigación...",
+    }
+    early_verdict = st.empty()
+    live_output = st.empty()
+    streamed = {"text": "", "started": time.perf_counter(), "ttft": None, "fields": {}}
+
+    def on_stage(stage):
+        status.update(label=labels[stage], state="running")
+        streamed["text"] = ""
+
+    def on_field(name, value):
+        # match_score and verdict come first in the JSON: show them before the reasoning is written
+        if name not in ("match_score", "verdict"):
+            return
+        fields = streamed["fields"]
+        fields[name] = value
+        score = f" ({fields['match_score']}%)" if "match_score" in fields else ""
+        early_verdict.info(f"⏱️ Resultado preliminar: **{fields.get('verdict', '…')}**{score} · {time.perf_counter() - streamed['started']:.1f}s")
+
+    def on_token(token):
+        if streamed["ttft"] is None:
+            streamed["ttft"] = time.perf_counter() - streamed["started"]
+            status.write(f"⚡ Primer token en {streamed['ttft']:.1f}s")
+        streamed["text"] += token
+        live_output.code(streamed["text"][-1500:], language="json")
+
+    staged = agent.run_analysis(
+        final_text,
+        url=url,
+        metadata=metadata,
+        on_token=on_token,
+        mode=st.session_state.get("analysis_mode"),
+        on_stage=on_stage,
+        on_field=on_field,
+    )
+    live_output.empty()
+    early_verdict.empty()
+
+    if staged.mode == "duplicate":
+        st.info(f"♻️ Oferta ya analizada (#{staged.duplicate_of}, similitud {staged.similarity:.0%}): se reutiliza el resultado sin investigación ni LLM.")
+        return staged
+    if staged.previous_result:
+        previous = staged.previous_result
+        st.write(
+            f"♻️ Casi idéntica a la oferta #{staged.duplicate_of} (similitud {staged.similarity:.0%}), pero cambió: "
+            f"{', '.join(staged.changed_fields)}. Antes: **{previous.verdict}** ({previous.match_score}%) → "
+            f"ahora: **{staged.result.verdict}** ({staged.result.match_score}%)."
+        )
+
+    # Filter generic names
+    if is_researchable_company(staged.company_name):
+        st.write(f"🏢 Empresa detectada: **{staged.company_name}**.")
+        with st.expander("🌐 Resultados de Investigación Web", expanded=False):
+            st.markdown(staged.research_context)
+    else:
+        st.warning(f"⚠️ No se pudo detectar un nombre de empresa específico (Detectado: '{staged.company_name}'). Se omitió la investigación web.")
+    if staged.red_flags:
+        action = {"adjust": "resultado ajustado", "rerun": "análisis repetido con la investigación"}.get(staged.reconciliation, "")
+        st.write(f"🚩 Alertas en la investigación: {', '.join(staged.red_flags)} ({action})")
+    return staged
+
+def render_batch(portfolio):
+    st.header("Analiza muchas ofertas a la vez")
+    st.caption("Scraping, investigación y análisis se ejecutan en paralelo por etapas; las llamadas al LLM se racionan.")
+
+    batch_input = st.text_area(
+        "Una URL por línea (o bloques de texto separados por una línea con `---`)",
+        height=200,
+        placeholder="https://www.linkedin.com/jobs/view/...\nhttps://boards.greenhouse.io/...",
+    )
+    col1, col2, col3 = st.columns(3)
+    scrape_concurrency = col1.number_input("Scraping en paralelo", min_value=1, max_value=32, value=8)
+    research_concurrency = col2.number_input("Búsquedas en paralelo", min_value=1, max_value=16, value=4)
+    from app.core.router import get_llm_router
+    llm_slots = get_llm_router().capacity
+    llm_concurrency = col3.number_input("Llamadas LLM en paralelo", min_value=1, max_value=max(8, llm_slots), value=llm_slots)
+
+    if not st.button("🚀 Analizar Lote", type="primary", use_container_width=True):
+        return
+
+    if "---" in batch_input:
+        inputs = [block for block in batch_input.split("\n---\n") if block.strip()]
+    else:
+        inputs = [line for line in batch_input.splitlines() if line.strip()]
+    if not inputs:
+        st.warning("Por favor ingresa al menos una URL o texto.")
+        return
+
+    from app.core.agent import CareerAgent
+    from app.core.pipeline import BatchPipeline
+
+    pipeline = BatchPipeline(
+        CareerAgent(portfolio, use_cache=not st.session_state.get("bypass_llm_cache", False)),
+        concurrency={"scrape": scrape_concurrency, "research": research_concurrency, "llm": llm_concurrency},
+    )
+    progress = st.progress(0.0, text="Procesando lote...")
+
+    def on_item(item, done, total):
+        progress.progress(done / total, text=f"{done}/{total} ofertas procesadas")
+
+    report = pipeline.run(inputs, on_item=on_item)
+    progress.empty()
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Analizadas", f"{report.completed}/{len(report.items)}")
+    c2.metric("Errores", report.failed)
+    c3.metric("Throughput", f"{report.offers_per_minute:.1f} ofertas/min")
+
+    rows = []
+    for item in report.items:
+        rows.append({
+            "Oferta": item.source,
+            "Empresa": item.company_name or "",
+            "Veredicto": item.result.verdict if item.result else "ERROR",
+            "Score": item.result.match_score if item.result else 0,
+            "Tiempo (s)": round(sum(item.timings.values()), 1),
+            "Error": item.error or "",
+        })
+    rows.sort(key=lambda row: row["Score"], reverse=True)
+    st.dataframe(rows, use_container_width=True)
+
+HISTORY_PAGE_SIZE = 50
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_history_page(filters_json, page, order, version):
+    """One page of the history; cached per filters/page until a new analysis is recorded (`version`)."""
+    from app.core.history import HistoryFilter, get_history_store
+    store = get_history_store()
+    filters = HistoryFilter.model_validate_json(filters_json)
+    entries = store.query(filters, limit=HISTORY_PAGE_SIZE, offset=page * HISTORY_PAGE_SIZE, order=order)
+    return [entry.model_dump() for entry in entries], store.count(filters)
+
+def render_history():
+    import datetime
+    from app.core.history import HistoryFilter, get_history_store
+
+    store = get_history_store()
+    if store is None:
+        st.info("El historial está desactivado (HISTORY_ENABLED=false).")
+        return
+
+    st.header("Análisis anteriores")
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
+    verdicts = col1.multiselect("Veredicto", ["STRONGLY_APPLY", "APPLY", "CONSIDER", "IGNORE"], key="history_verdicts")
+    min_score, max_score = col2.slider("Score", 0, 100, (0, 100), key="history_score")
+    company = col3.text_input("Empresa (empieza por)", key="history_company")
+    days = col4.selectbox("Fecha", [0, 1, 7, 30, 90], format_func=lambda d: "Todas" if d == 0 else f"Últimos {d} días", key="history_days")
+    order = st.radio("Orden", ["date", "score"], horizontal=True, format_func=lambda o: "Más recientes" if o == "date" else "Mejor score", key="history_order")
+
+    filters = HistoryFilter(
+        verdicts=verdicts,
+        min_score=min_score if min_score > 0 else None,
+        max_score=max_score if max_score < 100 else None,
+        company=company or None,
+        since=time.time() - days * 86400 if days else None,
+    )
+    filters_json = filters.model_dump_json()
+    # Back to the first page whenever the filters change
+    if st.session_state.get("history_filters") != filters_json:
+        st.session_state["history_filters"] = filters_json
+        st.session_state["history_page"] = 0
+    page = st.session_state.get("history_page", 0)
+
+    # Rounded to the minute so "last N days" does not bust the cache on every rerun
+    cache_filters = filters.model_copy(update={"since": filters.since - filters.since % 60 if filters.since else None})
+    rows, total = load_history_page(cache_filters.model_dump_json(), page, order, store.version())
+    pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+
+    nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+    if nav_prev.button("◀ Anterior", disabled=page == 0, key="history_prev"):
+        st.session_state["history_page"] = page - 1
+        st.rerun()
+    nav_info.caption(f"{total} análisis · página {page + 1} de {pages}")
+    if nav_next.button("Siguiente ▶", disabled=page + 1 >= pages, key="history_next"):
+        st.session_state["history_page"] = page + 1
+        st.rerun()
+
+    if not rows:
+        st.info("No hay análisis que coincidan con los filtros.")
+        return
+
+    table = [{
+        "ID": row["id"],
+        "Fecha": datetime.datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M"),
+        "Empresa": row["company_name"] or "",
+        "Oferta": row["title"] or row["source"],
+        "Veredicto": row["verdict"],
+        "Score": row["match_score"],
+        "Modalidad": row["work_mode"] or "",
+        "LLM": "✔" if row["llm_used"] else "",
+    } for row in rows]
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+    # Full details are only read for the selected entry
+    selected = st.selectbox(
+        "Ver detalle",
+        [row["id"] for row in rows],
+        format_func=lambda i: next(f"#{r['id']} · {r['company_name'] or ''} · {r['title'] or r['source']}"[:120] for r in rows if r["id"] == i),
+        key="history_selected",
+    )
+    entry = store.get(selected) if selected else None
+    if entry and entry.result:
+        st.subheader(f"{entry.result.verdict} · {entry.result.match_score}%")
+        if entry.url:
+            st.write(entry.url)
+        st.write(f"**Resumen:** {entry.result.reasoning_summary}")
+        col_pros, col_cons = st.columns(2)
+        with col_pros:
+            st.success("✅ Fortalezas / Pros")
+            for item in entry.result.pros:
+                st.write(f"- {item}")
+        with col_cons:
+            st.warning("⚠️ Riesgos / Contras")
+            for item in entry.result.cons:
+                st.write(f"- {item}")
+        if entry.research_context:
+            with st.expander("🌐 Investigación de la empresa"):
+                st.markdown(entry.research_context)
+        with st.expander("Oferta extraída (JobOffer)"):
+            st.json(entry.offer.model_dump(exclude={"raw_text"}) if entry.offer else {})
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import html
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import yaml
+from pydantic import BaseModel
+
+from app.tools.html_extract import JOBPOSTING_MIN_DESCRIPTION_CHARS, clean_text, html_to_text
+from app.tools.scrape_session import get_scraper_session
+
+logger = logging.getLogger(__name__)
+
+FEED_TYPES = ("rss", "greenhouse", "lever", "linkedin")
+FEED_DEFAULT_INTERVAL_MINUTES = float(os.getenv("FEED_DEFAULT_INTERVAL_MINUTES", "60"))
+
+class FeedSource(BaseModel):
+    name: str
+    type: str # rss, greenhouse, lever, linkedin
+    url: Optional[str] = None # RSS/Atom feed or saved LinkedIn search
+    board: Optional[str] = None # Greenhouse board token or Lever company slug
+    company: Optional[str] = None # employer name for single-company boards
+    interval_minutes: float = FEED_DEFAULT_INTERVAL_MINUTES
+    max_items: int = 50 # newest postings considered per poll
+    enabled: bool = True
+
+class FeedPosting(BaseModel):
+    source: str
+    id: str # stable per source (guid, ATS id, LinkedIn job id)
+    url: Optional[str] = None
+    title: Optional[str] = None
+    company: Optional[str] = None
+    published: Optional[float] = None # unix timestamp
+    text: str = "" # full description when the feed carries one; otherwise the URL is scraped
+
+def load_feed_sources(path: Path) -> List[FeedSource]:
+    """Sources from a YAML file with a top-level `sources:` list."""
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    sources = [FeedSource(**item) for item in data.get("sources", [])]
+    for source in sources:
+        if source.type not in FEED_TYPES:
+            raise ValueError(f"Unknown feed type '{source.type}' in source '{source.name}'")
+    return [source for source in sources if source.enabled]
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """RFC 822 (RSS) or ISO 8601 (Atom, ATS APIs) dates as unix timestamps."""
+    if not value:
+        return None
+    value = value.strip()
+    for parse in (parsedate_to_datetime, lambda v: datetime.fromisoformat(v.replace("Z", "+00:00"))):
+        try:
+            parsed = parse(value)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return None
+
+def _description(markup: Optional[str], header: List[Optional[str]]) -> str:
+    """Plain text with a title/company/location header; empty when too short to analyze without scraping."""
+    body = html_to_text(markup) if markup and "<" in markup else clean_text(markup or "")
+    if len(body) < JOBPOSTING_MIN_DESCRIPTION_CHARS:
+        return ""
+    return "\n".join(part for part in header if part) + "\n\n" + body
+
+def _fetch(url: str):
+    # Always revalidate (ETag/Last-Modified): an unchanged feed costs a 304
+    return get_scraper_session().fetch(url, fresh_seconds=0).content
+
+# --- RSS / Atom ---
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def _child_text(element: ET.Element, *names: str) -> Optional[str]:
+    for child in element:
+        if _local(child.tag) in names and (child.text or "").strip():
+            return child.text.strip()
+    return None
+
+def _atom_link(entry: ET.Element) -> Optional[str]:
+    for child in entry:
+        if _local(child.tag) == "link" and child.get("href") and child.get("rel", "alternate") == "alternate":
+            return child.get("href")
+    return None
+
+def parse_rss(content, source: FeedSource) -> List[FeedPosting]:
+    root = ET.fromstring(content.encode("utf-8") if isinstance(content, str) else content)
+    postings = []
+    for element in root.iter():
+        if _local(element.tag) not in ("item", "entry"):
+            continue
+        url = _child_text(element, "link") or _atom_link(element)
+        posting_id = _child_text(element, "guid", "id") or url
+        if not posting_id:
+            continue
+        title = _child_text(element, "title")
+        postings.append(FeedPosting(
+            source=source.name,
+            id=posting_id,
+            url=url,
+            title=title,
+            company=source.company,
+            published=_timestamp(_child_text(element, "pubDate", "published", "updated", "date")),
+            text=_description(_child_text(element, "encoded", "content", "description", "summary"), [title, source.company]),
+        ))
+    return postings
+
+# --- Applicant tracking systems ---
+
+def fetch_greenhouse(source: FeedSource) -> List[FeedPosting]:
+    data = json.loads(_fetch(f"https://boards-api.greenhouse.io/v1/boards/{source.board}/jobs?content=true"))
+    postings = []
+    for job in data.get("jobs", []):
+        location = (job.get("location") or {}).get("name")
+        company = source.company or job.get("company_name") or source.board
+        postings.append(FeedPosting(
+            source=source.name,
+            id=str(job["id"]),
+            url=job.get("absolute_url"),
+            title=job.get("title"),
+            company=company,
+            published=_timestamp(job.get("first_published") or job.get("updated_at")),
+            text=_description(html.unescape(job.get("content") or ""), [job.get("title"), company, location]),
+        ))
+    return postings
+
+def fetch_lever(source: FeedSource) -> List[FeedPosting]:
+    data = json.loads(_fetch(f"https://api.lever.co/v0/postings/{source.board}?mode=json"))
+    postings = []
+    for job in data:
+        categories = job.get("categories") or {}
+        sections = [job.get("descriptionPlain") or ""]
+        for section in job.get("lists") or []:
+            sections.append(f"{section.get('text', '')}:\n{html_to_text(section.get('content') or '')}")
+        sections.append(job.get("additionalPlain") or "")
+        company = source.company or source.board
+        postings.append(FeedPosting(
+            source=source.name,
+            id=job["id"],
+            url=job.get("hostedUrl"),
+            title=job.get("text"),
+            company=company,
+            published=job["createdAt"] / 1000 if job.get("createdAt") else None,
+            text=_description("\n\n".join(s for s in sections if s), [job.get("text"), company, categories.get("location"), categories.get("commitment")]),
+        ))
+    return postings
+
+# --- LinkedIn saved searches ---
+
+_LINKEDIN_CARD_RE = re.compile(r'data-entity-urn="urn:li:jobPosting:(\d+)"')
+_LINKEDIN_FIELDS = {
+    "title": re.compile(r'base-search-card__title[^>]*>\s*(.*?)\s*</', re.DOTALL),
+    "company": re.compile(r'base-search-card__subtitle[^>]*>(?:\s*<a[^>]*>)?\s*(.*?)\s*</', re.DOTALL),
+    "date": re.compile(r'<time[^>]*datetime="([^"]+)"'),
+}
+
+def linkedin_guest_url(search_url: str, start: int = 0) -> str:
+    """The public (guest) results endpoint for a saved LinkedIn jobs search URL."""
+    query = urlparse(search_url).query
+    return f"https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search?{query}&start={start}"
+
+def fetch_linkedin(source: FeedSource) -> List[FeedPosting]:
+    content = _fetch(linkedin_guest_url(source.url))
+    markup = content.decode("utf-8", errors="replace") if isinstance(content, bytes) else content
+    postings = []
+    cards = _LINKEDIN_CARD_RE.split(markup)
+    # split() alternates [before, id, card, id, card...]
+    for job_id, card in zip(cards[1::2], cards[2::2]):
+        fields = {name: (pattern.search(card).group(1) if pattern.search(card) else None) for name, pattern in _LINKEDIN_FIELDS.items()}
+        postings.append(FeedPosting(
+            source=source.name,
+            id=job_id,
+            url=f"https://www.linkedin.com/jobs/view/{job_id}/",
+            title=html.unescape(re.sub(r"<[^>]+>", "", fields["title"] or "")).strip() or None,
+            company=html.unescape(re.sub(r"<[^>]+>", "", fields["company"] or "")).strip() or None,
+            published=_timestamp(fields["date"]),
+        ))
+    return postings
+
+FETCHERS: Dict[str, Callable[[FeedSource], List[FeedPosting]]] = {
+    "rss": lambda source: parse_rss(_fetch(source.url), source),
+    "greenhouse": fetch_greenhouse,
+    "lever": fetch_lever,
+    "linkedin": fetch_linkedin,
+}
+
+def fetch_postings(source: FeedSource) -> List[FeedPosting]:
+    """The newest `max_items` postings of a source (newest first when dates are known)."""
+    postings = FETCHERS[source.type](source)
+    postings.sort(key=lambda posting: posting.published or 0, reverse=True)
+    return postings[:source.max_items]
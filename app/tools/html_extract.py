@@ -0,0 +1,345 @@
+import os
+import re
+import json
+import html
+import logging
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# auto (lxml when installed, else stream), lxml, stream (stdlib, no tree) or bs4 (legacy)
+HTML_ENGINES = ("auto", "lxml", "stream", "bs4")
+
+# Elements whose content is never visible text
+SKIP_TAGS = {"script", "style", "nav", "footer", "header", "noscript", "iframe", "svg", "template"}
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "tr", "td", "th", "table", "section", "article", "main", "aside",
+    "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd", "dl", "blockquote", "pre", "hr", "title", "form", "fieldset",
+}
+
+# A JSON-LD description shorter than this is usually a teaser; the page text is used instead
+JOBPOSTING_MIN_DESCRIPTION_CHARS = 300
+
+class JobPosting(BaseModel):
+    """Fields of a schema.org JobPosting (JSON-LD) block."""
+    title: Optional[str] = None
+    company: Optional[str] = None
+    location: Optional[str] = None
+    salary: Optional[str] = None
+    employment_type: Optional[str] = None
+    date_posted: Optional[str] = None
+    description: str = ""
+
+    def to_text(self) -> str:
+        header = [
+            self.title,
+            f"Company: {self.company}" if self.company else None,
+            f"Location: {self.location}" if self.location else None,
+            f"Salary: {self.salary}" if self.salary else None,
+            f"Employment type: {self.employment_type}" if self.employment_type else None,
+        ]
+        return "\n".join([line for line in header if line] + ["", self.description]).strip()
+
+class ExtractedPage(BaseModel):
+    text: str
+    metadata: Dict[str, str] = {} # og_site_name, hiring_organization, title
+    job_posting: Optional[JobPosting] = None
+    engine: str = ""
+
+def get_html_engine() -> str:
+    engine = os.getenv("HTML_EXTRACT_ENGINE", "auto")
+    if engine not in HTML_ENGINES:
+        raise ValueError(f"Unknown HTML extraction engine: {engine}")
+    if engine == "auto":
+        try:
+            import lxml.html  # noqa: F401
+            return "lxml"
+        except ImportError:
+            return "stream"
+    return engine
+
+def clean_text(text: str) -> str:
+    """One phrase per line: strips lines and splits on runs of two spaces."""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+def _to_str(content: Union[str, bytes]) -> str:
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("latin-1")
+
+# --- JSON-LD ---
+
+def _iter_json_ld(data: Any):
+    """Yields every object of a JSON-LD document (lists and @graph included)."""
+    if isinstance(data, list):
+        for entry in data:
+            yield from _iter_json_ld(entry)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _iter_json_ld(data["@graph"])
+
+def _find_hiring_organization(data) -> Optional[str]:
+    """Walks JSON-LD (objects, lists, @graph) looking for a JobPosting's hiringOrganization name."""
+    for entry in _iter_json_ld(data):
+        organization = entry.get("hiringOrganization")
+        if isinstance(organization, dict):
+            return organization.get("name")
+        if isinstance(organization, str):
+            return organization
+    return None
+
+def _is_job_posting(entry: Dict[str, Any]) -> bool:
+    types = entry.get("@type")
+    return "JobPosting" in (types if isinstance(types, list) else [types])
+
+def _name(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("name")
+    return str(value).strip() if value else None
+
+def _format_location(posting: Dict[str, Any]) -> Optional[str]:
+    places = []
+    locations = posting.get("jobLocation") or []
+    for location in locations if isinstance(locations, list) else [locations]:
+        address = location.get("address", {}) if isinstance(location, dict) else {}
+        if isinstance(address, str):
+            places.append(address)
+            continue
+        parts = [address.get("addressLocality"), address.get("addressRegion"), _name(address.get("addressCountry"))]
+        place = ", ".join(str(p) for p in parts if p)
+        if place and place not in places:
+            places.append(place)
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        places.insert(0, "Remote")
+    return "; ".join(places) or None
+
+def _salary_amount(value: Any) -> Optional[float]:
+    """A JSON-LD salary value as a number: 50000, "50000", "50,000.00", "50.000", "€50000"; None if unreadable."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    digits = re.sub(r"[^\d.,]", "", value)
+    # Drop decimals ("50,000.00", "50.000,50"), then the thousands separators
+    digits = re.sub(r"[.,]\d{1,2}$", "", digits)
+    digits = re.sub(r"[.,]", "", digits)
+    return float(digits) if digits else None
+
+def _format_salary(posting: Dict[str, Any]) -> Optional[str]:
+    """'50000 - 60000 EUR per year', in a form filters.extract_salary understands."""
+    salary = posting.get("baseSalary") or posting.get("estimatedSalary")
+    if isinstance(salary, list):
+        salary = salary[0] if salary else None
+    if not isinstance(salary, dict):
+        return None
+    currency = salary.get("currency") or posting.get("salaryCurrency") or ""
+    value = salary.get("value")
+    unit = ""
+    if isinstance(value, dict):
+        unit = str(value.get("unitText") or "").lower()
+        low, high = value.get("minValue"), value.get("maxValue")
+        if low is None and high is None:
+            low = high = value.get("value")
+    else:
+        low = high = value
+    amounts = [amount for amount in (_salary_amount(low), _salary_amount(high)) if amount is not None]
+    if not amounts:
+        return None
+    text = " - ".join(dict.fromkeys(f"{amount:.0f}" for amount in amounts)) + (f" {currency}" if currency else "")
+    return text + (f" per {unit}" if unit else "")
+
+def parse_job_posting(json_ld_blocks: List[str], html_to_text) -> Optional[JobPosting]:
+    """The first JobPosting among the raw JSON-LD blocks; its HTML description goes through `html_to_text`."""
+    for block in json_ld_blocks:
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        for entry in _iter_json_ld(data):
+            if not _is_job_posting(entry):
+                continue
+            description = entry.get("description") or ""
+            if "<" not in description:
+                description = html.unescape(description)
+            if "<" in description:
+                description = html_to_text(description)
+            employment_type = entry.get("employmentType")
+            if isinstance(employment_type, list):
+                employment_type = ", ".join(employment_type)
+            return JobPosting(
+                title=_name(entry.get("title")),
+                company=_name(entry.get("hiringOrganization")),
+                location=_format_location(entry),
+                salary=_format_salary(entry),
+                employment_type=employment_type,
+                date_posted=entry.get("datePosted"),
+                description=clean_text(description),
+            )
+    return None
+
+def _metadata(site_name: Optional[str], title: Optional[str], json_ld_blocks: List[str]) -> Dict[str, str]:
+    metadata = {}
+    if site_name and site_name.strip():
+        metadata["og_site_name"] = site_name.strip()
+    if title and title.strip():
+        metadata["title"] = title.strip()
+    for block in json_ld_blocks:
+        try:
+            name = _find_hiring_organization(json.loads(block))
+        except ValueError:
+            continue
+        if name:
+            metadata["hiring_organization"] = name.strip()
+            break
+    return metadata
+
+# --- Engines: each returns (text, metadata, raw JSON-LD blocks) ---
+
+def _extract_lxml(content: Union[str, bytes]):
+    import lxml.html
+    from lxml import etree
+
+    if isinstance(content, str):
+        # lxml rejects str input with an XML encoding declaration
+        content = content.encode("utf-8")
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+    else:
+        parser = lxml.html.HTMLParser()
+    try:
+        root = lxml.html.document_fromstring(content, parser=parser)
+    except (etree.ParserError, ValueError):
+        return "", {}, []
+
+    json_ld = [s for s in root.xpath('//script[@type="application/ld+json"]/text()')]
+    site_names = root.xpath('//meta[@property="og:site_name"]/@content')
+    metadata = _metadata(site_names[0] if site_names else None, root.findtext(".//title"), json_ld)
+
+    parts: List[str] = []
+    # Comments and processing instructions only come as their own events; the text after them counts
+    walker = etree.iterwalk(root, events=("start", "end", "comment", "pi"))
+    for event, element in walker:
+        tag = element.tag if isinstance(element.tag, str) else ""
+        if event in ("comment", "pi"):
+            if element.tail:
+                parts.append(element.tail)
+        elif event == "start":
+            if tag in SKIP_TAGS or not tag:
+                walker.skip_subtree()
+                continue
+            if tag in BLOCK_TAGS:
+                parts.append("\n")
+            if element.text:
+                parts.append(element.text)
+        else:
+            if tag in BLOCK_TAGS:
+                parts.append("\n")
+            if element.tail:
+                parts.append(element.tail)
+    return "".join(parts), metadata, json_ld
+
+class _StreamingExtractor(HTMLParser):
+    """Strips tags while parsing, without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.json_ld: List[str] = []
+        self.site_name: Optional[str] = None
+        self.title: Optional[str] = None
+        self._skip_stack: List[str] = []
+        self._capture: Optional[List[str]] = None
+        self._capture_tag: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attributes = dict(attrs)
+            if attributes.get("property") == "og:site_name" and self.site_name is None:
+                self.site_name = attributes.get("content")
+            return
+        if tag in SKIP_TAGS:
+            if tag == "script" and dict(attrs).get("type") == "application/ld+json":
+                self._capture, self._capture_tag = [], "script"
+            self._skip_stack.append(tag)
+            return
+        if tag == "title" and self.title is None:
+            self._capture, self._capture_tag = [], "title"
+        if tag in BLOCK_TAGS and not self._skip_stack:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if self._capture is not None and tag == self._capture_tag:
+            if tag == "script":
+                self.json_ld.append("".join(self._capture))
+            else:
+                self.title = "".join(self._capture)
+            self._capture = self._capture_tag = None
+        if self._skip_stack:
+            if tag == self._skip_stack[-1]:
+                self._skip_stack.pop()
+            return
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._capture.append(data)
+        if not self._skip_stack:
+            self.parts.append(data)
+
+def _extract_stream(content: Union[str, bytes]):
+    parser = _StreamingExtractor()
+    parser.feed(_to_str(content))
+    parser.close()
+    return "".join(parser.parts), _metadata(parser.site_name, parser.title, parser.json_ld), parser.json_ld
+
+def _extract_bs4(content: Union[str, bytes]):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, "html.parser")
+    json_ld = [script.string or "" for script in soup.find_all("script", attrs={"type": "application/ld+json"})]
+    site_name = soup.find("meta", attrs={"property": "og:site_name"})
+    metadata = _metadata(
+        site_name.get("content") if site_name else None,
+        soup.title.string if soup.title and soup.title.string else None,
+        json_ld,
+    )
+    # Remove common non-content elements
+    for element in soup(["script", "style", "nav", "footer", "header", "noscript", "iframe", "svg"]):
+        element.extract()
+    return soup.get_text(), metadata, json_ld
+
+ENGINES = {"lxml": _extract_lxml, "stream": _extract_stream, "bs4": _extract_bs4}
+
+def html_to_text(content: Union[str, bytes], engine: Optional[str] = None) -> str:
+    """Visible text of an HTML document or fragment."""
+    text, _, _ = ENGINES[engine or get_html_engine()](content)
+    return clean_text(text)
+
+def extract_page(content: Union[str, bytes], engine: Optional[str] = None) -> ExtractedPage:
+    """
+    Visible text, metadata and the JSON-LD JobPosting of a page. When the page has a
+    JobPosting with a full description, the text is built from it instead of the page body.
+    """
+    engine = engine or get_html_engine()
+    raw_text, metadata, json_ld = ENGINES[engine](content)
+    posting = parse_job_posting(json_ld, lambda fragment: html_to_text(fragment, engine)) if json_ld else None
+    if posting and posting.company and "hiring_organization" not in metadata:
+        metadata["hiring_organization"] = posting.company
+
+    if posting and len(posting.description) >= JOBPOSTING_MIN_DESCRIPTION_CHARS:
+        text = posting.to_text()
+    else:
+        text = clean_text(raw_text)
+    return ExtractedPage(text=text, metadata=metadata, job_posting=posting, engine=engine)
@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.company import normalize_company_name
+from app.core.storage import connect_sqlite
+from app.tools.search import is_incomplete_research
+
+logger = logging.getLogger(__name__)
+
+def _default_fetch(company_name: str) -> str:
+    from app.tools.search import search_company_reputation
+    return search_company_reputation(company_name)
+
+class ResearchStore:
+    """
+    Persistent company research keyed by normalized company name.
+    Fresh entries are served locally; stale ones are served while a background refresh
+    runs; concurrent lookups for the same company share a single search (single-flight).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], str] = _default_fetch,
+        max_age_hours: Optional[float] = None,
+        stale_grace_hours: Optional[float] = None,
+        filename: str = "research.sqlite",
+    ):
+        self.fetch = fetch
+        self.max_age = (max_age_hours if max_age_hours is not None else float(os.getenv("RESEARCH_MAX_AGE_HOURS", "72"))) * 3600
+        self.stale_grace = (stale_grace_hours if stale_grace_hours is not None else float(os.getenv("RESEARCH_STALE_GRACE_HOURS", "168"))) * 3600
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="research-refresh")
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS company_research (
+                    key TEXT PRIMARY KEY,
+                    company_name TEXT NOT NULL,
+                    research TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, company_name: str) -> Optional[Tuple[str, float]]:
+        """Returns (research, age in seconds) without triggering any search."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT research, fetched_at FROM company_research WHERE key = ?",
+                (normalize_company_name(company_name),),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], time.time() - row[1]
+
+    def lookup(self, company_name: str) -> str:
+        """Returns research for the company, searching the web only when needed."""
+        key = normalize_company_name(company_name)
+        if not key:
+            return ""
+
+        cached = self.get(company_name)
+        if cached is not None:
+            research, age = cached
+            if age <= self.max_age:
+                logger.info(f"Research store hit for '{company_name}' ({age / 3600:.1f}h old)")
+                return research
+            if age <= self.max_age + self.stale_grace:
+                logger.info(f"Serving stale research for '{company_name}', refreshing in background")
+                self.refresh_in_background(company_name)
+                return research
+
+        return self._fetch_single_flight(key, company_name)
+
+    def refresh_in_background(self, company_name: str) -> None:
+        key = normalize_company_name(company_name)
+        with self._lock:
+            if key in self._inflight:
+                return
+        self._refresher.submit(self._fetch_single_flight, key, company_name)
+
+    def _fetch_single_flight(self, key: str, company_name: str) -> str:
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            logger.info(f"Joining in-flight research for '{company_name}'")
+            return future.result()
+
+        try:
+            research = self.fetch(company_name)
+            # Failed or timed-out queries are not cached: the next lookup searches again
+            if research and not is_incomplete_research(research):
+                self._save(key, company_name, research)
+            elif research:
+                logger.info(f"Not storing incomplete research for '{company_name}'")
+            future.set_result(research)
+            return research
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _save(self, key: str, company_name: str, research: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO company_research (key, company_name, research, fetched_at) VALUES (?, ?, ?, ?)",
+                (key, company_name, research, time.time()),
+            )
+
+_research_store: Optional[ResearchStore] = None
+_research_store_lock = threading.Lock()
+
+def get_research_store() -> ResearchStore:
+    global _research_store
+    with _research_store_lock:
+        if _research_store is None:
+            _research_store = ResearchStore()
+        return _research_store
@@ -0,0 +1,272 @@
+import os
+import re
+import time
+import zlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from pydantic import BaseModel
+
+from app.core.storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Fetch strategies, in default order: browser impersonation, then a Googlebot user agent (often allowed by WAFs)
+STRATEGIES = ("impersonate", "googlebot")
+GOOGLEBOT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+# Impersonation profile names depend on the primp version; "chrome" is the generic fallback
+SCRAPER_IMPERSONATE = os.getenv("SCRAPER_IMPERSONATE", "chrome_124")
+STRATEGY_TIMEOUTS = {"impersonate": 15, "googlebot": 10}
+
+_CHARSET_RE = re.compile(r"charset=([\w.:-]+)", re.IGNORECASE)
+
+class FetchedPage(BaseModel):
+    url: str
+    content: Union[str, bytes]
+    strategy: str = ""
+    from_cache: bool = False # served from disk without any request
+    revalidated: bool = False # 304 Not Modified
+
+class _DomainLimiter:
+    """At most `concurrency` requests in flight per domain, spaced at least `min_interval` seconds."""
+
+    def __init__(self, concurrency: int, min_interval: float):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+class ScraperSession:
+    """
+    Long-lived HTTP clients for scraping job pages.
+    Reuses connections, rate-limits per domain, remembers which strategy works for each
+    domain and keeps the raw HTML on disk, revalidated with ETag/Last-Modified.
+    """
+
+    def __init__(
+        self,
+        per_domain_concurrency: Optional[int] = None,
+        min_interval_s: Optional[float] = None,
+        fresh_minutes: Optional[float] = None,
+        max_age_days: Optional[float] = None,
+        filename: str = "scraper.sqlite",
+    ):
+        self.per_domain_concurrency = per_domain_concurrency or int(os.getenv("SCRAPE_PER_DOMAIN_CONCURRENCY", "2"))
+        self.min_interval = min_interval_s if min_interval_s is not None else float(os.getenv("SCRAPE_MIN_INTERVAL_S", "1.0"))
+        self.fresh_seconds = (fresh_minutes if fresh_minutes is not None else float(os.getenv("SCRAPE_CACHE_FRESH_MINUTES", "60"))) * 60
+        self.max_age = (max_age_days if max_age_days is not None else float(os.getenv("SCRAPE_CACHE_MAX_AGE_DAYS", "30"))) * 86400
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, _DomainLimiter] = {}
+        self._primp_client = None
+        self._requests_session: Optional[requests.Session] = None
+        self._fetchers: Dict[str, Callable] = {"impersonate": self._get_impersonate, "googlebot": self._get_googlebot}
+        self._conn = connect_sqlite(filename)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    content_type TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    strategy TEXT,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS domain_strategies (
+                    domain TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_success REAL,
+                    last_failure REAL,
+                    PRIMARY KEY (domain, strategy)
+                )
+                """
+            )
+        self.prune()
+
+    # --- Clients ---
+
+    def _primp(self):
+        with self._lock:
+            if self._primp_client is None:
+                import primp
+                try:
+                    self._primp_client = primp.Client(impersonate=SCRAPER_IMPERSONATE, follow_redirects=True)
+                except Exception as e:
+                    logger.warning(f"Impersonation profile '{SCRAPER_IMPERSONATE}' not available ({e}), using 'chrome'")
+                    self._primp_client = primp.Client(impersonate="chrome", follow_redirects=True)
+            return self._primp_client
+
+    def _requests(self) -> requests.Session:
+        with self._lock:
+            if self._requests_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=self.per_domain_concurrency * 8)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(GOOGLEBOT_HEADERS)
+                self._requests_session = session
+            return self._requests_session
+
+    def _get_impersonate(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        response = self._primp().get(url, headers=headers or None, timeout=STRATEGY_TIMEOUTS["impersonate"])
+        return response.status_code, {k.lower(): v for k, v in dict(response.headers).items()}, response.content
+
+    def _get_googlebot(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        response = self._requests().get(url, headers=headers, timeout=STRATEGY_TIMEOUTS["googlebot"])
+        return response.status_code, {k.lower(): v for k, v in response.headers.items()}, response.content
+
+    def _limiter(self, domain: str) -> _DomainLimiter:
+        with self._lock:
+            limiter = self._limiters.get(domain)
+            if limiter is None:
+                limiter = self._limiters[domain] = _DomainLimiter(self.per_domain_concurrency, self.min_interval)
+            return limiter
+
+    # --- Strategy memory ---
+
+    def strategy_order(self, domain: str) -> List[str]:
+        """Strategies that worked for the domain first; ones that only failed there go last."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT strategy, successes, failures, last_success, last_failure FROM domain_strategies WHERE domain = ?",
+                (domain,),
+            ).fetchall()
+        stats = {row[0]: row[1:] for row in rows}
+
+        def rank(strategy: str):
+            successes, failures, last_success, last_failure = stats.get(strategy, (0, 0, None, None))
+            if last_success and (not last_failure or last_success >= last_failure):
+                return (0, -last_success)
+            if last_failure:
+                return (2, last_failure)
+            return (1, STRATEGIES.index(strategy))
+
+        return sorted(STRATEGIES, key=rank)
+
+    def _record(self, domain: str, strategy: str, ok: bool) -> None:
+        column = "successes" if ok else "failures"
+        stamp = "last_success" if ok else "last_failure"
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""
+                INSERT INTO domain_strategies (domain, strategy, {column}, {stamp}) VALUES (?, ?, 1, ?)
+                ON CONFLICT(domain, strategy) DO UPDATE SET {column} = {column} + 1, {stamp} = excluded.{stamp}
+                """,
+                (domain, strategy, time.time()),
+            )
+
+    # --- Raw HTML cache ---
+
+    def _cached(self, url: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT body, content_type, etag, last_modified, strategy, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _store(self, url: str, body: bytes, headers: Dict[str, str], strategy: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, content_type, etag, last_modified, strategy, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, zlib.compress(body), headers.get("content-type"), headers.get("etag"), headers.get("last-modified"), strategy, time.time()),
+            )
+
+    def _touch(self, url: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def prune(self) -> None:
+        """Drops cached pages older than the max age (also run on startup)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.max_age,))
+
+    @staticmethod
+    def _decode(body: bytes, content_type: Optional[str]) -> Union[str, bytes]:
+        """Decodes with the charset from Content-Type; otherwise the HTML parser sniffs it from the bytes."""
+        match = _CHARSET_RE.search(content_type or "")
+        if match:
+            try:
+                return body.decode(match.group(1), errors="replace")
+            except LookupError:
+                pass
+        return body
+
+    # --- Fetch ---
+
+    def fetch(self, url: str, use_cache: bool = True, fresh_seconds: Optional[float] = None) -> FetchedPage:
+        """
+        Raw page content. Raises the last strategy error when every strategy fails.
+        `fresh_seconds` overrides how long a cached copy is served without revalidating (0: always revalidate).
+        """
+        cached = self._cached(url) if use_cache else None
+        fresh_seconds = self.fresh_seconds if fresh_seconds is None else fresh_seconds
+        if cached and time.time() - cached[5] <= fresh_seconds:
+            logger.info(f"Raw HTML cache hit for {url}")
+            return FetchedPage(url=url, content=self._decode(zlib.decompress(cached[0]), cached[1]), strategy=cached[4] or "", from_cache=True)
+
+        conditional = {}
+        if cached:
+            if cached[2]:
+                conditional["If-None-Match"] = cached[2]
+            if cached[3]:
+                conditional["If-Modified-Since"] = cached[3]
+
+        domain = (urlparse(url).hostname or "").lower()
+        last_error: Optional[Exception] = None
+        with self._limiter(domain):
+            for strategy in self.strategy_order(domain):
+                try:
+                    status, headers, body = self._fetchers[strategy](url, conditional)
+                    if status == 304 and cached:
+                        self._record(domain, strategy, ok=True)
+                        self._touch(url)
+                        logger.info(f"{url} not modified, serving cached HTML")
+                        return FetchedPage(url=url, content=self._decode(zlib.decompress(cached[0]), cached[1]), strategy=strategy, revalidated=True)
+                    if status >= 400:
+                        raise requests.HTTPError(f"HTTP {status} for {url}")
+                except Exception as e:
+                    logger.warning(f"Strategy '{strategy}' failed for {domain}: {e}")
+                    self._record(domain, strategy, ok=False)
+                    last_error = e
+                    continue
+
+                self._record(domain, strategy, ok=True)
+                self._store(url, body, headers, strategy)
+                return FetchedPage(url=url, content=self._decode(body, headers.get("content-type")), strategy=strategy)
+
+        raise last_error or RuntimeError(f"No scraping strategy available for {url}")
+
+_scraper_session: Optional[ScraperSession] = None
+_scraper_session_lock = threading.Lock()
+
+def get_scraper_session() -> ScraperSession:
+    global _scraper_session
+    with _scraper_session_lock:
+        if _scraper_session is None:
+            _scraper_session = ScraperSession()
+        return _scraper_session
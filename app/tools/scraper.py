@@ -1,52 +1,45 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from app.core.tracing import span
+from app.tools.html_extract import JobPosting, extract_page
+from app.tools.scrape_session import get_scraper_session
 
 logger = logging.getLogger(__name__)
 
+class ScrapedPage(BaseModel):
+    url: str
+    text: str
+    metadata: Dict[str, str] = {} # og_site_name, hiring_organization, title
+    job_posting: Optional[JobPosting] = None # JSON-LD JobPosting, when the page has one
+
 def scrape_job_url(url: str) -> str:
     """
     Fetches the content of a URL and returns the visible text.
-    Uses 'primp' to mimic a real browser and bypass 403 Forbidden errors.
+    Uses 'primp' to mimic a real browser and bypass 403 Forbidden errors, falling back to
+    a Googlebot user agent (see ScraperSession for pooling, rate limits and caching).
     """
+    return scrape_job_page(url).text
+
+def scrape_job_page(url: str) -> ScrapedPage:
+    """Like scrape_job_url, but also returns the page metadata and the structured JobPosting."""
     logger.info(f"Scraping URL: {url}")
-    
-    # Try using primp (Browser Impersonation)
-    try:
-        import primp
-        # Try mimicking a standard browser first
-        client = primp.Client(impersonate="chrome_124", follow_redirects=True)
-        response = client.get(url, timeout=15)
-        response.raise_for_status()
-        html_content = response.text
-    except Exception as e:
-        logger.warning(f"Primp chrome impersonation failed: {e}. Trying Googlebot fallback...")
+
+    with span("scrape", url=url) as scrape_span:
         try:
-             # Fallback: Pretend to be Googlebot (often allowed by WAFs)
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            html_content = response.content
-        except Exception as e2:
-            logger.error(f"All scraping methods failed for {url}: {e2}")
+            with span("scrape.fetch") as fetch_span:
+                fetched = get_scraper_session().fetch(url)
+                fetch_span.set(bytes=len(fetched.content), strategy=fetched.strategy, from_cache=fetched.from_cache, revalidated=fetched.revalidated)
+        except Exception as e:
+            logger.error(f"All scraping methods failed for {url}: {e}")
             # Instead of crashing, return a helpful message so the user knows to paste text
-            raise ValueError(f"Unable to access URL (Protected by WAF/Cloudflare). Please copy/paste the job description text manually.\nDetails: {e2}")
-
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Remove common non-content elements
-    for element in soup(["script", "style", "nav", "footer", "header", "noscript", "iframe", "svg"]):
-        element.extract()
-        
-    # Get text
-    text = soup.get_text()
-    
-    # Clean up whitespace
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = '\n'.join(chunk for chunk in chunks if chunk)
-    
-    return text
+            raise ValueError(f"Unable to access URL (Protected by WAF/Cloudflare). Please copy/paste the job description text manually.\nDetails: {e}")
+
+        with span("scrape.extract") as extract_span:
+            page = extract_page(fetched.content)
+            extract_span.set(engine=page.engine, chars=len(page.text), job_posting=page.job_posting is not None)
+        scrape_span.set(chars=len(page.text))
+    logger.info(f"Extracted {len(page.text)} chars with the {page.engine} engine" + (" (JSON-LD JobPosting)" if page.job_posting else ""))
+    return ScrapedPage(url=url, text=page.text, metadata=page.metadata, job_posting=page.job_posting)
@@ -1,43 +1,161 @@
-from duckduckgo_search import DDGS
+import os
+import json
+import time
 import logging
-from typing import List, Dict
+from abc import ABC, abstractmethod
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Optional
+
+from app.core.tracing import span, propagate
 
 logger = logging.getLogger(__name__)
 
-def search_company_reputation(company_name: str, max_results: int = 5) -> str:
+QUERY_TEMPLATES = [
+    "{company} tech company reviews glassdoor reddit blind",
+    "{company} layoffs news",
+    "{company} work culture reviews",
+]
+
+# Status lines in the research text; research with any of them is incomplete
+SEARCH_ERROR_PREFIX = "Error performing search"
+QUERY_ERROR_PREFIX = "Error searching for"
+QUERY_TIMEOUT_PREFIX = "Search timed out for"
+
+def is_incomplete_research(research: str) -> bool:
+    """True if the search failed, or some query failed or missed its deadline."""
+    return any(line.startswith((SEARCH_ERROR_PREFIX, QUERY_ERROR_PREFIX, QUERY_TIMEOUT_PREFIX)) for line in (research or "").splitlines())
+
+class SearchProvider(ABC):
+    """A web search backend returning dicts with 'title', 'href' and 'body'."""
+
+    @abstractmethod
+    def text(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        ...
+
+class DuckDuckGoProvider(SearchProvider):
+    def text(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        from duckduckgo_search import DDGS
+        # One DDGS session per query so queries can run in parallel threads.
+        # Reverting to default region to ensure results. 'wt-wt' might be returning empty for niche queries.
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+class FakeSearchProvider(SearchProvider):
+    """
+    Offline provider for benchmarks and local runs.
+    Returns canned results per query (or generic ones) after a simulated latency.
+    """
+
+    def __init__(self, results: Optional[Dict[str, List[Dict[str, str]]]] = None, latency_s: float = 0.0):
+        self.results = results or {}
+        self.latency_s = latency_s
+
+    def text(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if query in self.results:
+            return self.results[query][:max_results]
+        return [
+            {"title": f"Result {i + 1} for {query}", "href": f"https://example.com/{i + 1}", "body": f"Snippet about {query}."}
+            for i in range(max_results)
+        ]
+
+def get_search_provider() -> SearchProvider:
+    """Selects the provider from SEARCH_PROVIDER ('ddg' or 'fake')."""
+    name = os.getenv("SEARCH_PROVIDER", "ddg").lower()
+    if name == "fake":
+        # Optional canned results: JSON object mapping each query to its result list
+        fixtures = os.getenv("FAKE_SEARCH_FIXTURES")
+        results = json.loads(Path(fixtures).read_text(encoding="utf-8")) if fixtures else None
+        return FakeSearchProvider(results=results, latency_s=float(os.getenv("FAKE_SEARCH_LATENCY", "0")))
+    if name in ("ddg", "duckduckgo"):
+        return DuckDuckGoProvider()
+    raise ValueError(f"Unknown search provider: {name}")
+
+def _traced_query(provider: SearchProvider, query: str, max_results: int, started_at: Dict[str, float]) -> List[Dict[str, str]]:
+    # The query timeout counts from here, not from submission: the pool may be busy
+    started_at[query] = time.monotonic()
+    with span("search.query", query=query) as query_span:
+        results = provider.text(query, max_results)
+        query_span.set(results=len(results or []), bytes=sum(len(r.get("body") or "") for r in results or []))
+        return results
+
+# Shared pool: queries that miss their deadline keep running here without blocking the caller
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_MAX_WORKERS", "8")), thread_name_prefix="search")
+
+def _wait_query(future, query: str, started_at: Dict[str, float], query_timeout: float, total_deadline: float):
+    """The query's results, or FutureTimeoutError once it ran for query_timeout or the total deadline passed."""
+    while True:
+        started = started_at.get(query)
+        deadline = total_deadline if started is None else min(total_deadline, started + query_timeout)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FutureTimeoutError()
+        try:
+            # Still queued: check again soon whether it has started
+            return future.result(timeout=remaining if started is not None else min(remaining, 0.1))
+        except FutureTimeoutError:
+            continue
+
+def search_company_reputation(
+    company_name: str,
+    max_results: Optional[int] = None,
+    provider: Optional[SearchProvider] = None,
+    max_queries: Optional[int] = None,
+    query_timeout: Optional[float] = None,
+    total_timeout: Optional[float] = None,
+) -> str:
     """
     Searches for company reputation, reviews, and red flags using DuckDuckGo.
     Returns a summarized string of titles and snippets.
+    Queries run concurrently; each has its own deadline and whatever finished
+    before the overall budget expires is returned.
     """
     if not company_name:
         return ""
-    
-    queries = [
-        f"{company_name} tech company reviews glassdoor reddit blind",
-        f"{company_name} layoffs news",
-        f"{company_name} work culture reviews"
-    ]
-    
+
+    max_results = max_results or int(os.getenv("SEARCH_RESULTS_PER_QUERY", "3"))
+    max_queries = max_queries or int(os.getenv("SEARCH_MAX_QUERIES", str(len(QUERY_TEMPLATES))))
+    query_timeout = query_timeout or float(os.getenv("SEARCH_QUERY_TIMEOUT", "8"))
+    total_timeout = total_timeout or float(os.getenv("SEARCH_TOTAL_TIMEOUT", "12"))
+
+    queries = [template.format(company=company_name) for template in QUERY_TEMPLATES[:max_queries]]
+
     results_text = []
-    
-    try:
-        with DDGS() as ddgs:
+
+    with span("search", company=company_name, queries=len(queries)) as search_span:
+        try:
+            provider = provider or get_search_provider()
+            total_deadline = time.monotonic() + total_timeout
+            started_at: Dict[str, float] = {}
+            futures = []
             for query in queries:
                 logger.info(f"Searching for: {query}")
+                futures.append(_executor.submit(propagate(_traced_query), provider, query, max_results, started_at))
+
+            for query, future in zip(queries, futures):
                 try:
-                    # Reverting to default region to ensure results. 'wt-wt' might be returning empty for niche queries.
-                    results = list(ddgs.text(query, max_results=3))
+                    results = _wait_query(future, query, started_at, query_timeout, total_deadline)
                     if results:
                         results_text.append(f"--- Results for '{query}' ---")
                         for r in results:
                             results_text.append(f"- [{r.get('title')}]({r.get('href')}): {r.get('body')}")
                     else:
                         logger.warning(f"No results found for query: {query}")
+                except FutureTimeoutError:
+                    future.cancel()
+                    search_span.set(deadline_exceeded=True)
+                    logger.warning(f"Search deadline exceeded for '{query}', returning partial results")
+                    results_text.append(f"{QUERY_TIMEOUT_PREFIX} '{query}'")
                 except Exception as e:
                     logger.error(f"Error searching for '{query}': {e}")
-                    results_text.append(f"Error searching for '{query}': {str(e)}")
-    except Exception as e:
-        logger.error(f"Search error for {company_name}: {e}")
-        return f"Error performing search: {str(e)}"
+                    results_text.append(f"{QUERY_ERROR_PREFIX} '{query}': {str(e)}")
+        except Exception as e:
+            logger.error(f"Search error for {company_name}: {e}")
+            search_span.status = "ERROR"
+            return f"{SEARCH_ERROR_PREFIX}: {str(e)}"
 
-    return "\n".join(results_text)
+        text = "\n".join(results_text)
+        search_span.set(bytes=len(text))
+    return text
@@ -0,0 +1,97 @@
+"""
+Offers per minute of batched scoring (CareerAgent.analyze_batch, several condensed offers
+per LLM call) against one `analyze` call per offer, on the mock Ollama. Neither side
+researches the company, as when triaging a feed.
+
+    python -m benchmarks.batch_scoring --offers 24 --batch-size 6
+    python -m benchmarks.batch_scoring --offers 24 --prefix-cache   # Ollama reusing the system prompt KV cache
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+OFFERS_DIR = Path(__file__).parent / "fixtures" / "offers"
+
+def configure_environment(storage_dir: str, ollama_url: str) -> None:
+    """Must run before the app modules are imported: they read their settings at import time."""
+    os.environ.update({
+        "STORAGE_DIR": storage_dir,
+        "OLLAMA_BASE_URL": ollama_url,
+        "LLM_CACHE_ENABLED": "false",
+        "DEDUP_ENABLED": "false",
+        "HISTORY_ENABLED": "false",
+        "TRACING_ENABLED": "false",
+    })
+
+def load_offers(count: int) -> List[str]:
+    """`count` distinct offers, cycling over the fixtures."""
+    fixtures = [path.read_text(encoding="utf-8") for path in sorted(OFFERS_DIR.glob("*.txt"))]
+    return [f"{fixtures[i % len(fixtures)]}\nRef. {i + 1:04d}" for i in range(count)]
+
+def bench(label: str, score: Callable[[List[str]], List[Any]], offers: List[str], ollama: MockOllamaServer) -> Dict[str, Any]:
+    requests = ollama.requests
+    started = time.perf_counter()
+    results = score(offers)
+    elapsed = time.perf_counter() - started
+    row = {
+        "label": label,
+        "offers": len(offers),
+        "elapsed_s": elapsed,
+        "offers_per_minute": len(offers) * 60 / elapsed if elapsed else 0.0,
+        "llm_requests": ollama.requests - requests,
+        "errors": sum(1 for result in results if result.verdict == "ERROR"),
+    }
+    print(f"{label:<10} {len(offers)} offers in {elapsed:6.1f}s ({row['offers_per_minute']:6.1f} offers/min), "
+          f"{row['llm_requests']} LLM requests, {row['errors']} errors", flush=True)
+    return row
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=6, help="Max offers per batched call")
+    parser.add_argument("--tokens-per-second", type=float, default=MockOllamaConfig().tokens_per_second)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=MockOllamaConfig().prompt_tokens_per_second)
+    parser.add_argument("--load-latency", type=float, default=MockOllamaConfig().load_latency_s)
+    parser.add_argument("--prefix-cache", action="store_true", help="The mock skips an unchanged system prompt")
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    config = MockOllamaConfig(
+        load_latency_s=args.load_latency,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        tokens_per_second=args.tokens_per_second,
+        prefix_cache=args.prefix_cache,
+    )
+    ollama = MockOllamaServer(config=config).start()
+    configure_environment(tempfile.mkdtemp(prefix="career-bench-"), ollama.base_url)
+
+    from app.core.agent import CareerAgent
+    from app.core.profile import load_portfolio
+
+    agent = CareerAgent(load_portfolio(), use_cache=False)
+    offers = load_offers(args.offers)
+    agent.retrieve_evidence(offers[0]) # builds the portfolio index outside the timings
+
+    rows = [
+        bench("single", lambda texts: [agent.analyze(text) for text in texts], offers, ollama),
+        bench("batched", lambda texts: agent.analyze_batch(texts, max_offers=args.batch_size), offers, ollama),
+    ]
+    ollama.stop()
+
+    single, batched = rows
+    if single["offers_per_minute"]:
+        print(f"\nBatched vs single: {batched['offers_per_minute'] / single['offers_per_minute']:.2f}x offers/min")
+    if args.output:
+        report = {"config": {"batch_size": args.batch_size, **config.model_dump()}, "results": rows}
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return 0 if not any(row["errors"] for row in rows) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Compares the HTML extraction engines on saved job pages.
+
+'bs4' is the original path (BeautifulSoup + html.parser, full tree then extract()),
+'stream' strips tags while parsing with the stdlib parser and 'lxml' walks a C-built tree.
+Reports time per page, peak memory while extracting and whether a JobPosting was found.
+
+    python -m benchmarks.html_extract --repeat 20
+"""
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+from pathlib import Path
+
+from app.tools.html_extract import ENGINES, extract_page
+
+HTML_DIR = Path(__file__).parent / "fixtures" / "html"
+
+def load_pages():
+    return [(path.stem, path.read_bytes()) for path in sorted(HTML_DIR.glob("*.html"))]
+
+def bench_engine(engine: str, content: bytes, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = extract_page(content, engine=engine)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    extract_page(content, engine=engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return page, statistics.median(timings), peak
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Extractions per page and engine")
+    parser.add_argument("--engines", nargs="*", default=["bs4", "stream", "lxml"], choices=list(ENGINES))
+    args = parser.parse_args(argv)
+
+    totals = {engine: 0.0 for engine in args.engines}
+    for name, content in load_pages():
+        print(f"\n{name} ({len(content) / 1024:.0f} KB)")
+        for engine in args.engines:
+            page, median, peak = bench_engine(engine, content, args.repeat)
+            totals[engine] += median
+            posting = "JobPosting" if page.job_posting else "-"
+            print(f"  {engine:<7} {median * 1000:8.1f} ms  peak {peak / 1024 / 1024:6.1f} MB  text {len(page.text):6} chars  {posting}")
+
+    if "bs4" in totals and totals["bs4"]:
+        print()
+        for engine, total in totals.items():
+            print(f"{engine:<7} total {total * 1000:8.1f} ms  speed-up vs bs4 x{totals['bs4'] / total:.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
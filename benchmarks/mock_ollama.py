@@ -0,0 +1,246 @@
+"""
+Local stand-in for the Ollama HTTP API, for offline benchmarks.
+
+Serves /api/generate and /api/chat (streamed NDJSON or a single JSON body) with a
+configurable load latency, prompt-eval rate and generation rate, and reports the same
+timing fields Ollama puts in its final chunk. JSON-mode requests get a valid analysis
+(one per offer for batched prompts), the company extraction prompt gets the company
+named in the text. With prefix_cache an unchanged system prompt is not evaluated again. /api/embed returns
+deterministic bag-of-words vectors.
+
+    python -m benchmarks.mock_ollama --port 11555 --tokens-per-second 40
+"""
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+class MockOllamaConfig(BaseModel):
+    load_latency_s: float = 0.05 # added to every request (model already loaded)
+    prompt_tokens_per_second: float = 2000.0
+    tokens_per_second: float = 40.0
+    chars_per_token: float = 3.5
+    max_parallel: int = 1 # requests evaluated at once, like OLLAMA_NUM_PARALLEL
+    embedding_dim: int = 256
+    json_trailing_tokens: int = 0 # whitespace after the JSON object, as llama3 sometimes emits in JSON mode
+    prefix_cache: bool = False # skip prompt eval of a system prompt equal to the previous one (Ollama KV cache)
+
+def _analysis_for(text: str) -> str:
+    # Deterministic per prompt, so runs are reproducible
+    score = zlib.crc32(text.encode()) % 101
+    verdict = "APPLY" if score >= 70 else "CONSIDER" if score >= 40 else "IGNORE"
+    return json.dumps({
+        "match_score": score,
+        "verdict": verdict,
+        "reasoning_summary": "Evaluación simulada por el servidor de benchmark.",
+        "pros": ["Stack alineado con el perfil", "Modalidad compatible"],
+        "cons": ["Dato simulado"],
+        "hard_filter_check": {"remote_pass": True, "visa_pass": True, "salary_pass": True},
+    }, ensure_ascii=False)
+
+# Offers of a batched scoring prompt (app.core.prompts.BATCH_OFFER_HEADER)
+_BATCH_OFFER_RE = re.compile(r"^### OFERTA (\d+)\n", re.MULTILINE)
+
+def _batch_analysis_for(prompt: str) -> str:
+    parts = _BATCH_OFFER_RE.split(prompt)
+    # split() alternates [before, number, offer, number, offer...]
+    results = [{"offer": int(number), **json.loads(_analysis_for(text))} for number, text in zip(parts[1::2], parts[2::2])]
+    return json.dumps({"results": results}, ensure_ascii=False)
+
+def _company_for(prompt: str) -> str:
+    substring = prompt.split("Text substring:", 1)[-1]
+    match = re.search(r"\b(?:About|Sobre)\s+([A-Z][\w&.-]+(?: [A-Z][\w&.-]+)?)", substring)
+    return match.group(1) if match else "Unknown"
+
+def _reply(body: Dict[str, Any]) -> str:
+    if "messages" in body:
+        prompt = "\n".join(m.get("content", "") for m in body["messages"])
+    else:
+        prompt = body.get("prompt", "")
+    if body.get("format") == "json":
+        if '"cons_to_add"' in prompt:
+            return json.dumps({"match_score": 50, "verdict": "CONSIDER", "cons_to_add": ["Alertas en la investigación"]})
+        if '"results"' in prompt and _BATCH_OFFER_RE.search(prompt):
+            return _batch_analysis_for(prompt)
+        return _analysis_for(prompt)
+    if "Extract ONLY the company name" in prompt:
+        return _company_for(prompt)
+    return "OK"
+
+def _embedding_for(text: str, dim: int) -> List[float]:
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        vector[zlib.crc32(word.encode()) % dim] += 1.0
+    return vector
+
+def _split_tokens(text: str, chars_per_token: float) -> List[str]:
+    size = max(1, int(chars_per_token))
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+class MockOllamaServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[MockOllamaConfig] = None):
+        self.config = config or MockOllamaConfig()
+        self.requests = 0
+        self._slots = threading.BoundedSemaphore(self.config.max_parallel)
+        self._cached_prefix = ""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if self.path not in ("/api/generate", "/api/chat", "/api/embed"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server.requests += 1
+                if self.path == "/api/embed":
+                    server._embed(self, body)
+                    return
+                with server._slots:
+                    server._respond(self, body, chat=self.path == "/api/chat")
+
+        return Handler
+
+    def _embed(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(sum(len(text) for text in texts) / self.config.chars_per_token / self.config.prompt_tokens_per_second)
+        payload = json.dumps({"model": body.get("model"), "embeddings": [_embedding_for(text, self.config.embedding_dim) for text in texts]}).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any], chat: bool) -> None:
+        config = self.config
+        started = time.perf_counter()
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", [])) + len(body.get("prompt", ""))
+        system = next((m.get("content", "") for m in body.get("messages", []) if m.get("role") == "system"), "")
+        if config.prefix_cache and system and system == self._cached_prefix:
+            prompt_chars -= len(system)
+        self._cached_prefix = system
+        prompt_tokens = max(1, int(prompt_chars / config.chars_per_token))
+        num_predict = (body.get("options") or {}).get("num_predict", -1)
+        tokens = _split_tokens(_reply(body), config.chars_per_token)
+        if body.get("format") == "json":
+            tokens += ["\n"] * config.json_trailing_tokens
+        truncated = bool(num_predict and 0 < num_predict < len(tokens))
+        if truncated:
+            tokens = tokens[:num_predict]
+
+        prompt_eval_s = prompt_tokens / config.prompt_tokens_per_second
+        time.sleep(config.load_latency_s + prompt_eval_s)
+        stream = body.get("stream", True)
+
+        def chunk(text: str) -> Dict[str, Any]:
+            data = {"model": body.get("model"), "done": False}
+            if chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            return data
+
+        def final(text: str = "") -> Dict[str, Any]:
+            data = chunk(text)
+            eval_s = len(tokens) / config.tokens_per_second
+            data.update({
+                "done": True,
+                "done_reason": "length" if truncated else "stop",
+                "load_duration": int(config.load_latency_s * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_eval_s * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(eval_s * 1e9),
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+            })
+            return data
+
+        handler.send_response(200)
+        if not stream:
+            time.sleep(len(tokens) / config.tokens_per_second)
+            payload = json.dumps(final("".join(tokens))).encode()
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write(data: Dict[str, Any]) -> None:
+            line = (json.dumps(data) + "\n").encode()
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            handler.wfile.flush()
+
+        try:
+            for token in tokens:
+                time.sleep(1 / config.tokens_per_second)
+                write(chunk(token))
+            write(final())
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client closed the stream early
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11555)
+    parser.add_argument("--load-latency", type=float, default=MockOllamaConfig().load_latency_s)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=MockOllamaConfig().prompt_tokens_per_second)
+    parser.add_argument("--tokens-per-second", type=float, default=MockOllamaConfig().tokens_per_second)
+    parser.add_argument("--max-parallel", type=int, default=MockOllamaConfig().max_parallel)
+    parser.add_argument("--json-trailing-tokens", type=int, default=MockOllamaConfig().json_trailing_tokens)
+    parser.add_argument("--prefix-cache", action="store_true", help="Do not re-evaluate an unchanged system prompt")
+    args = parser.parse_args(argv)
+
+    config = MockOllamaConfig(
+        load_latency_s=args.load_latency,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        tokens_per_second=args.tokens_per_second,
+        max_parallel=args.max_parallel,
+        json_trailing_tokens=args.json_trailing_tokens,
+        prefix_cache=args.prefix_cache,
+    )
+    server = MockOllamaServer(args.host, args.port, config)
+    print(f"Mock Ollama listening on {server.base_url}", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
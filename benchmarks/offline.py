@@ -0,0 +1,203 @@
+"""
+Offline end-to-end benchmark of the CareerAgent flow.
+
+Everything runs locally and is reproducible:
+- job pages come from benchmarks/fixtures/html, served by a local HTTP server
+- pasted offers come from benchmarks/fixtures/offers
+- company searches are answered from benchmarks/fixtures/search/results.json
+- Ollama is replaced by benchmarks.mock_ollama (configurable latency and token rate)
+
+Each offer goes through scraping, hard filters, company extraction, research and the
+LLM analysis as in the UI. The report has per-stage latency (from the tracing spans),
+throughput and peak memory. With --baseline the run fails when it regresses:
+
+    python -m benchmarks.offline --runs 2 --save-baseline benchmarks/baselines/offline.json
+    python -m benchmarks.offline --runs 2 --baseline benchmarks/baselines/offline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+FIXTURES = Path(__file__).parent / "fixtures"
+HTML_DIR = FIXTURES / "html"
+OFFERS_DIR = FIXTURES / "offers"
+SEARCH_FIXTURES = FIXTURES / "search" / "results.json"
+
+# Stages compared against the baseline; shorter ones are noise
+MIN_COMPARED_SECONDS = 0.02
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_html() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(HTML_DIR)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="html-fixtures", daemon=True).start()
+    return server
+
+def configure_environment(storage_dir: str, ollama_url: str, args) -> None:
+    """Must run before the app modules are imported: they read their settings at import time."""
+    os.environ.update({
+        "STORAGE_DIR": storage_dir,
+        "OLLAMA_BASE_URL": ollama_url,
+        "SEARCH_PROVIDER": "fake",
+        "FAKE_SEARCH_FIXTURES": str(SEARCH_FIXTURES),
+        "FAKE_SEARCH_LATENCY": str(args.search_latency),
+        "ANALYSIS_MODE": args.mode,
+        "SCRAPE_MIN_INTERVAL_S": "0",
+        "TRACING_ENABLED": "true",
+        "HISTORY_ENABLED": "false",
+    })
+    if not args.warm:
+        # Every pass pays for the full flow
+        os.environ.update({
+            "LLM_CACHE_ENABLED": "false",
+            "DEDUP_ENABLED": "false",
+            "SCRAPE_CACHE_FRESH_MINUTES": "0",
+            "RESEARCH_MAX_AGE_HOURS": "0",
+            "RESEARCH_STALE_GRACE_HOURS": "0",
+        })
+
+def load_cases(html_base_url: str) -> List[Tuple[str, str, str]]:
+    """(name, url, text): pages are scraped from the local server, offers are pasted text."""
+    cases = [(path.stem, f"{html_base_url}/{path.name}", "") for path in sorted(HTML_DIR.glob("*.html"))]
+    cases += [(path.stem, "", path.read_text(encoding="utf-8")) for path in sorted(OFFERS_DIR.glob("*.txt"))]
+    return cases
+
+def run_case(agent, url: str, text: str, stream: bool) -> Dict[str, Any]:
+    from app.core.tracing import collect, span
+    from app.tools.scraper import scrape_job_page
+
+    with collect() as trace, span("offer", url=url or None):
+        metadata = {}
+        if url:
+            page = scrape_job_page(url)
+            text, metadata = page.text, page.metadata
+        result = agent.prefilter(text, url=url or None)
+        if result is None:
+            staged = agent.run_analysis(text, url=url or None, metadata=metadata, on_token=(lambda token: None) if stream else None)
+            result = staged.result
+    return {"verdict": result.verdict, "spans": [(s.name, s.duration_s) for s in trace.spans]}
+
+def summarize(durations: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    from app.core.tracing import percentiles
+    return {
+        name: {"count": len(values), "mean": sum(values) / len(values), **percentiles(values)}
+        for name, values in sorted(durations.items())
+    }
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions of `report` against `baseline`."""
+    regressions = []
+    for name, stats in baseline.get("stages", {}).items():
+        current = report["stages"].get(name)
+        if current is None or stats["p50"] < MIN_COMPARED_SECONDS:
+            continue
+        if current["p50"] > stats["p50"] * (1 + tolerance) + MIN_COMPARED_SECONDS:
+            regressions.append(f"{name}: p50 {stats['p50'] * 1000:.1f} ms -> {current['p50'] * 1000:.1f} ms")
+    if report["offers_per_minute"] < baseline["offers_per_minute"] * (1 - tolerance):
+        regressions.append(f"throughput: {baseline['offers_per_minute']:.1f} -> {report['offers_per_minute']:.1f} offers/min")
+    if report["peak_memory_mb"] > baseline["peak_memory_mb"] * (1 + tolerance) + 1:
+        regressions.append(f"peak memory: {baseline['peak_memory_mb']:.1f} -> {report['peak_memory_mb']:.1f} MB")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2, help="Passes over all fixtures")
+    parser.add_argument("--mode", choices=["serial", "speculative"], default="speculative")
+    parser.add_argument("--no-stream", action="store_true", help="Use non-streaming LLM calls")
+    parser.add_argument("--warm", action="store_true", help="Keep LLM/research/scrape caches between passes")
+    parser.add_argument("--tokens-per-second", type=float, default=MockOllamaConfig().tokens_per_second)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=MockOllamaConfig().prompt_tokens_per_second)
+    parser.add_argument("--load-latency", type=float, default=MockOllamaConfig().load_latency_s)
+    parser.add_argument("--json-trailing-tokens", type=int, default=MockOllamaConfig().json_trailing_tokens,
+                        help="Whitespace the mock emits after each JSON answer")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Seconds per canned search query")
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Compare against this report and exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="Write the report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    config = MockOllamaConfig(
+        load_latency_s=args.load_latency,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        tokens_per_second=args.tokens_per_second,
+        json_trailing_tokens=args.json_trailing_tokens,
+    )
+    ollama = MockOllamaServer(config=config).start()
+    html_server = serve_html()
+    storage_dir = tempfile.mkdtemp(prefix="career-bench-")
+    configure_environment(storage_dir, ollama.base_url, args)
+
+    from app.core.agent import CareerAgent
+    from app.core.profile import load_portfolio
+
+    host, port = html_server.server_address[:2]
+    cases = load_cases(f"http://{host}:{port}")
+    agent = CareerAgent(load_portfolio())
+
+    durations: Dict[str, List[float]] = {}
+    verdicts: Dict[str, int] = {}
+    tracemalloc.start()
+    started = time.perf_counter()
+    for run in range(args.runs):
+        for name, url, text in cases:
+            outcome = run_case(agent, url, text, stream=not args.no_stream)
+            verdicts[outcome["verdict"]] = verdicts.get(outcome["verdict"], 0) + 1
+            for span_name, seconds in outcome["spans"]:
+                durations.setdefault(span_name, []).append(seconds)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ollama.stop()
+    html_server.shutdown()
+
+    offers = len(cases) * args.runs
+    report = {
+        "config": {"runs": args.runs, "mode": args.mode, "stream": not args.no_stream, "warm": args.warm, **config.model_dump()},
+        "offers": offers,
+        "elapsed_s": elapsed,
+        "offers_per_minute": offers * 60 / elapsed if elapsed else 0.0,
+        "peak_memory_mb": peak / 1024 / 1024,
+        "llm_requests": ollama.requests,
+        "verdicts": verdicts,
+        "stages": summarize(durations),
+    }
+
+    print(f"{offers} offers in {elapsed:.1f}s ({report['offers_per_minute']:.1f} offers/min), "
+          f"{ollama.requests} LLM requests, peak memory {report['peak_memory_mb']:.1f} MB")
+    print(f"Verdicts: {verdicts}\n")
+    print(f"{'stage':<22}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, stats in sorted(report["stages"].items(), key=lambda item: item[1]["p50"], reverse=True):
+        print(f"{name:<22}{stats['count']:>5}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['mean'] * 1000:>10.1f}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
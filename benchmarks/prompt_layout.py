@@ -0,0 +1,75 @@
+"""
+Compares Ollama prompt-eval time between the 'legacy' and 'stable' prompt layouts.
+
+In the legacy layout the research context sits in the middle of the system prompt,
+so every offer invalidates Ollama's prompt cache. The stable layout keeps the profile
+and instructions as an invariant prefix and only re-evaluates the per-offer message.
+
+Needs a running Ollama (OLLAMA_BASE_URL / OLLAMA_MODEL):
+    python -m benchmarks.prompt_layout --runs 2
+"""
+import sys
+import argparse
+import statistics
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Before the app imports: OLLAMA_NUM_CTX, OLLAMA_NUM_PREDICT and OLLAMA_KEEP_ALIVE are read at import time
+load_dotenv()
+
+from app.core.agent import CareerAgent
+from app.core.profile import load_portfolio
+
+OFFERS_DIR = Path(__file__).parent / "fixtures" / "offers"
+
+def load_offers():
+    return [(path.stem, path.read_text(encoding="utf-8")) for path in sorted(OFFERS_DIR.glob("*.txt"))]
+
+def fake_research(name: str, run: int) -> str:
+    # Different research per request, as with real companies
+    return f"--- Results for '{name} reviews' (run {run}) ---\n- [Review]({name}): Opiniones variadas sobre {name}."
+
+def bench_layout(layout: str, offers, runs: int):
+    agent = CareerAgent(load_portfolio(), use_cache=False, prompt_layout=layout)
+    agent.warm_up()
+    rows = []
+    for run in range(runs):
+        for name, text in offers:
+            agent.analyze(text, research_context=fake_research(name, run))
+            stats = agent.llm.last_stats
+            if stats is None:
+                raise RuntimeError("No Ollama stats returned; is Ollama running?")
+            rows.append(stats)
+    return rows
+
+def summarize(layout: str, rows) -> str:
+    prompt_eval = [r.prompt_eval_duration_s for r in rows]
+    prompt_tokens = [r.prompt_eval_count for r in rows]
+    latency = [r.latency_s for r in rows]
+    return (
+        f"{layout:<8} n={len(rows):<3} prompt_eval mean={statistics.mean(prompt_eval):6.2f}s "
+        f"p50={statistics.median(prompt_eval):6.2f}s  evaluated tokens mean={statistics.mean(prompt_tokens):7.0f}  "
+        f"latency mean={statistics.mean(latency):6.2f}s"
+    )
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2, help="Passes over the offer fixtures per layout")
+    parser.add_argument("--layouts", nargs="*", default=["legacy", "stable"])
+    args = parser.parse_args(argv)
+
+    offers = load_offers()
+    results = {layout: bench_layout(layout, offers, args.runs) for layout in args.layouts}
+    for layout, rows in results.items():
+        print(summarize(layout, rows))
+
+    if "legacy" in results and "stable" in results:
+        legacy = statistics.mean(r.prompt_eval_duration_s for r in results["legacy"])
+        stable = statistics.mean(r.prompt_eval_duration_s for r in results["stable"])
+        if legacy:
+            print(f"\nPrompt eval time change (stable vs legacy): {(stable - legacy) / legacy:+.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import pytest
+
+from app.core.agent import CareerAgent
+from app.core.filters import HardFilterRules
+from app.core.models import AnalysisResult
+from app.core.profile import load_portfolio
+
+def test_rejected_offers_are_not_sent_to_the_llm(monkeypatch):
+    agent = CareerAgent(load_portfolio(), use_cache=False)
+    agent.filter_rules = HardFilterRules(remote_only=True, accept_hybrid=False)
+    sent = []
+
+    def score_pack(job_texts):
+        sent.extend(job_texts)
+        return {position: AnalysisResult(match_score=60, verdict="CONSIDER", reasoning_summary=text, pros=[], cons=[])
+                for position, text in enumerate(job_texts)}
+
+    monkeypatch.setattr(agent, "_score_pack", score_pack)
+    monkeypatch.setattr(agent, "analyze", lambda job_text: pytest.fail("unexpected fallback"))
+    texts = [
+        "Senior Python developer. 100% remote. Django and AWS.",
+        "On-site only, no remote. Python developer in our Madrid office.",
+        "Backend engineer, fully remote. Go and Kubernetes.",
+    ]
+    results = agent.analyze_batch(texts)
+
+    assert [result.verdict for result in results] == ["CONSIDER", "IGNORE", "CONSIDER"]
+    assert results[1].match_score == 0
+    assert [result.reasoning_summary for result in (results[0], results[2])] == sent
+    assert len(sent) == 2
@@ -0,0 +1,47 @@
+import pytest
+
+from app.core.company import CONFIDENCE_THRESHOLD, CompanyGazetteer, extract_company_local
+
+@pytest.fixture
+def gazetteer(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    gazetteer = CompanyGazetteer()
+    for name in ("Amazon", "Finlogic", "Nimbus Health"):
+        gazetteer.learn(name)
+    return gazetteer
+
+@pytest.mark.parametrize("text", [
+    "Senior Engineer\nYou will integrate with Amazon services.\n\nAbout Nimbus Health\nWe build clinical software.",
+    "Backend Engineer\nPreviously at Finlogic? Join Nimbus Health and help us scale.",
+])
+def test_earlier_known_company_does_not_win(gazetteer, text):
+    assert extract_company_local(text, gazetteer=gazetteer).name == "Nimbus Health"
+
+def test_known_company_alone_is_not_confident(gazetteer):
+    guess = extract_company_local("We integrate with Amazon and other clouds.", gazetteer=gazetteer)
+    assert guess.confidence < CONFIDENCE_THRESHOLD
+
+def test_known_company_agreeing_with_text_is_confident(gazetteer):
+    guess = extract_company_local("About Nimbus Health\nWe build clinical software.", gazetteer=gazetteer)
+    assert guess.name == "Nimbus Health" and guess.confidence >= CONFIDENCE_THRESHOLD
+
+def test_metadata_wins():
+    guess = extract_company_local("Join Finlogic", metadata={"hiring_organization": "Nimbus Health"})
+    assert guess.name == "Nimbus Health" and guess.confidence >= CONFIDENCE_THRESHOLD
+
+@pytest.mark.parametrize("url, name", [
+    ("https://www.linkedin.com/jobs/view/ingeniero-en-datos-en-acme-corp-3712345678", "Acme Corp"),
+    ("https://www.linkedin.com/jobs/view/data-engineer-at-acme-corp-3712345678", "Acme Corp"),
+])
+def test_linkedin_job_slug(url, name):
+    guess = extract_company_local("", url=url)
+    assert guess.name == name
+    assert guess.confidence < CONFIDENCE_THRESHOLD
+
+@pytest.mark.parametrize("url, name", [
+    ("https://careers.google.com/jobs/results/123-software-engineer/", "Google"),
+    ("https://www.google.com/about/careers/applications/jobs/results/123", "Google"),
+    ("https://www.google.com/search?q=python+jobs&ibp=htl;jobs", None),
+])
+def test_careers_site_host(url, name):
+    assert extract_company_local("", url=url).name == name
@@ -0,0 +1,19 @@
+from app.core.condense import clean_lines, condense_job_text, tokenize
+
+def test_tokenize_keeps_language_names():
+    assert tokenize("C++, C#, .NET, ASP.NET and node.js") == ["c++", "c#", ".net", "asp.net", "and", "node.js"]
+
+def test_boilerplate_only_as_whole_lines():
+    lines = clean_lines(
+        "Build our cookie-consent platform\n"
+        "Cookie policy\n"
+        "We use cookies to improve your experience.\n"
+        "Experience with privacy policy tooling (GDPR)\n"
+        "Privacy Policy\n"
+        "Apply now\n"
+        "© 2024 Acme. All rights reserved."
+    )
+    assert lines == ["Build our cookie-consent platform", "Experience with privacy policy tooling (GDPR)"]
+
+def test_never_condenses_to_nothing():
+    assert condense_job_text("Cookie policy\nPrivacy policy", 100) == "Cookie policy\nPrivacy policy"
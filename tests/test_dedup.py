@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+from app.core.dedup import OfferIndex
+from app.core.models import AnalysisResult
+
+OFFER = "Senior Python Engineer at Nimbus Health\n100% remote. Django, AWS and PostgreSQL.\nSalary: 60-70k EUR."
+RESULT = AnalysisResult(match_score=80, verdict="APPLY", reasoning_summary="Encaja.", pros=[], cons=[])
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    return OfferIndex(max_age_days=30)
+
+def test_duplicate_is_found_in_the_same_context(index):
+    offer_id = index.add(OFFER, RESULT, context="v1")
+    duplicate = index.find(OFFER + "\nApply now", context="v1")
+    assert duplicate is not None and duplicate.offer_id == offer_id and duplicate.reusable
+
+def test_other_profile_or_prompt_version_does_not_match(index):
+    index.add(OFFER, RESULT, context="v1")
+    assert index.find(OFFER, context="v2") is None
+
+def test_old_entries_are_skipped_and_pruned(index, monkeypatch):
+    index.add(OFFER, RESULT, context="v1")
+    monkeypatch.setattr(time, "time", lambda now=time.time(): now + 31 * 86400)
+    assert index.find(OFFER, context="v1") is None
+    assert index.prune() == 1
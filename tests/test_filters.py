@@ -0,0 +1,109 @@
+import pytest
+
+from app.core.filters import HardFilterRules, evaluate_hard_filters, extract_job_offer, extract_salary
+
+RULES = HardFilterRules(remote_only=True, accept_hybrid=False, requires_sponsorship=True, salary_min=60_000, salary_currency="EUR")
+
+def decide(text: str):
+    return evaluate_hard_filters(extract_job_offer(text), RULES)
+
+# --- Salary ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("Salario: 45.000 - 55.000 € brutos/año", (45_000, 55_000, "EUR")),
+    ("Salary: €50k-€60k", (50_000, 60_000, "EUR")),
+    ("Compensation 50-60k EUR, fully remote", (50_000, 60_000, "EUR")),
+    ("Sueldo: 4.000 €/mes", (48_000, 48_000, "EUR")),
+    ("Salary up to $120,000 per year", (None, 120_000, "USD")),
+    ("Salario desde 40k €", (40_000, None, "EUR")),
+])
+def test_extract_salary(text, expected):
+    assert extract_salary(text)[:3] == expected
+
+@pytest.mark.parametrize("text", [
+    "Ticket restaurant 11€ al día",
+    "Team of 40 €",
+    "We raised €30M in our Series B",
+    "Presupuesto de formación de 1.500 € por persona",
+    "€45k - €55k",  # no salary wording: left for the LLM
+])
+def test_amounts_that_are_not_a_salary(text):
+    assert extract_salary(text) is None
+
+def test_salary_is_picked_over_other_amounts():
+    assert extract_salary("$50M revenue, we pay 80k EUR")[:3] == (80_000, 80_000, "EUR")
+
+def test_most_generous_salary_candidate_wins():
+    text = "Salary: 40k € for juniors.\nSalary: 70-80k € for seniors."
+    assert extract_salary(text)[:3] == (70_000, 80_000, "EUR")
+
+@pytest.mark.parametrize("text", [
+    "100% remote. Ticket restaurant 11€ al día.",
+    "Fully remote. Team of 40 €",
+    "Remote-first. We raised €30M last year.",
+    "Fully remote. $50M revenue, we pay 80k EUR.",
+])
+def test_incidental_amounts_do_not_reject(text):
+    assert decide(text).status.salary_pass
+
+def test_low_published_salary_rejects():
+    decision = decide("100% remoto. Salario: 30.000 - 40.000 € brutos/año.")
+    assert not decision.status.salary_pass
+    assert decision.rejected
+
+# --- Visa sponsorship ---
+
+@pytest.mark.parametrize("text", [
+    "We cannot offer visa sponsorship for this role.",
+    "We do not sponsor visas.",
+    "No visa sponsorship available.",
+    "Sponsorship is not available.",
+    "No ofrecemos patrocinio de visado.",
+])
+def test_no_sponsorship(text):
+    assert extract_job_offer(text).visa_sponsorship is False
+
+@pytest.mark.parametrize("text", [
+    "Piano sponsor event every Friday.",
+    "Ideally you have no sponsorship requirements.",
+    "We are a proud sponsor of PyCon.",
+])
+def test_not_a_no_sponsorship_statement(text):
+    assert extract_job_offer(text).visa_sponsorship is None
+    assert decide("Fully remote. " + text).status.visa_pass
+
+def test_sponsorship_offered():
+    assert extract_job_offer("Visa sponsorship is available.").visa_sponsorship is True
+
+# --- Work mode ---
+
+@pytest.mark.parametrize("text, mode", [
+    ("100% remoto desde cualquier lugar de España.", "remote"),
+    ("You will work remotely from Spain.", "remote"),
+    ("Remote-friendly team across Europe.", "remote"),
+    ("Modelo híbrido: 2 días a la semana en la oficina.", "hybrid"),
+    ("Puesto presencial en Madrid.", "onsite"),
+    ("On-site only, no remote.", "onsite"),
+])
+def test_work_mode(text, mode):
+    assert extract_job_offer(text).work_mode == mode
+
+@pytest.mark.parametrize("text", [
+    "On-site only, no remote.",
+    "Trabajo presencial en nuestra oficina de Valencia.",
+    "Hybrid role: 3 days per week in the office.",
+])
+def test_onsite_or_hybrid_rejects_remote_only_candidate(text):
+    assert not decide(text).status.remote_pass
+
+@pytest.mark.parametrize("text", [
+    "You will work remotely from Spain, with occasional on-site visits.",
+    "Work remotely! Occasional onsite offsites.",
+    "We are an on-site-optional company; work from wherever you like.",
+    "Remotely-friendly team, office-based optional.",
+    "Remote position. Our office in Berlin is on-site for those who prefer it.",
+])
+def test_remote_offers_with_office_mentions_pass(text):
+    decision = decide(text)
+    assert decision.status.remote_pass
+    assert extract_job_offer(text).work_mode in ("remote", None)
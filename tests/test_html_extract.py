@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from app.tools.html_extract import _extract_lxml, _extract_stream, parse_job_posting
+
+HTML = "<html><body><p>Python<!-- tracking -->, Django<?php echo 1 ?> y AWS</p><script>var x;</script><p>Remoto</p></body></html>"
+
+@pytest.mark.parametrize("extract", [_extract_lxml, _extract_stream])
+def test_text_after_comments_is_kept(extract):
+    text = " ".join(extract(HTML)[0].split())
+    assert text == "Python, Django y AWS Remoto"
+
+def posting_salary(value):
+    block = json.dumps({"@type": "JobPosting", "title": "Dev", "baseSalary": {"currency": "EUR", "value": value}})
+    return parse_job_posting([block], lambda html: html).salary
+
+@pytest.mark.parametrize("value, expected", [
+    (50000, "50000 EUR"),
+    ("50.000", "50000 EUR"),
+    ({"minValue": "45,000.00", "maxValue": "55,000.00", "unitText": "YEAR"}, "45000 - 55000 EUR per year"),
+    ({"minValue": "n/a", "maxValue": 60000}, "60000 EUR"),
+])
+def test_salary_values_are_parsed_leniently(value, expected):
+    assert posting_salary(value) == expected
+
+def test_unreadable_salary_is_dropped():
+    assert posting_salary("Competitive") is None
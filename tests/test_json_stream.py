@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from app.core.json_stream import StreamingJSONParser, salvage_array, validate_analysis
+
+ANALYSIS = {
+    "match_score": 82,
+    "verdict": "APPLY",
+    "reasoning_summary": 'Encaja: "Python" y \\ AWS, {sin llaves}',
+    "pros": ["Python", "AWS"],
+    "cons": [],
+    "hard_filter_check": {"remote_pass": True, "salary_pass": True, "visa_pass": True},
+}
+
+def feed(text: str, chunk_size: int = 1, **kwargs) -> StreamingJSONParser:
+    parser = StreamingJSONParser(**kwargs)
+    for start in range(0, len(text), chunk_size):
+        if parser.feed(text[start:start + chunk_size]):
+            break
+    return parser
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_fields_survive_any_token_split(chunk_size):
+    parser = feed(json.dumps(ANALYSIS, ensure_ascii=False), chunk_size)
+    assert parser.done
+    assert parser.fields["reasoning_summary"] == ANALYSIS["reasoning_summary"]
+    assert parser.fields["hard_filter_check"].remote_pass is True
+    assert parser.missing() == []
+
+def test_fields_are_reported_as_they_complete():
+    seen = []
+    text = json.dumps(ANALYSIS)
+    parser = StreamingJSONParser(on_field=lambda name, value: seen.append(name))
+    parser.feed(text[:text.index('"reasoning_summary"')])
+    assert seen == ["match_score", "verdict"]
+    parser.feed(text[text.index('"reasoning_summary"'):])
+    assert seen == list(ANALYSIS)
+
+def test_chatter_fences_comments_and_trailing_commas_are_tolerated():
+    text = """Claro, aquí tienes:
+```json
+{
+  "match_score": 70,
+  // la modalidad encaja
+  "verdict": "consider",
+  "pros": ["Remoto", "Stack",],
+  "cons": ["Salario no publicado"],
+}
+```"""
+    parser = feed(text)
+    assert parser.done
+    assert parser.fields["verdict"] == "CONSIDER"
+    assert parser.fields["pros"] == ["Remoto", "Stack"]
+
+def test_invalid_fields_are_reported_not_kept():
+    parser = feed('{"match_score": "alto", "verdict": "MAYBE", "pros": ["a"]}')
+    assert parser.missing(("match_score", "verdict", "pros")) == ["match_score", "verdict"]
+    assert set(parser.invalid) == {"match_score", "verdict"}
+
+def test_score_is_clamped():
+    assert feed('{"match_score": 130.4}').fields["match_score"] == 100
+
+def test_parser_stops_when_the_object_closes():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"match_score": 50, "verdict": "IGNORE"} and more text {"x": 1}')
+    assert parser.text.endswith("}") and "more text" not in parser.text
+
+def test_truncated_stream_keeps_the_complete_fields():
+    parser = feed('{"match_score": 55, "verdict": "CONSIDER", "reasoning_summary": "Cortado a mit')
+    assert not parser.done
+    assert parser.missing() == ["reasoning_summary", "pros", "cons"]
+
+def test_merge_takes_the_reasked_fields():
+    parser = feed('{"match_score": 55, "verdict": "NOPE"}')
+    reask = feed('{"verdict": "IGNORE", "pros": [], "cons": ["Presencial"], "reasoning_summary": "No encaja"}')
+    parser.merge(reask, parser.missing())
+    assert parser.missing() == [] and parser.invalid == {}
+    assert parser.to_model().verdict == "IGNORE"
+
+# --- Batched answers ---
+
+def test_salvage_array_keeps_complete_elements_of_a_truncated_answer():
+    text = '{"results": [{"offer": 1, "verdict": "APPLY"}, {"offer": 2, "pros": ["a", "b"]}, {"offer": 3, "verd'
+    assert salvage_array(text, "results") == [{"offer": 1, "verdict": "APPLY"}, {"offer": 2, "pros": ["a", "b"]}]
+
+@pytest.mark.parametrize("text", ['{"results": []}', '{"other": [1]}', '{"results": [', ""])
+def test_salvage_array_without_elements(text):
+    assert salvage_array(text, "results") == []
+
+def test_validate_analysis_checks_each_element():
+    element = {key: value for key, value in ANALYSIS.items() if key != "hard_filter_check"}
+    assert validate_analysis({**element, "verdict": "apply"}).verdict == "APPLY"
+    with pytest.raises(ValueError):
+        validate_analysis({**element, "verdict": "MAYBE"})
+    with pytest.raises(ValueError):
+        validate_analysis("APPLY")
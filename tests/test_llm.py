@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+from app.core import dedup, llm
+from app.core.agent import CareerAgent
+from app.core.cache import LLMResponseCache
+from app.core.llm import LLMClient
+from app.core.profile import load_portfolio
+from app.core.router import BACKEND_KINDS, BackendConfig, FakeBackend, LLMRouter
+
+class _EndlessStream:
+    """Keeps sending whitespace after the object, as a model in JSON mode sometimes does."""
+
+    def __init__(self):
+        self._tokens = iter(['{"match_score": 50}'])
+        self.stats = None
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._tokens, "\n")
+
+    def close(self) -> None:
+        self.closed = True
+
+class TruncatedBackend(FakeBackend):
+    def _reply(self, payload):
+        text, stats = super()._reply(payload)
+        return text[:10], stats.model_copy(update={"done_reason": "length"})
+
+class _FailingStream:
+    """Drops the connection after the first token."""
+
+    def __init__(self):
+        self._sent = False
+        self.stats = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._sent:
+            raise ConnectionResetError("connection lost")
+        self._sent = True
+        return '{"match_score": 5'
+
+    def close(self) -> None:
+        pass
+
+class FailingBackend(FakeBackend):
+    def stream(self, endpoint, payload):
+        return _FailingStream()
+
+class EndlessBackend(FakeBackend):
+    def stream(self, endpoint, payload):
+        self.last_stream = _EndlessStream()
+        return self.last_stream
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    for kind, backend in (("endless", EndlessBackend), ("truncated", TruncatedBackend), ("failing", FailingBackend)):
+        monkeypatch.setitem(BACKEND_KINDS, kind, backend)
+    return LLMClient()
+
+def stream(client: LLMClient, kind: str) -> str:
+    client.router = LLMRouter([BackendConfig(name=kind, kind=kind)])
+    return "".join(client.stream("Oferta", system_prompt="Perfil", json_mode=True, use_cache=False, stop_when=lambda token: "}" in token))
+
+def test_stats_arrive_after_an_early_stop(client):
+    text = stream(client, "fake")
+    assert text.endswith("}")
+    assert client.last_stats is not None and client.last_stats.eval_count > 0
+
+def test_drain_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(llm, "STREAM_DRAIN_MAX_TOKENS", 3)
+    assert stream(client, "endless") == '{"match_score": 50}'
+    assert client.last_stats is None
+    assert client.router.backends[0].last_stream.closed
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    cache = LLMResponseCache()
+    monkeypatch.setattr(llm, "get_response_cache", lambda: cache)
+    return cache
+
+def cached_entries(cache: LLMResponseCache) -> int:
+    return cache.stats()["entries"]
+
+@pytest.mark.parametrize("kind, cached", [("fake", 1), ("truncated", 0)])
+def test_only_complete_streams_are_cached(client, cache, kind, cached):
+    client.router = LLMRouter([BackendConfig(name=kind, kind=kind)])
+    "".join(client.stream("Oferta", system_prompt="Perfil", json_mode=True))
+    assert cached_entries(cache) == cached
+
+def test_stream_stopped_by_the_caller_is_cached(client, cache):
+    client.router = LLMRouter([BackendConfig(name="fake", kind="fake")])
+    "".join(client.stream("Oferta", json_mode=True, stop_when=lambda token: "}" in token))
+    assert cached_entries(cache) == 1
+
+def test_stream_failing_midway_is_not_cached(client, cache):
+    client.router = LLMRouter([BackendConfig(name="failing", kind="failing")])
+    with pytest.raises(ConnectionResetError):
+        "".join(client.stream("Oferta", json_mode=True))
+    assert cached_entries(cache) == 0
+
+@pytest.mark.parametrize("kind, cached", [("fake", 1), ("truncated", 0)])
+def test_only_complete_generations_are_cached(client, cache, kind, cached):
+    client.router = LLMRouter([BackendConfig(name=kind, kind=kind)])
+    client.generate("Oferta", json_mode=True)
+    assert cached_entries(cache) == cached
+
+def test_stats_are_per_thread(client):
+    client.router = LLMRouter([BackendConfig(name="fake", kind="fake")])
+    client.generate("Una oferta bastante larga " * 20, use_cache=False)
+    stats = client.last_stats
+    thread = threading.Thread(target=lambda: client.generate("Extract ONLY the company name", use_cache=False, task="extract"))
+    thread.start()
+    thread.join()
+    assert client.last_stats is stats
+
+def test_staged_analysis_keeps_the_analysis_stats(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(dedup, "DEDUP_ENABLED", False)
+    agent = CareerAgent(load_portfolio(), use_cache=False)
+    agent.llm.router = LLMRouter([BackendConfig(name="fake", kind="fake")])
+    # No company cues: the research thread asks the LLM for the name while the analysis streams
+    staged = agent.run_analysis("python backend role, fully remote, django and aws", mode="speculative")
+    assert staged.llm_stats is not None
+    assert staged.llm_stats.prompt_eval_count > 500 # the analysis prompt, not the extraction one
@@ -0,0 +1,29 @@
+from app.core.agent import find_red_flags
+
+def research(*lines: str) -> str:
+    return "\n".join(["--- Results for 'Acme layoffs despidos' ---", *lines])
+
+def test_flags_come_from_result_lines():
+    text = research("- [Acme cuts 10% of staff](https://news.example/acme): Acme announced layoffs in March.")
+    assert find_red_flags(text) == ["layoffs"]
+
+def test_headers_errors_and_timeouts_are_ignored():
+    text = "\n".join([
+        "--- Results for 'Acme toxic lawsuit' ---",
+        "Error searching for 'Acme fraud': connection reset",
+        "Search timed out for 'Acme layoffs'",
+        "- [Acme careers](https://acme.example/jobs): We are hiring engineers.",
+    ])
+    assert find_red_flags(text) == []
+
+def test_negated_mentions_are_ignored():
+    text = research(
+        "- [Acme review](https://reviews.example/acme): Great culture, no layoffs so far.",
+        "- [Acme en 2023](https://prensa.example/acme): Crecimiento sin despidos ni ERE.",
+        "- [Acme Inc](https://acme.example): Founded in 2010 without any lawsuits.",
+    )
+    assert find_red_flags(text) == []
+
+def test_negation_does_not_cross_sentences():
+    text = research("- [Acme](https://news.example/acme): No comment. Layoffs confirmed by staff.")
+    assert find_red_flags(text) == ["layoffs"]
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from app.core.router import BackendConfig, LLMRouter, NoBackendAvailable
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv("LLM_BREAKER_PROBE_WAIT_S", "5")
+    router = LLMRouter([BackendConfig(name="fake", kind="fake", max_concurrency=4)])
+    backend = router.backends[0]
+    # Circuit open and already cooled down: the next request is the half-open probe
+    backend.failures, backend.open_until = 3, 1e-9
+    return router
+
+def acquire_in_thread(router: LLMRouter):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["backend"] = router.acquire("llama3")
+        except NoBackendAvailable as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+@pytest.mark.parametrize("probe_ok", [True, False])
+def test_requests_wait_for_the_probe(router, probe_ok):
+    probe = router.acquire("llama3")
+    assert probe.probing
+    thread, outcome = acquire_in_thread(router)
+    thread.join(0.2)
+    assert thread.is_alive() # waiting, not failing
+
+    router.release(probe, ok=probe_ok)
+    thread.join(2)
+    assert not thread.is_alive()
+    if probe_ok:
+        assert outcome["backend"] is probe
+    else:
+        assert isinstance(outcome["error"], NoBackendAvailable)
+
+def test_wait_for_the_probe_is_bounded(router):
+    router.probe_wait_s = 0.1
+    router.acquire("llama3")
+    with pytest.raises(NoBackendAvailable):
+        router.acquire("llama3")